@@ -1 +1,11 @@
-from .core import Figure, Fit
+from .core import Fit, fit_many  # noqa: F401
+
+
+def __getattr__(name):
+    # anafit.Figure imports PyQt5 and switches matplotlib backend to Qt5Agg,
+    # only when first accessed
+    if name in ("Figure", "DrawLine"):
+        from . import core
+
+        return getattr(core, name)
+    raise AttributeError("module {0!r} has no attribute {1!r}".format(__name__, name))
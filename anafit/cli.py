@@ -0,0 +1,392 @@
+"""
+Fits a function to the columns of CSV, text or NPY files, without display.
+
+Each y column of each file is fitted against the x column, in a pool of
+processes, and the results (parameters, uncertainties, convergence and
+timings) are written as one CSV or JSON table, in the order of the inputs.
+
+Usage: anafit-fit MODEL FILES... [--x 0] [--y 1,2] [--xrange 1,10]
+    [--p0 "(1, 2)"] [--subsample N] [--budget S] [--maxfev N]
+    [--workers N] [--executor process] [--output results.csv]
+
+MODEL is the name of a fitting function (see anafit-fit --list) or its
+definition, like "lambda x, a, b : a*np.exp(x/b) ; (1, 1)". The exit status is
+1 if some fits failed.
+"""
+import argparse
+import collections
+import csv
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from .core import Fit
+from .core.batch import make_executor
+from .utilities import evaluate_constant, from_fdef, get_fdef, get_func
+
+# stages of the fits whose times are written in the table, see Fit.metrics
+TIMINGS = ("select", "guess", "linear", "optimizer", "model")
+# number of fits submitted to the pool in advance, per worker
+QUEUE_PER_WORKER = 2
+_DELIMITERS = {".csv": ",", ".tsv": "\t"}
+
+
+def read_table(path):
+    """
+    Reads the columns of a file: .npy files are memory mapped, other files
+    are read as text, comma separated for .csv, tab separated for .tsv and
+    whitespace separated otherwise. A first line that is not numeric is
+    read as the names of the columns.
+
+    Parameters
+    ----------
+
+    path: str
+
+    Returns
+    ----------
+    names: list
+        names of the columns, their indices as strings if the file has none
+    data: numpy.ndarray
+        (npts, ncolumns) array. A 1D .npy array is read as one column.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".npy":
+        data = np.load(path, mmap_mode="r")
+        if data.ndim == 1:
+            data = data[:, None]
+        return [str(i) for i in range(data.shape[1])], data
+    delimiter = _DELIMITERS.get(ext)
+    with open(path) as fid:
+        first = fid.readline()
+    fields = [field.strip() for field in first.split(delimiter)]
+    try:
+        [float(field) for field in fields]
+        names, skiprows = None, 0
+    except ValueError:
+        names, skiprows = fields, 1
+    data = np.loadtxt(path, delimiter=delimiter, skiprows=skiprows, ndmin=2)
+    if names is None:
+        names = [str(i) for i in range(data.shape[1])]
+    return names, data
+
+
+def _column(names, column):
+    # Returns the index of a column given by its name or index
+    if column in names:
+        return names.index(column)
+    index = int(column)
+    if not -len(names) <= index < len(names):
+        raise ValueError("No column {0}".format(column))
+    return index % len(names)
+
+
+def iter_datasets(paths, x=None, y=None):
+    """
+    Yields the datasets to fit, reading the files one at a time
+
+    Parameters
+    ----------
+
+    paths: iterable
+        paths of the files
+    x: str, optional
+        name or index of the x column. If not provided, the first column, or
+        the indices of the points for files of one column.
+        Default: None
+    y: list, optional
+        names or indices of the y columns. If not provided, all the columns
+        but x.
+        Default: None
+
+    Yields
+    ----------
+    tuple
+        (path, x column name, y column name, x, y), or (path, None, None,
+        None, error) if the file can not be read
+    """
+    for path in paths:
+        try:
+            names, data = read_table(path)
+            if x is None and len(names) == 1:
+                ix, xname, xdata = None, "index", np.arange(data.shape[0], dtype=float)
+            else:
+                ix = _column(names, "0" if x is None else x)
+                xname, xdata = names[ix], data[:, ix]
+            if y is None:
+                iy = [i for i in range(len(names)) if i != ix]
+            else:
+                iy = [_column(names, column) for column in y]
+        except (OSError, ValueError) as error:
+            yield path, None, None, None, error
+            continue
+        for i in iy:
+            yield path, xname, names[i], xdata, data[:, i]
+
+
+def fit_dataset(fdef, x, y, xrange=None, p=None, subsample=None, **limits):
+    """
+    Fits one dataset with anafit.core.Fit, without figure, and returns the
+    metrics of the fit (see Fit.metrics). Runs in the workers of the pool.
+
+    Parameters
+    ----------
+
+    fdef: str
+        definition of the fitting function, of type 'fdef ; (param)'
+    x, y: numpy.ndarray
+        datas to fit
+    xrange, p, subsample:
+        see anafit.core.Fit
+    limits: dict
+        budget and maxfev, see Fit.fit
+
+    Returns
+    ----------
+    dict
+    """
+    start = time.perf_counter()
+    fit = Fit((x, y), fdef, xrange, p, subsample)
+    fit.fit(cache=False, **limits)
+    metrics = fit.metrics
+    metrics["time"] = time.perf_counter() - start
+    return metrics
+
+
+def _row(path, xname, yname, params, metrics=None, error=None):
+    # Returns the row of the results table of one dataset
+    row = {"file": path, "x": xname, "y": yname}
+    if error is not None:
+        row["error"] = "{0}: {1}".format(type(error).__name__, error)
+        return row
+    row.update(
+        npts=metrics["npts"],
+        method=metrics.get("method"),
+        converged=metrics.get("converged"),
+        nfev=metrics.get("nfev"),
+        cost=metrics.get("cost"),
+    )
+    for name, value, sigma in zip(params, metrics["popt"], metrics["sigma"]):
+        row[name] = value
+        row["sigma_" + name] = sigma
+    row["time"] = metrics["time"]
+    for stage in TIMINGS:
+        row["time_" + stage] = metrics["timings"].get(stage)
+    return row
+
+
+def fit_files(
+    fname,
+    paths,
+    x=None,
+    y=None,
+    xrange=None,
+    p=None,
+    subsample=None,
+    budget=None,
+    maxfev=None,
+    executor="process",
+    max_workers=None,
+):
+    """
+    Fits the columns of files concurrently, and yields the rows of the
+    results table, in the order of the inputs. Files are read while the
+    previous datasets are fitted, so that only a few of them are in memory at
+    once. Errors (unreadable file, failed fit) are reported in the 'error'
+    field of their row, without stopping the others.
+
+    Parameters
+    ----------
+
+    fname: str
+        fitting function name (a key from fitting functions dict), or its
+        definition, of type 'fdef ; (param)'
+    paths: iterable
+        paths of the files, see read_table
+    x, y:
+        columns to fit, see iter_datasets
+    xrange, p, subsample:
+        see anafit.core.Fit
+    budget, maxfev:
+        see anafit.core.Fit.fit
+    executor: str or concurrent.futures.Executor, optional
+        'thread', 'process' or an executor to run the fits in
+        Default: 'process'
+    max_workers: int, optional
+        number of workers of the pool.
+        Default: None
+
+    Yields
+    ----------
+    dict
+        one row per dataset, with the file and column names, the number of
+        points, the status of the optimizer, the parameters and their
+        standard deviations ('sigma_' + name), and the times of the fit
+        ('time' and 'time_' + stage, in seconds)
+    """
+    fdef = get_fdef(fname)
+    params = from_fdef(fdef)[0].names[1:]
+    pool = make_executor(executor, max_workers)
+    queue = collections.deque()
+    size = QUEUE_PER_WORKER * (max_workers or os.cpu_count() or 1)
+    try:
+        for path, xname, yname, xdata, ydata in iter_datasets(paths, x, y):
+            if xname is None:
+                queue.append((path, xname, yname, ydata))
+            else:
+                future = pool.submit(
+                    fit_dataset,
+                    fdef,
+                    np.array(xdata),
+                    np.array(ydata),
+                    xrange,
+                    p,
+                    subsample,
+                    budget=budget,
+                    maxfev=maxfev,
+                )
+                queue.append((path, xname, yname, future))
+            while len(queue) > size:
+                yield _result(params, *queue.popleft())
+        while queue:
+            yield _result(params, *queue.popleft())
+    finally:
+        for item in queue:
+            if not isinstance(item[3], Exception):
+                item[3].cancel()
+        if pool is not executor:
+            pool.shutdown()
+
+
+def _result(params, path, xname, yname, future):
+    # Returns the row of a dataset, waiting for its fit
+    if isinstance(future, Exception):
+        return _row(path, xname, yname, params, error=future)
+    try:
+        return _row(path, xname, yname, params, future.result())
+    except Exception as error:
+        return _row(path, xname, yname, params, error=error)
+
+
+def table_fields(fname):
+    """
+    Returns the columns of the results table of a fitting function
+
+    Parameters
+    ----------
+
+    fname: str
+        fitting function name (a key from fitting functions dict), or its
+        definition, of type 'fdef ; (param)'
+
+    Returns
+    ----------
+    list
+    """
+    fields = ["file", "x", "y", "npts", "method", "converged", "nfev", "cost"]
+    for name in from_fdef(get_fdef(fname))[0].names[1:]:
+        fields += [name, "sigma_" + name]
+    fields += ["time"] + ["time_" + stage for stage in TIMINGS] + ["error"]
+    return fields
+
+
+def write_table(rows, fields, output=None, fmt="csv"):
+    """
+    Writes the rows of the results table as CSV or JSON, as they come, and
+    returns the number of failed fits
+
+    Parameters
+    ----------
+
+    rows: iterable
+        rows returned by fit_files
+    fields: list
+        columns of the table, see table_fields
+    output: file object, optional
+        Default: sys.stdout
+    fmt: str, optional
+        'csv' or 'json'
+        Default: 'csv'
+
+    Returns
+    ----------
+    int
+    """
+    output = sys.stdout if output is None else output
+    if fmt == "json":
+        rows = list(rows)
+        json.dump(rows, output, indent=2)
+        output.write("\n")
+        return sum("error" in row for row in rows)
+    failed = 0
+    writer = csv.DictWriter(output, fields)
+    writer.writeheader()
+    for row in rows:
+        failed += "error" in row
+        writer.writerow(row)
+        output.flush()
+    return failed
+
+
+def main(argv=None):
+    """
+    Entry point of the anafit-fit command, see the documentation of the
+    module
+    """
+    parser = argparse.ArgumentParser(
+        prog="anafit-fit",
+        description=__doc__.strip().splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="\n".join(__doc__.strip().splitlines()[2:]),
+    )
+    parser.add_argument("model", nargs="?", help="name or definition of the function")
+    parser.add_argument("files", nargs="*", help="CSV, text or NPY files")
+    parser.add_argument("--list", action="store_true", help="list the functions")
+    parser.add_argument("--x", help="name or index of the x column")
+    parser.add_argument("--y", help="comma separated y columns (default: all)")
+    parser.add_argument("--xrange", help="x range to fit, like 1,10")
+    parser.add_argument("--p0", help="initialising parameters, like '(1, 2)'")
+    parser.add_argument("--subsample", type=int, help="see anafit.core.Fit")
+    parser.add_argument("--budget", type=float, help="time limit per fit (s)")
+    parser.add_argument("--maxfev", type=int, help="evaluations limit per fit")
+    parser.add_argument("--workers", type=int, help="number of workers")
+    parser.add_argument("--executor", choices=("process", "thread"), default="process")
+    parser.add_argument("--output", help="CSV or JSON file (default: stdout)")
+    args = parser.parse_args(argv)
+    if args.list:
+        for name, fdef in get_func().items():
+            print("{0:<20} {1}".format(name, fdef))
+        return 0
+    if args.model is None or not args.files:
+        parser.error("a model and at least one file are required")
+    try:
+        fields = table_fields(args.model)
+    except (KeyError, ValueError) as error:
+        parser.error("invalid model {0!r}: {1}".format(args.model, error))
+    rows = fit_files(
+        args.model,
+        args.files,
+        x=args.x,
+        y=None if args.y is None else args.y.split(","),
+        xrange=None if args.xrange is None else evaluate_constant(args.xrange),
+        p=None if args.p0 is None else evaluate_constant(args.p0),
+        subsample=args.subsample,
+        budget=args.budget,
+        maxfev=args.maxfev,
+        executor=args.executor,
+        max_workers=args.workers,
+    )
+    if args.output is None:
+        failed = write_table(rows, fields)
+    else:
+        fmt = "json" if args.output.endswith(".json") else "csv"
+        with open(args.output, "w", newline="") as output:
+            failed = write_table(rows, fields, output, fmt)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
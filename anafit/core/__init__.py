@@ -1 +1,22 @@
-from .anafit import Figure, Fit  # noqa: F401
+from .anafit import Fit, FitInterrupted, fit_arrays  # noqa: F401
+from .batch import BatchResult, ModelComparison, compare_models, fit_many  # noqa: F401
+from .bootstrap import BootstrapResult, bootstrap  # noqa: F401
+from .cache import FitCache, fit_cache  # noqa: F401
+from .hooks import (  # noqa: F401
+    add_fit_hook,
+    fit_hooks,
+    log_fit,
+    print_fit,
+    remove_fit_hook,
+)
+from .streaming import chunk_accumulator, fit_chunks, iter_chunks  # noqa: F401
+
+
+def __getattr__(name):
+    # The Qt toolbar integration is only imported on first use, so that the
+    # fitting engine can be used without PyQt5 nor a switch of backend
+    if name in ("Figure", "DrawLine"):
+        from ..ui import figure
+
+        return getattr(figure, name)
+    raise AttributeError("module {0!r} has no attribute {1!r}".format(__name__, name))
@@ -1,25 +1,279 @@
-import functools
-import sys
+import time
+from concurrent.futures import Future
 
-import matplotlib
 import numpy as np
-from PyQt5 import QtGui, QtWidgets
-from scipy.optimize import curve_fit
 
-from ..ui import CustomFitDialog, Ui_Fit
-from ..utilities import from_fdef, get_func, save_customlist, str_line
+from ..utilities import builtin_name, from_fdef, get_fdef, get_jac, guess_p
+from .bands import bands
+from .cache import fit_cache, fit_key
+from .hooks import run_fit_hooks
+from .linear import MOMENT_FITS, fit_linear, fit_moments, linear_accumulator
+from .render import envelope, evaluate, minmax_decimate, render_grid
+from .selection import data_index, range_index, stratified_sample
+
+# default number of checks per second for new datas, in streaming mode
+STREAM_RATE = 10
+# number of watched points compared to detect datas changed otherwise than by
+# appending points, in streaming mode
+WATCHED_POINTS = 4096
+
+
+def fit_arrays(
+    fdef,
+    x,
+    y,
+    p=None,
+    jac=True,
+    linear=True,
+    guess=True,
+    info=None,
+    subsample=None,
+    polish=True,
+    budget=None,
+    maxfev=None,
+    cancel=None,
+):
+    """
+    Fits the datas y(x) with the function defined by fdef. Functions linear in
+    their parameters (polynomials for instance) are fitted in closed form by
+    linear least-squares, without needing initialising parameters. Other
+    functions are fitted with scipy.optimize.curve_fit, given the jacobian of
+    the function when one is available (see anafit.utilities.get_jac), and
+    starting from initialising parameters estimated from the datas for
+    built-in functions (see anafit.utilities.guess_p)
+
+    Parameters
+    ----------
+
+    fdef: str
+        definition of the fitting function, of type 'fdef ; (param)'
+    x: numpy.ndarray
+        x values of the datas to fit
+    y: numpy.ndarray
+        y values of the datas to fit
+    p: tuple, optional
+        initialising parameters. If not provided, they are estimated from the
+        datas, or the ones of fdef are used.
+        Default: None
+    jac: bool, optional
+        if False, the jacobian is always estimated by finite differences
+        Default: True
+    linear: bool, optional
+        if False, curve_fit is used even for functions linear in their
+        parameters
+        Default: True
+    guess: bool, optional
+        if False, the initialising parameters of fdef are used when p is not
+        provided
+        Default: True
+    info: dict, optional
+        if provided, filled with information on the fit: 'method' ('linear'
+        or 'curve_fit'), 'p0' (initialising parameters used), 'guessed'
+        (whether p0 was estimated from the datas), 'nfev' and 'njev' (number
+        of evaluations of the function and of its jacobian by the optimizer;
+        nfev is None for the closed-form linear solution, which only
+        evaluates the function to build its basis),
+        'cost' (half the sum of the squared residuals), 'converged' and
+        'message' (status of the optimizer), and 'timings' (time in seconds
+        spent in each stage: 'guess', 'linear', 'optimizer' and 'model', the
+        evaluations of the function and jacobian by the optimizer)
+        Default: None
+    subsample: int, optional
+        if provided and smaller than the number of points, the datas are
+        first fitted on a stratified random sample of subsample points (see
+        anafit.core.selection.stratified_sample, the sample spans the x range
+        evenly if x is sorted). The information on this first fit is stored in
+        info['subsample'].
+        Default: None
+    polish: bool, optional
+        if True, the fit on the subsample is refined on all the datas,
+        starting from its results, which takes a few iterations only. If
+        False, the results of the fit on the subsample are returned, as a
+        fast preview.
+        Default: True
+    budget: float, optional
+        time in seconds after which the fit is interrupted
+        Default: None
+    maxfev: int, optional
+        maximum number of evaluations of the function by curve_fit
+        Default: None
+    cancel: threading.Event, optional
+        event interrupting the fit when set, from another thread
+        Default: None
+
+    Returns
+    ----------
+    popt: numpy.ndarray
+        optimal parameters
+    pcov: numpy.ndarray
+        covariance matrix of popt
+    sigma: numpy.ndarray
+        standard deviation of popt
+
+    Raises
+    ----------
+    FitInterrupted
+        if the fit is cancelled or exceeds its time budget
+    RuntimeError
+        if curve_fit does not converge within maxfev evaluations
+    """
+    # scipy.optimize is slow to import, it is only loaded on first fit
+    from scipy.optimize import curve_fit
+
+    if info is None:
+        info = {}
+    deadline = None if budget is None else time.perf_counter() + budget
+    _check_interrupt(deadline, cancel)
+    if subsample is not None and np.size(x) > subsample:
+        x, y = np.asarray(x), np.asarray(y)
+        sample = stratified_sample(x.size, subsample)
+        sub_info = {}
+        limits = dict(maxfev=maxfev, cancel=cancel)
+        popt, pcov, sigma = fit_arrays(
+            fdef, x[sample], y[sample], p, jac, linear, guess, sub_info, **limits
+        )
+        if polish:
+            if deadline is not None:
+                limits["budget"] = deadline - time.perf_counter()
+            popt, pcov, sigma = fit_arrays(
+                fdef, x, y, popt, jac, linear, False, info, **limits
+            )
+        else:
+            info.update(sub_info)
+        info["subsample"] = dict(sub_info, npts=subsample, polished=polish)
+        return popt, pcov, sigma
+    timings = {}
+    f, p0 = from_fdef(fdef)
+    popt, pcov = None, None
+    if linear:
+        start = time.perf_counter()
+        popt, pcov, ssr = fit_linear(
+            fdef, f, x, y, np.size(p if p is not None else p0), full_output=True
+        )
+        timings["linear"] = time.perf_counter() - start
+    if popt is not None:
+        info.update(
+            method="linear",
+            p0=None,
+            guessed=False,
+            nfev=None,
+            njev=0,
+            cost=0.5 * float(ssr),
+            converged=True,
+            message="Closed-form linear least-squares solution",
+        )
+    else:
+        start = time.perf_counter()
+        guessed = p is None and guess and guess_p(fdef, x, y)
+        timings["guess"] = time.perf_counter() - start
+        if guessed:
+            p = guessed
+        elif p is None:
+            p = p0
+        jacobian = get_jac(fdef) if jac else None
+        model = _TimedModel(f, jacobian, deadline, cancel)
+        options = {} if maxfev is None else {"maxfev": maxfev}
+        start = time.perf_counter()
+        popt, pcov, infodict, mesg, ier = curve_fit(
+            model.f,
+            x,
+            y,
+            p0=p,
+            jac=None if jacobian is None else model.jac,
+            full_output=True,
+            **options,
+        )
+        timings["optimizer"] = time.perf_counter() - start - model.time
+        timings["model"] = model.time
+        fvec = infodict["fvec"]
+        info.update(
+            method="curve_fit",
+            p0=p,
+            guessed=bool(guessed),
+            nfev=infodict["nfev"],
+            njev=infodict.get("njev", model.njev),
+            cost=0.5 * float(fvec @ fvec),
+            converged=ier in (1, 2, 3, 4),
+            message=mesg,
+        )
+    info["timings"] = timings
+    return popt, pcov, np.sqrt(np.diagonal(pcov))
+
+
+def _fit_task(fdef, x, y, p, subsample, polish, budget, maxfev, cancel):
+    # Fits the datas of a Fit, possibly in a worker, and returns the results
+    # with the information on the fit
+    info = {}
+    popt, pcov, sigma = fit_arrays(
+        fdef,
+        x,
+        y,
+        p,
+        info=info,
+        subsample=subsample,
+        polish=polish,
+        budget=budget,
+        maxfev=maxfev,
+        cancel=cancel,
+    )
+    return popt, pcov, sigma, info
+
+
+class FitInterrupted(RuntimeError):
+    """
+    Raised when a fit is cancelled, or exceeds its time budget
+    """
+
+
+def _check_interrupt(deadline, cancel):
+    # Raises FitInterrupted if the deadline (time.perf_counter value) is
+    # exceeded or the cancel event is set
+    if cancel is not None and cancel.is_set():
+        raise FitInterrupted("Fit cancelled")
+    if deadline is not None and time.perf_counter() > deadline:
+        raise FitInterrupted("Fit interrupted: time budget exceeded")
+
+
+class _TimedModel(object):
+    # Wraps a fitting function and its jacobian, to measure the time spent in
+    # their evaluations, and to interrupt the optimizer between two of them
+    def __init__(self, f, jac=None, deadline=None, cancel=None):
+        self._f = f
+        self._jac = jac
+        self._deadline = deadline
+        self._cancel = cancel
+        self.time = 0.0
+        self.njev = 0
+
+    def f(self, x, *p):
+        _check_interrupt(self._deadline, self._cancel)
+        start = time.perf_counter()
+        try:
+            return self._f(x, *p)
+        finally:
+            self.time += time.perf_counter() - start
 
-if "matplotlib.pyplot" in sys.modules:
-    matplotlib.pyplot.switch_backend("Qt5Agg")
-elif "matplotlib.pylab" in sys.modules:
-    matplotlib.pylab.switch_backend("Qt5Agg")
-elif matplotlib.get_backend() != "Qt5Agg":
-    matplotlib.use("Qt5Agg")
-import matplotlib.pyplot as plt  # noqa : E402
+    def jac(self, x, *p):
+        _check_interrupt(self._deadline, self._cancel)
+        start = time.perf_counter()
+        try:
+            return self._jac(x, *p)
+        finally:
+            self.njev += 1
+            self.time += time.perf_counter() - start
 
 
 class Fit(object):
-    def __init__(self, line, fname, xrange=None, p=None):
+    def __init__(
+        self,
+        line,
+        fname,
+        xrange=None,
+        p=None,
+        subsample=None,
+        polish=True,
+        oversample=None,
+    ):
         """
         Class containing all information corresponding to a fitted set of data:
         the xy sets of data, the fitting function, its parameters and their
@@ -29,8 +283,14 @@ class Fit(object):
         Parameters
         ----------
 
-        line: matplotlib.lines.Line2D object
-            matplotlib Line2D object corresponding to the curve to fit
+        line: matplotlib.lines.Line2D object, tuple, str or os.PathLike
+            matplotlib Line2D object corresponding to the curve to fit, or
+            the datas to fit without figure: a (x, y) pair of arrays, or the
+            path of a .npy file, memory mapped (see
+            anafit.core.selection.load_xy). Arrays are used without copy: x
+            and y are read once in full, sequentially, to fingerprint them
+            for the fit cache and check that x is sorted, then only the points
+            in xrange are gathered.
         fname: str
             fitting function name (a key from fitting functions dict)
         xrange: tuple, optional
@@ -39,50 +299,111 @@ class Fit(object):
             if provided, the initialising parameters contained in the string
             definition of the fitting function are ignored and set to p
             Default: None
+        subsample: int, optional
+            if provided, the datas are first fitted on a stratified sample of
+            subsample points, to speed up the fit of large datas (see
+            fit_arrays)
+            Default: None
+        polish: bool, optional
+            if True, the fit on the subsample is refined on all the datas. If
+            False, it is kept as a fast preview.
+            Default: True
+        oversample: int, optional
+            if provided, the fitted function is evaluated on oversample times
+            more points than the plotted ones, which are reduced to the
+            minimum and maximum of the function in each pixel column (see
+            anafit.core.render.minmax_decimate). The confidence range keeps
+            its envelope. Features of the function narrower than a pixel are
+            then drawn.
+            Default: None
 
         """
-        self._lin = line
-        self._xrange = xrange
-        self._fname = fname
-        if self._xrange is None:
-            self._xydata = self._lin.get_xydata()
-        else:
-            self._xydata = np.array(
-                [
-                    xy
-                    for xy in self._lin.get_xydata()
-                    if self._xrange[0] < xy[0] < self._xrange[1]
-                ]
-            )
+        self._lin = line if hasattr(line, "get_xydata") else None
+        self._index = None if self._lin is not None else data_index(line)
         self._popt, self._pcov = None, None
         self._sigma = None
         self._linfit = None
-        self._up = None
-        self._down = None
+        self._xfit = None
+        self._npts = None
         self._linConfidence = None
-        if ";" not in fname:
-            if p is None:
-                fdef = get_func(self._fname)
-                self._f, self._p = from_fdef(fdef)
-            else:
-                fdef = get_func(self._fname)
-                self._f, _ = from_fdef(fdef)
-                self._p = p
-        else:
-            self._f, self._p = from_fdef(fname)
+        self._fitbox = None
+        self._level = 0.95
+        self._prediction = False
+        self._bands = {}
+        self._s2 = None
+        self._info = {}
+        self._stream = None
+        self._watched = None
+        self._accumulator = None
+        self._subsample = subsample
+        self._polish = polish
+        self._oversample = oversample
+        self._nbins = None
+        self._select(xrange)
+        self._set_function(fname, p)
+
+    def _select(self, xrange):
+        # Selects the datas to fit
+        start = time.perf_counter()
+        self._xrange = xrange
+        if self._lin is not None:
+            self._index = range_index(self._lin)
+        self._x, self._y = self._index.select(self._xrange)
+        self._select_time = time.perf_counter() - start
+
+    def _set_function(self, fname, p=None):
+        # Sets the fitting function and its initialising parameters
+        self._fname = fname
+        self._fdef = get_fdef(self._fname)
+        self._f, self._p = from_fdef(self._fdef)
+        self._pGiven = p is not None
+        if p is not None:
+            self._p = p
 
     @property
     def linfit(self):
         return self._linfit
 
+    @property
+    def xfit(self):
+        return self._xfit
+
     @property
     def xrange(self):
         return self._xrange
 
     @xrange.setter
     def xrange(self, xrange):
-        self.__init__(self._lin, self._fname, xrange)
-        self.fit()
+        self._select(xrange)
+        if not self._fit_moments():
+            self.fit()
+
+    def _fit_moments(self):
+        # Fits the straight lines and constants of MOMENT_FITS to the datas of
+        # a line from its cumulative sums, in O(log n) time whatever the
+        # range. Returns False if the fit has to be made as usual.
+        if self._lin is None or builtin_name(self._fdef) not in MOMENT_FITS:
+            return False
+        start = time.perf_counter()
+        moments = self._index.moments(self._xrange)
+        try:
+            popt, pcov, ssr, r2 = fit_moments(self._fdef, moments, full_output=True)
+        except TypeError:
+            return False
+        info = dict(
+            method="moments",
+            p0=None,
+            guessed=False,
+            nfev=0,
+            njev=0,
+            cost=0.5 * float(ssr),
+            converged=True,
+            message="Closed-form linear least-squares solution, from moments",
+            r2=float(r2),
+            timings={"moments": time.perf_counter() - start},
+        )
+        self.set_results((popt, pcov, np.sqrt(np.diagonal(pcov)), info), cache=False)
+        return True
 
     @property
     def fname(self):
@@ -90,17 +411,62 @@ class Fit(object):
 
     @fname.setter
     def fname(self, fname):
-        self.__init__(self._lin, fname, self._xrange)
+        self._set_function(fname)
+        self.fit()
+
+    @property
+    def subsample(self):
+        return self._subsample
+
+    @subsample.setter
+    def subsample(self, subsample):
+        self._subsample = subsample
         self.fit()
 
+    @property
+    def polish(self):
+        return self._polish
+
+    @polish.setter
+    def polish(self, polish):
+        self._polish = polish
+        self.fit()
+
+    @property
+    def oversample(self):
+        return self._oversample
+
+    @oversample.setter
+    def oversample(self, oversample):
+        self._oversample = oversample
+        if self._linfit is not None:
+            self._update_artists()
+            self._draw()
+
     @property
     def xydata(self):
-        return self._xydata
+        return np.column_stack((self._x, self._y))
+
+    @property
+    def xdata(self):
+        return self._x
+
+    @property
+    def ydata(self):
+        return self._y
+
+    @property
+    def fdef(self):
+        return self._fdef
 
     @property
     def f(self):
         return self._f
 
+    @property
+    def jac(self):
+        return get_jac(self._fdef)
+
     @property
     def p(self):
         return self._p
@@ -108,8 +474,17 @@ class Fit(object):
     @p.setter
     def p(self, p):
         self._p = p
+        self._pGiven = True
         self.fit()
 
+    @property
+    def p0(self):
+        return self._info.get("p0")
+
+    @property
+    def info(self):
+        return self._info
+
     @property
     def popt(self):
         return self._popt
@@ -124,674 +499,691 @@ class Fit(object):
 
     @property
     def upConfidence(self):
-        return self._up
+        if self._xfit is None:
+            return None
+        return self.confidence()[1]
 
     @property
     def lowConfidence(self):
-        return self._low
+        if self._xfit is None:
+            return None
+        return self.confidence()[0]
 
-    def fit(self):
-        """
-        Fit the datas contained in self._lin with the function self._fname, in
-        the range self._xrange.
-        """
-        self._popt, self._pcov = curve_fit(
-            self._f, self._xydata[:, 0], self._xydata[:, 1], p0=self._p
-        )
-        self._sigma = np.sqrt(np.diagonal(self._pcov))
+    @property
+    def level(self):
+        return self._level
 
-    def plot(self, showInfo=False, showConf=False):
-        """
-        Plots the fitted datas.
+    @property
+    def prediction(self):
+        return self._prediction
 
-        Parameters
-        ----------
-        showInfo: bool
-            if True, displays a text box containing the fit function and coefficients
-        showConf: bool
-            if True, displays the range of confidence around the fitted curve
-        """
-        linfit = self._lin.axes.plot(
-            self._xydata[:, 0],
-            list(map(lambda x: self._f(x, *self._popt), self._xydata[:, 0])),
-        )
-        self._linfit = linfit[0]
-        self._up = self._f(self._xydata[:, 0], *(self._popt + self._sigma))
-        self._low = self._f(self._xydata[:, 0], *(self._popt - self._sigma))
-        self._linConfidence = self._lin.axes.fill_between(
-            self._xydata[:, 0], self._low, self._up, color="black", alpha=0.15
-        )
-        self._linConfidence.set_visible(showConf)
-        if ";" in self._fname:
-            fdef, _ = self._fname.split(";")
-        else:
-            fdef = self._fname
-            fitInfo = "Fit " + fdef + " :"
-        for coef, err in zip(self._popt, self._sigma):
-            fitInfo = fitInfo + "\n{0:.2f} +/- {1:.2f}".format(coef, err)
-        xmin, xmax = self._lin.axes.get_xlim()
-        dx = xmax - xmin
-        ymin, ymax = self._lin.axes.get_ylim()
-        dy = ymax - ymin
-        xbox = xmin + 0.05 * dx
-        ybox = ymax - 0.2 * dy
-        self._fitbox = self._lin.axes.text(xbox, ybox, fitInfo)
-        self._fitbox.set_visible(showInfo)
+    @property
+    def residual_variance(self):
+        if self._s2 is None and self._popt is not None:
+            dof = max(self._x.size - self._popt.size, 1)
+            if "cost" in self._info:
+                ssr = 2 * self._info["cost"]
+            else:
+                residuals = self._y - evaluate(self._f, self._x, self._popt)
+                ssr = residuals @ residuals
+            self._s2 = ssr / dof
+        return self._s2
 
-    def show_fitInfo(self, disp=False):
+    @property
+    def metrics(self):
         """
-        Displays a text box containing some fit infos on the figure.
-
-        Parameters
-        ----------
-        disp: bool
-            if True, displays the text box, else hides it.
+        Summary of the fit, made of json serializable values, to be logged or
+        collected by fit hooks (see anafit.core.add_fit_hook): the function,
+        the number of fitted points, the results, and the information on the
+        fit (see fit_arrays), including the time spent in each stage:
+        'select' (selection of the datas), 'cache' (lookup of previous
+        results), 'guess', 'linear', 'optimizer', 'model', 'artists'
+        (update of the plotted artists) and 'plot'.
         """
-        self._fitbox.set_visible(disp)
-        plt.draw()
-
-    def show_confidence(self, disp=False):
+        metrics = {
+            "fname": self._fname,
+            "fdef": self._fdef,
+            "npts": int(self._x.size),
+            "xrange": None if self._xrange is None else list(self._xrange),
+        }
+        for key, value in self._info.items():
+            if isinstance(value, np.generic):
+                value = value.item()
+            elif isinstance(value, (list, tuple, np.ndarray)):
+                value = np.asarray(value, dtype=float).tolist()
+            metrics[key] = value
+        metrics["timings"] = dict(self._info.get("timings", {}))
+        if self._popt is not None:
+            metrics["popt"] = self._popt.tolist()
+            metrics["sigma"] = self._sigma.tolist()
+        return metrics
+
+    def confidence(self, level=None, prediction=None, x=None):
         """
-        Displays the range of confidence around the fitted curve.
+        Returns pointwise bounds of the confidence range of the fitted curve,
+        propagating the covariance of the parameters with the jacobian of the
+        fitting function (see anafit.core.bands). Results are cached until
+        the next fit.
 
         Parameters
         ----------
-        disp: bool
-            if True, displays the confidence range, else hides it.
-        """
-        self._linConfidence.set_visible(disp)
-        plt.draw()
+        level: float, optional
+            confidence level, between 0 and 1. If not provided, self.level.
+            Default: None
+        prediction: bool, optional
+            if True, returns the prediction range of a new measure instead of
+            the confidence range of the curve. If not provided,
+            self.prediction.
+            Default: None
+        x: numpy.ndarray, optional
+            x values where to compute the bounds. If not provided, the grid
+            where the fitted curve is plotted.
+            Default: None
 
-    def __repr__(self):
-        xrange = "Xrange : [{0:.1f}, {1:.1f}]".format(
-            np.min(self._xydata[:, 0]), np.max(self._xydata[:, 0])
+        Returns
+        ----------
+        low: numpy.ndarray
+        up: numpy.ndarray
+        """
+        level = self._level if level is None else level
+        prediction = self._prediction if prediction is None else prediction
+        if x is not None:
+            return self._compute_bands(x, level, prediction)
+        key = (level, prediction)
+        if key not in self._bands:
+            self._bands[key] = self._compute_bands(self._xfit, level, prediction)
+        return self._bands[key]
+
+    def _compute_bands(self, x, level, prediction):
+        return bands(
+            self._f,
+            x,
+            self._popt,
+            self._pcov,
+            jac=self.jac,
+            level=level,
+            dof=self._x.size - self._popt.size,
+            s2=self.residual_variance if prediction else None,
         )
-        fit = "Fitting function : " + self._fname
-        init = "Initialising parameters : {0}".format(self._p)
-        coef = "Coeff. : {0}".format(self._popt)
-        uncert = "Uncertainty : {0}".format(self._sigma)
-        return fit + "\n" + xrange + "\n" + init + "\n" + coef + "\n" + uncert + "\n"
 
-
-class DrawLine(object):
-    def __init__(self, fig, show_slope=None):
+    def fit(self, cache=True, budget=None, maxfev=None, cancel=None):
         """
-        Class allowing to draw dynamically a line on a matplotlib plot
+        Fit the datas of self._lin, or the datas given as arrays, with the
+        function self._fname, in the range self._xrange. If no initialising
+        parameters were given, they are estimated from the datas for built-in
+        functions. If the fit is already plotted, its artists are updated.
 
         Parameters
         ----------
 
-        fig: matplotlib.pyplot.figure object
-            the figure window to draw the line in
-        show_slope: float, optional
-            If provided, the line to be drawn will have a slope given by
-            show_slope. If the scale is log-log, this corresponds to the
-            exponent of a power law
+        cache: bool, optional
+            if True, the results of an identical recent fit (same datas,
+            function, range and initialising parameters) are reused from
+            fit_cache, and the results of a new fit are stored in it. The
+            reuse is recorded in self.info['cached'].
+            Default: True
+        budget: float, optional
+            time in seconds after which the fit is interrupted, raising
+            FitInterrupted
+            Default: None
+        maxfev: int, optional
+            maximum number of evaluations of the function by curve_fit
+            Default: None
+        cancel: threading.Event, optional
+            event interrupting the fit when set, from another thread
             Default: None
         """
-        self.b = None
-        self.fig = fig
-        self.ax = fig.gca()
-        self.slope = show_slope
-        self.pt1 = np.array(plt.ginput(1)[0])
-        self.pt2 = None
-        (self.lx,) = self.ax.plot(*self.pt1, "k--")
-        self.cmove = self.fig.canvas.mpl_connect("motion_notify_event", self.mouse_move)
-        self.cclicked = self.fig.canvas.mpl_connect(
-            "button_press_event", self.mouse_clicked
-        )
+        results = self._cached() if cache else None
+        if results is None:
+            results = _fit_task(*self._task(), budget, maxfev, cancel)
+        self.set_results(results, cache)
 
-    def mouse_move(self, event):
+    def submit(self, executor, cache=True, budget=None, maxfev=None, cancel=None):
         """
-        Draws a line following the mouse cursor or a given slope when the mouse
-        is moved in the figure window
+        Starts the fit in an executor, so that it does not block the calling
+        thread. The results are not applied to the fit: the returned future
+        gives them, to be passed to self.set_results in the thread owning the
+        figure. See self.fit for the parameters.
 
         Parameters
         ----------
 
-        event: matplotlib mouse motion_notify_event
+        executor: concurrent.futures.Executor
+            executor running the fit. With a process pool, cancel can not be
+            used, as events can not be sent to processes.
 
+        Returns
+        ----------
+        concurrent.futures.Future
+            future of the results (popt, pcov, sigma, info). It is already
+            done if the results were found in fit_cache.
         """
-        if not event.inaxes:
-            return
-        x = event.xdata
-        if self.slope is None:
-            y = event.ydata
-        else:
-            if self.ax.get_xscale() == "log" and self.ax.get_yscale() == "log":
-                y = (
-                    np.exp(np.log(self.pt1[1]) - self.slope * np.log(self.pt1[0]))
-                    * x**self.slope
-                )
-            else:
-                y = self.slope * (x - self.pt1[0]) + self.pt1[1]
-        self.lx.set_ydata([self.pt1[1], y])
-        self.lx.set_xdata([self.pt1[0], x])
-        self.fig.canvas.draw()
-
-    def mouse_clicked(self, event):
+        results = self._cached() if cache else None
+        if results is not None:
+            future = Future()
+            future.set_result(results)
+            return future
+        return executor.submit(_fit_task, *self._task(), budget, maxfev, cancel)
+
+    def fit_chunks(self, chunk_size=None, log=False, executor=None, max_workers=None):
         """
-        Terminates the line drawing to a clicked point in the figure window
+        Fits the datas by chunks, in bounded memory, for functions linear in
+        their parameters: see anafit.core.streaming.fit_chunks. Suited to
+        memory-mapped datas larger than the memory. The results are not
+        stored in fit_cache.
 
         Parameters
         ----------
 
-        event: matplotlib mouse button_press_event
-
-        """
-        if not event.inaxes:
-            return
-        if self.slope is None:
-            self.pt2 = [event.xdata, event.ydata]
-        else:
-            if self.ax.get_xscale() == "log" and self.ax.get_yscale() == "log":
-                self.pt2 = [
-                    event.xdata,
-                    np.exp(np.log(self.pt1[1]) - self.slope * np.log(self.pt1[0]))
-                    * event.xdata**self.slope,
-                ]
-            else:
-                self.pt2 = [
-                    event.xdata,
-                    self.slope * (event.xdata - self.pt1[0]) + self.pt1[1],
-                ]
-        self.get_slope()
-        self.lx.set_xdata([self.pt1[0], self.pt2[0]])
-        self.lx.set_ydata([self.pt1[1], self.pt2[1]])
-        self.fig.canvas.draw()
-        self.fig.canvas.mpl_disconnect(self.cmove)
-        self.fig.canvas.mpl_disconnect(self.cclicked)
-
-    def get_slope(self):
-        """
-        Returns parameters corresponding to a drawn line on the figure window.
-        If scale is lin-lin, returns a and b from y = ax+b line definition.
-        If scale is log-log, returns n and a from y = ax^n line definition.
+        chunk_size: int, optional
+            number of points of the chunks.
+            Default: None (anafit.core.streaming.CHUNK_POINTS)
+        log, executor, max_workers:
+            see anafit.core.streaming.fit_chunks
 
-        Returns
+        Raises
         ----------
-        slope: float
-            slope or power law exponent
-        b: float
-            origin value or power law prefactor
-
+        ValueError
+            if the function is not linear in its parameters
         """
-        if self.slope is None:
-            if self.ax.get_xscale() == "log" and self.ax.get_yscale() == "log":
-                num = np.log(self.pt2[1]) - np.log(self.pt1[1])
-                denom = np.log(self.pt2[0]) - np.log(self.pt1[0])
-                self.slope = num / denom
-            else:
-                num = self.pt2[1] - self.pt1[1]
-                self.slope = num / (self.pt2[0] - self.pt1[0])
-        if self.ax.get_xscale() == "log" and self.ax.get_yscale() == "log":
-            self.b = np.exp(np.log(self.pt2[1]) - self.slope * np.log(self.pt2[0]))
-        else:
-            if self.pt1[0] < self.pt2[0]:
-                self.b = self.pt1[1] - self.slope * self.pt1[0]
-            else:
-                self.b = self.pt2[1] - self.slope * self.pt2[0]
-        return self.slope, self.b
-
-    def __repr__(self):
-        if self.ax.get_xscale() == "log" and self.ax.get_yscale() == "log":
-            lstr = "Line a*x^n : a = {0:.1f} , n = {1:.1f} \n".format(
-                self.b, self.slope
-            )
-        else:
-            lstr = "Line a*x+b : a = {0:.1f} , b = {1:.1f} \n".format(
-                self.slope, self.b
-            )
-        return lstr
+        from .streaming import CHUNK_POINTS, fit_chunks, iter_chunks
 
+        info = {}
+        chunks = iter_chunks((self._x, self._y), chunk_size=chunk_size or CHUNK_POINTS)
+        popt, pcov, sigma = fit_chunks(
+            self._fdef, chunks, log, executor, max_workers, info=info
+        )
+        self.set_results((popt, pcov, sigma, info), cache=False)
 
-class Figure(Ui_Fit):
-    def __init__(self, fig=None):
+    def set_results(self, results, cache=True):
         """
-        Class constructing the anafit menu and includes it in the toolbar of a
-        matplotlib.pyplot.figure
+        Applies the results of a fit computed by self.submit: stores them,
+        updates the artists of the fit if it is plotted, and calls the hooks
 
         Parameters
         ----------
 
-        fig: matplotlib.pyplot.figure object
-            the figure window where to include anafit. If not provided, the
-            current figure is used (plt.gcf())
-            Default: None
+        results: tuple
+            (popt, pcov, sigma, info), as given by the future of self.submit
+        cache: bool, optional
+            if True, new results are stored in fit_cache
+            Default: True
         """
-        if fig is None:
-            fig = plt.gcf()
-        self._fig = fig
-        if not fig.axes:
-            raise ValueError("Needs an axis before fitting")
-        if not fig.axes[0].lines:
-            raise ValueError("Needs some points before fitting")
-        super().__init__()
-        self._ax = fig.axes
-        self._dictlin = {
-            (str(lin.get_color()) + lin.get_marker() + lin.get_linestyle()): lin
-            for axe in self._ax
-            for lin in axe.get_lines()
-        }
-        self._currentLine = (
-            str(self._ax[0].lines[0].get_color())
-            + self._ax[0].lines[0].get_marker()
-            + self._ax[0].lines[0].get_linestyle()
-        )
-        self._fits = []
-        self._lastFit = None
-        self._lastLine = None
-        self._xrange = None
-        self._lines = []
-
-        toolbar = self._fig.canvas.toolbar
-        toolbar.addWidget(self.button)
-
-        # Populating the datasets
-        for lin, linval in self._dictlin.items():
-            strlin = str_line(linval)
-            self.dataAction[lin] = QtWidgets.QAction(strlin, self.datasetMenu)
-            self.dataAction[lin].triggered.connect(
-                functools.partial(self.set_current_line, lin)
-            )
-            self.datasetMenu.insertAction(self.datasetSep, self.dataAction[lin])
-            self.dataAction[lin].setCheckable(True)
-            self.dataActionIcon[lin] = QtGui.QPixmap(100, 100)
-            self.dataActionIcon[lin].fill(
-                QtGui.QColor(
-                    *list(
-                        map(
-                            int,
-                            255
-                            * np.array(
-                                matplotlib.colors.to_rgb(linval.get_color()),
-                                dtype=float,
-                            ),
-                        )
-                    )
+        self._popt, self._pcov, self._sigma, self._info = results
+        if not self._info.get("cached"):
+            if cache:
+                fit_cache.put(
+                    self._cache_key(), self._popt, self._pcov, self._sigma, self._info
                 )
-            )
-            self.dataAction[lin].setIcon(QtGui.QIcon(self.dataActionIcon[lin]))
-        self.dataAction[self._currentLine].setChecked(True)
-
-        # Populating linear fits
-        for fname in get_func(typefunc="linear").keys():
-            self.linearFitMenu.addAction(fname, functools.partial(self.fit, fname))
-
-        # Populating power fits
-        for fname in get_func(typefunc="power").keys():
-            self.powerFitMenu.addAction(fname, functools.partial(self.fit, fname))
-
-        # Populating exp fits
-        for fname in get_func(typefunc="exp").keys():
-            self.expFitMenu.addAction(fname, functools.partial(self.fit, fname))
-
-        # Populating custom fits
-        for fname in get_func(typefunc="custom").keys():
-            self.showCustomFitActions[fname] = QtWidgets.QAction(
-                fname, self.showCustomFitActionGroup
-            )
-            self.showCustomFitActions[fname].triggered.connect(
-                functools.partial(self.fit, fname)
-            )
-            self.showCustomFitActionGroup.addAction(self.showCustomFitActions[fname])
-        self.showFitMenu.insertActions(
-            self.showFitSep, self.showCustomFitActionGroup.actions()
+            self._info["cached"] = False
+        if self._stream is not None:
+            self._watch()
+        self._fitted()
+
+    def _cache_key(self):
+        bounds = None
+        if self._xrange is not None:
+            bounds = self._index.bounds(self._xrange)
+        return fit_key(
+            self._index.fingerprint,
+            self._fdef,
+            bounds,
+            self._p if self._pGiven else None,
+            self._subsample,
+            self._polish,
         )
 
-        for fname in get_func(typefunc="custom").keys():
-            self.editFitActions[fname] = QtWidgets.QAction(
-                fname, self.editFitActionGroup
-            )
-            self.editFitActions[fname].triggered.connect(
-                functools.partial(self.edit_fit, fname)
-            )
-            self.editFitActionGroup.addAction(self.editFitActions[fname])
-        self.editFitMenu.insertActions(
-            self.editFitSep, self.editFitActionGroup.actions()
-        )
+    def _cached(self):
+        # Returns the results of an identical fit from fit_cache, or None
+        start = time.perf_counter()
+        results = fit_cache.get(self._cache_key())
+        if results is not None:
+            results[3]["cached"] = True
+            results[3]["timings"] = {"cache": time.perf_counter() - start}
+        return results
+
+    def _task(self):
+        # Returns the arguments of _fit_task for the current datas
+        x, y = self._x, self._y
+        if self._subsample is not None and self._xrange is None:
+            # the sample is stratified along x
+            x, y = self._index.sorted_x, self._index.sorted_y
+        p = self._p if self._pGiven else None
+        return self._fdef, x, y, p, self._subsample, self._polish
+
+    def _fitted(self):
+        # Drops the results depending on the previous fit, updates the artists
+        # of the fit if it is plotted, and calls the hooks
+        self._info["timings"]["select"] = self._select_time
+        self._bands = {}
+        self._s2 = None
+        if self._linfit is not None:
+            start = time.perf_counter()
+            self._update_artists()
+            self._draw()
+            self._info["timings"]["artists"] = time.perf_counter() - start
+        run_fit_hooks(self, "fit")
 
     @property
-    def fig(self):
-        return self._fig
+    def streaming(self):
+        return self._stream is not None
 
-    @fig.setter
-    def fig(self, fig):
-        self._fig = fig
-
-    @property
-    def current_line(self):
-        return self._currentLine
-
-    @current_line.setter
-    def current_line(self, lin):
-        for key in self._dictlin.keys():
-            self.dataAction[key].setChecked(False)
-        self.dataAction[lin].setChecked(True)
-        self._currentLine = lin
-
-    def set_current_line(self, lin):
+    def stream(self, rate=STREAM_RATE):
         """
-        Another setter for the current dataset. Used as a slot for the dataset
-        selection menu's actions
+        Starts watching the datas of self._lin, typically for a live
+        acquisition appending points with set_data. The line is checked rate
+        times per second, and fitted again if its datas changed (see update):
+        all the changes made in between are merged into one fit.
 
         Parameters
         ----------
 
-        lin: matplotlib.pyplot.line object
-            the dataset line object
-        """
-        self.current_line = lin
-
-    @property
-    def last_fit(self):
-        return self._lastFit
-
-    @property
-    def fits(self):
-        return self._fits
-
-    def undo_fit(self):
-        """
-        Slot to undo the last fit.
-        Note that it does not affect the fit history !
-        """
-        if len(self.fits) == 0:
-            return
-        self.fits[-1].linfit.remove()
-        self.fits[-1].show_fitInfo(False)
-        self.fits[-1].show_confidence(False)
-        del self._fits[-1]
-        try:
-            self._lastFit = self._fits[-1]
-            self._lastFit.show_fitInfo(self.showFitInfoAction.isChecked())
-        except IndexError:
-            self._lastFit = None
-        self.fig.canvas.draw()
-
-    def remove_all_fit(self):
-        """
-        Slot to remove all fit. Also deletes the fit history !
+        rate: float, optional
+            maximum number of fits per second
+            Default: STREAM_RATE
         """
-        for f in self.fits:
-            f.linfit.remove()
-            f.show_confidence(False)
-            f.show_fitInfo(False)
-        self._fits = []
-        self._lastFit = None
-        self.fig.canvas.draw()
-
-    def refresh_dataset(self):
+        if self._lin is None:
+            raise TypeError("Only the datas of a matplotlib line can be streamed")
+        self.stop_stream()
+        if self._popt is None:
+            self.fit()
+        self._watch()
+        timer = self._lin.figure.canvas.new_timer(interval=max(1, int(1000 / rate)))
+        timer.add_callback(self._poll)
+        timer.start()
+        self._stream = timer
+
+    def _poll(self):
+        # Timer callback: matplotlib unregisters callbacks returning False
+        self.update()
+
+    def stop_stream(self):
         """
-        Slot to refresh dataset menu, for instance if a new plot has been added
-        after anafit.Figure() called
+        Stops watching the datas of self._lin
         """
-        newlin = {
-            (str(lin.get_color()) + lin.get_marker() + lin.get_linestyle()): lin
-            for axe in self._ax
-            for lin in axe.get_lines()
-        }
-        for lin in set(newlin.keys()).difference(self._dictlin.keys()):
-            strlin = str_line(newlin[lin])
-            self.dataAction[lin] = QtWidgets.QAction(strlin, self.datasetMenu)
-            self.dataAction[lin].triggered.connect(
-                functools.partial(self.set_current_line, lin)
-            )
-            self.datasetMenu.insertAction(self.datasetSep, self.dataAction[lin])
-            self.dataAction[lin].setCheckable(True)
-            self.dataActionIcon[lin] = QtGui.QPixmap(100, 100)
-            self.dataActionIcon[lin].fill(
-                QtGui.QColor(
-                    *list(
-                        map(
-                            int,
-                            255
-                            * np.array(
-                                matplotlib.colors.to_rgb(
-                                    self._dictlin[lin].get_color()
-                                ),
-                                dtype=float,
-                            ),
-                        )
-                    )
-                )
-            )
-            self.dataAction[lin].setIcon(QtGui.QIcon(self.dataActionIcon[lin]))
-        for lin in set(self._dictlin.keys()).difference(newlin.keys()):
-            self.datasetMenu.removeAction(self.dataAction[lin])
-            del self.dataAction[lin]
-            del self.dataActionIcon[lin]
-        self._dictlin = newlin
-        for key in self._dictlin.keys():
-            self.dataAction[key].setChecked(False)
-        self._currentLine = (
-            str(self._ax[0].lines[0].get_color())
-            + self._ax[0].lines[0].get_marker()
-            + self._ax[0].lines[0].get_linestyle()
+        if self._stream is not None:
+            self._stream.stop()
+        self._stream = None
+
+    def _watch(self):
+        # Records the datas currently fitted, to detect appended points, and
+        # the sufficient statistics of the fit for functions linear in their
+        # parameters
+        self._watched = self._watched_points(self._lin.get_xydata())
+        self._accumulator = linear_accumulator(
+            self._fdef, self._f, self._x, self._y, np.size(self._p)
         )
-        self.dataAction[self._currentLine].setChecked(True)
 
-    def define_range(self):
+    @staticmethod
+    def _watched_points(xy):
+        # Returns the number of points of xy, and up to WATCHED_POINTS of its
+        # points evenly spaced from the first to the last one, with their
+        # indices
+        n = len(xy)
+        indices = np.unique(np.linspace(0, n - 1, min(n, WATCHED_POINTS)).astype(int))
+        return n, indices, xy[indices].copy()
+
+    def _appended(self, xy):
+        # Returns the points appended to the watched datas, or None if the
+        # datas were changed otherwise. The watched points only are compared:
+        # all of them for datas of up to WATCHED_POINTS points, so that an
+        # edit between two watched points of larger datas goes unnoticed
+        n, indices, points = self._watched
+        if n == 0 or len(xy) < n:
+            return None
+        if not np.array_equal(xy[indices], points):
+            return None
+        return xy[n:]
+
+    def update(self):
         """
-        Slot to display a dialog asking the user for a tuple corresponding to
-        the xrange to consider for fitting
+        Fits again the datas of self._lin if they changed since the last fit.
+        The fit starts from the previous optimal parameters. For functions
+        linear in their parameters, appended points are added to the
+        sufficient statistics of the previous fit, so that the cost of the
+        update only depends on the number of new points. The datas are assumed
+        to be only appended to if the previous points are unchanged: they are
+        all compared for datas of up to WATCHED_POINTS points, but only
+        WATCHED_POINTS of them, evenly spaced, for larger datas. Otherwise,
+        all the datas are fitted again.
+
+        Returns
+        ----------
+        bool
+            True if the datas changed and were fitted again. Datas given as
+            arrays are never considered changed.
         """
-        xrange, ok = QtWidgets.QInputDialog.getText(
-            self.showFitMenu, "Enter the x-range where to fit", "ex: (10, 100) :"
-        )
-        if ok:
-            self._xrange = eval(xrange)
-            self.rangeAction.setText(
-                "Current : ({0:.1f}, {1:.1f})".format(*self._xrange)
+        if self._lin is None:
+            return False
+        index = range_index(self._lin)
+        if index is self._index:
+            return False
+        new = None
+        if self._watched is not None and self._accumulator is not None:
+            new = self._appended(self._lin.get_xydata())
+        self._select(self._xrange)
+        start = time.perf_counter()
+        if new is not None:
+            x, y = new[:, 0], new[:, 1]
+            if self._xrange is not None:
+                keep = (x > self._xrange[0]) & (x < self._xrange[1])
+                x, y = x[keep], y[keep]
+            try:
+                self._accumulator.add(x, y)
+            except ArithmeticError:
+                new = None
+        if new is not None:
+            self._popt, self._pcov, ssr = self._accumulator.solve(full_output=True)
+            self._sigma = np.sqrt(np.diagonal(self._pcov))
+            self._info = dict(
+                method="linear",
+                p0=None,
+                guessed=False,
+                nfev=None,
+                njev=0,
+                cost=0.5 * float(ssr),
+                converged=True,
+                message="Closed-form linear least-squares solution",
+                incremental=True,
+                npts_added=x.size,
+                timings={"linear": time.perf_counter() - start},
             )
+            self._watched = self._watched_points(self._lin.get_xydata())
         else:
-            pass
-
-    def define_roi(self):
-        """
-        Slot to define the x-fitting range graphically, by selecting two points
+            self._warm_fit()
+            self._watch()
+        self._fitted()
+        return True
+
+    def _warm_fit(self):
+        # Fits self._x, self._y starting from the previous optimal parameters,
+        # or as usual if the fit does not converge from them
+        self._info = {}
+        p = self._p if self._pGiven else None
+        try:
+            results = fit_arrays(
+                self._fdef, self._x, self._y, self._popt, info=self._info
+            )
+            self._info["warm_start"] = True
+        except RuntimeError:
+            results = fit_arrays(self._fdef, self._x, self._y, p, info=self._info)
+            self._info["warm_start"] = False
+        self._popt, self._pcov, self._sigma = results
+        self._info["incremental"] = False
+
+    def guess_savings(self):
         """
-        pts = plt.ginput(2, show_clicks=True)
-        if pts[0][0] < pts[1][0]:
-            self._xrange = (pts[0][0], pts[1][0])
-        else:
-            self._xrange = (pts[1][0], pts[0][0])
-        self.rangeAction.setText("Current : ({0:.1f}, {1:.1f})".format(*self._xrange))
+        Fits again the datas from the initialising parameters of the function
+        definition, and returns how many function evaluations the estimated
+        initialising parameters saved. The result is also stored in
+        self.info['nfev_saved'].
 
-    def reset_range(self):
+        Returns
+        ----------
+        int or None
+            0 if no initialising parameters were estimated, None if the fit
+            does not converge without them
         """
-        Slot to reset the xr-fitting range, therefore using the full range
+        saved = 0
+        if self._info.get("guessed"):
+            info = {}
+            try:
+                fit_arrays(self._fdef, self._x, self._y, guess=False, info=info)
+                saved = info["nfev"] - self._info["nfev"]
+            except RuntimeError:
+                saved = None
+        self._info["nfev_saved"] = saved
+        return saved
+
+    def bootstrap(
+        self,
+        nboot=1000,
+        method="residuals",
+        level=None,
+        seed=None,
+        executor="process",
+        max_workers=None,
+        budget=None,
+    ):
         """
-        self._xrange = None
-        self.rangeAction.setText("Current : full")
+        Estimates the uncertainty of the fitted parameters by fitting again
+        resamples of the datas (see anafit.core.bootstrap.bootstrap), fitting
+        the datas first if needed. A summary of the results is also stored in
+        self.info['bootstrap'].
 
-    def fit(self, strfunc):
-        """
-        Fit the selected dataset by the function of name strfunc. Uses
-        scipy.optimize.curve_fit. Print fitting infos in command line.
         Parameters
         ----------
 
-        strfunc: str
-            function name (a key from fitting functions dict)
-        """
-        try:
-            self._fits[-1].show_fitInfo(False)
-        except IndexError:
-            pass
-
-        new_fit = Fit(self._dictlin[self._currentLine], strfunc, self._xrange)
-        new_fit.fit()
-        self._fits.append(new_fit)
-        self._lastFit = self._fits[-1]
-        self._lastFit.plot(
-            self.showFitInfoAction.isChecked(), self.showConfidenceAction.isChecked()
-        )
-        print(self._lastFit)
-        self.fig.canvas.draw()
+        nboot: int, optional
+            number of resamples
+            Default: 1000
+        method: str, optional
+            'residuals' or 'pairs'
+            Default: 'residuals'
+        level: float, optional
+            confidence level of the percentile intervals. If not provided,
+            self.level.
+            Default: None
+        seed: int, optional
+            seed of the random generator, for reproducible results
+            Default: None
+        executor: str or concurrent.futures.Executor, optional
+            'thread', 'process' or an executor to fit the resamples in, for
+            functions that are not linear in their parameters
+            Default: 'process'
+        max_workers: int, optional
+            number of workers of the pool
+            Default: None
+        budget: float, optional
+            time in seconds after which no new resample is fitted
+            Default: None
 
-    def other_fit(self):
-        """
-        Slot to fit the current selected dataset by a function asked to the
-        user through a dialog
+        Returns
+        ----------
+        BootstrapResult
         """
-        fdef, ok = QtWidgets.QInputDialog.getText(
-            self.showFitMenu,
-            "Enter your fitting function",
-            "ex: lambda x, a, b : a*x+b ; (1, 0.1) :",
+        from .bootstrap import bootstrap
+
+        if self._popt is None:
+            self.fit()
+        result = bootstrap(
+            self._fdef,
+            self._x,
+            self._y,
+            self._popt,
+            nboot=nboot,
+            method=method,
+            level=self._level if level is None else level,
+            seed=seed,
+            executor=executor,
+            max_workers=max_workers,
+            budget=budget,
         )
-        if ok:
-            self.fit(fdef)
-        else:
-            pass
+        self._info["bootstrap"] = result.summary()
+        return result
 
-    def edit_fit(self, fname):
+    def plot(self, showInfo=False, showConf=False, npts=None, ax=None):
         """
-        Slot to edit an already defined custom fitting function
+        Plots the fitted datas. The fitted function is evaluated on a regular
+        grid spanning the fitted range, in the scale of the x axis. The
+        confidence range and the text box are only created when first shown.
+        Plotting again a plotted fit updates its artists.
 
         Parameters
         ----------
-
-        fname: str
-            function name (a key from fitting functions dict)
-        """
-        efDialog = QtWidgets.QDialog()
-        editFitDialog = CustomFitDialog(efDialog, fname)
-        efDialog.show()
-        if efDialog.exec_() == QtWidgets.QDialog.Accepted:
-            customlist = get_func(typefunc="custom")
-            del customlist[fname]
-            self.showFitMenu.removeAction(self.showCustomFitActions[fname])
-            self.editFitMenu.removeAction(self.editFitActions[fname])
-            customlist[editFitDialog.fname] = editFitDialog.fdef
-            save_customlist(customlist)
-            self.add_fit_in_menu(editFitDialog.fname)
+        showInfo: bool
+            if True, displays a text box containing the fit function and coefficients
+        showConf: bool
+            if True, displays the range of confidence around the fitted curve
+        npts: int, optional
+            number of points of the grid. If not provided, it matches the
+            width of the axes in pixels.
+            Default: None
+        ax: matplotlib.axes.Axes object, optional
+            axes where the fit is first plotted. If not provided, the axes of
+            self._lin, or the current axes of pyplot for datas given as
+            arrays.
+            Default: None
+        """
+        start = time.perf_counter()
+        self._npts = npts
+        if self._linfit is None:
+            if ax is None and self._lin is not None:
+                ax = self._lin.axes
+            elif ax is None:
+                import matplotlib.pyplot as plt
+
+                ax = plt.gca()
+            (self._linfit,) = ax.plot([], [])
+        self._update_artists()
+        self._show(self._linConfidence, showConf, self._plot_confidence)
+        self._show(self._fitbox, showInfo, self._plot_fitInfo)
+        self._info.setdefault("timings", {})["plot"] = time.perf_counter() - start
+        run_fit_hooks(self, "plot")
+
+    def _update_artists(self):
+        # Updates the plotted artists with the current fit results
+        self._xfit = render_grid(self._axes, self._x, self._npts)
+        if self._oversample:
+            self._nbins = self._xfit.size
+            self._xfit = render_grid(
+                self._axes, self._x, self._nbins * self._oversample
+            )
+        yfit = evaluate(self._f, self._xfit, self._popt)
+        if self._oversample:
+            self._linfit.set_data(*minmax_decimate(self._xfit, yfit, self._nbins))
         else:
-            pass
+            self._linfit.set_data(self._xfit, yfit)
+        self._bands = {}
+        if self._linConfidence is not None:
+            self._linConfidence.set_verts([self._confidence_polygon()])
+        if self._fitbox is not None:
+            self._fitbox.set_text(self._fitInfo())
 
-    def new_fit(self):
-        """
-        Slot to define a new custom fitting function that will be saved in
-        customFit.txt
-        """
-        cfDialog = QtWidgets.QDialog()
-        customFitDialog = CustomFitDialog(cfDialog)
-        cfDialog.show()
-        if cfDialog.exec_() == QtWidgets.QDialog.Accepted:
-            customlist = get_func(typefunc="custom")
-            customlist[customFitDialog.fname] = customFitDialog.fdef
-            save_customlist(customlist)
-            self.add_fit_in_menu(customFitDialog.fname)
+    @property
+    def _axes(self):
+        # Axes of the fit artists, which are the axes of self._lin unless the
+        # fit of datas given as arrays was plotted elsewhere
+        if self._linfit is not None:
+            return self._linfit.axes
+        if self._lin is None:
+            raise ValueError("The fit of datas given as arrays must be plotted first")
+        return self._lin.axes
+
+    def _draw(self):
+        # Redraws the figure of the fit, if any
+        if self._linfit is not None or self._lin is not None:
+            self._axes.figure.canvas.draw_idle()
+
+    def _show(self, artist, disp, create):
+        # Shows or hides an artist, creating it when first shown
+        if artist is None:
+            if disp:
+                create()
         else:
-            pass
+            artist.set_visible(disp)
+
+    def _confidence_range(self):
+        # Returns the plotted confidence range, reduced to its envelope in
+        # each pixel column if the function is oversampled
+        x, low, up = self._xfit, self.lowConfidence, self.upConfidence
+        if self._oversample:
+            x, low, up = envelope(x, low, up, self._nbins)
+        return x, low, up
+
+    def _confidence_polygon(self):
+        # Returns the vertices of the polygon filling the confidence range
+        xfit, low, up = self._confidence_range()
+        x = np.concatenate((xfit, xfit[::-1]))
+        y = np.concatenate((low, up[::-1]))
+        return np.column_stack((x, y))
+
+    def _plot_confidence(self):
+        self._linConfidence = self._axes.fill_between(
+            *self._confidence_range(), color="black", alpha=0.15
+        )
 
-    def reset_fit(self):
-        """
-        Slot to delete all custom fitting functions and refresh the Show Fit
-        menu and Edit User Fit menu
-        """
-        fits = set(self.showCustomFitActions.keys()).difference(["a(x-b)^2"])
-        for k in fits:
-            self.showFitMenu.removeAction(self.showCustomFitActions[k])
-        for k in set(self.editFitActions.keys()).difference(["a(x-b)^2"]):
-            self.editFitMenu.removeAction(self.editFitActions[k])
-        self.add_fit_in_menu("a(x-b)^2")
-        customlist = {"a(x-b)^2": "lambda x, a, b : a*(x-b)**2 ; (1, 1)"}
-        save_customlist(customlist)
+    def _fitInfo(self):
+        # Returns the text of the fit info box
+        if ";" in self._fname:
+            fdef, _ = self._fname.split(";")
+        else:
+            fdef = self._fname
+        fitInfo = "Fit " + fdef + " :"
+        for coef, err in zip(self._popt, self._sigma):
+            fitInfo = fitInfo + "\n{0:.2f} +/- {1:.2f}".format(coef, err)
+        return fitInfo
 
-    def draw_line(self):
-        """
-        Slot to dynamically draw a line on the figure window
-        """
-        dlin = DrawLine(self._fig)
-        self._lastLine = dlin
-        self._lines.append(dlin)
+    def _plot_fitInfo(self):
+        xmin, xmax = self._axes.get_xlim()
+        dx = xmax - xmin
+        ymin, ymax = self._axes.get_ylim()
+        dy = ymax - ymin
+        xbox = xmin + 0.05 * dx
+        ybox = ymax - 0.2 * dy
+        self._fitbox = self._axes.text(xbox, ybox, self._fitInfo())
 
-    def undo_line(self):
-        """
-        Slot to remove the last drawn line
+    def show_fitInfo(self, disp=False):
         """
-        if self._lines:
-            self._lines[-1].lx.remove()
-            self._lines.pop()
-            try:
-                self._lastLine = self._lines[-1]
-            except IndexError:
-                self._lastLine = None
-
-            self.fig.canvas.draw()
+        Displays a text box containing some fit infos on the figure.
 
-    def remove_all_lines(self):
-        """
-        Slot to remove all drawn lines.
-        CURRENTLY NOT USED
+        Parameters
+        ----------
+        disp: bool
+            if True, displays the text box, else hides it.
         """
-        for lin in self._lines:
-            lin.lx.remove()
-        self._lines = []
-        self._lastLine = None
-        self.fig.canvas.draw()
+        self._show(self._fitbox, disp, self._plot_fitInfo)
+        self._draw()
 
-    def get_slope(self):
+    def show_confidence(self, disp=False, level=None, prediction=None):
         """
-        Slot to get the slope of the last drawn line.
-        If scale is lin-lin, print a and b from y = ax+b line definition.
-        If scale is log-log, print n and a from y = ax^n line definition.
-        """
-        if len(self._lines) > 0:
-            print(self._lines[-1])
-        else:
-            pass
+        Displays the range of confidence around the fitted curve. It is only
+        computed when first displayed.
 
-    def show_slope(self):
-        """
-        Slot to draw a line corresponding to a given slope if scale is lin-lin,
-        or to a given exponent if scale is log-log.
+        Parameters
+        ----------
+        disp: bool
+            if True, displays the confidence range, else hides it.
+        level: float, optional
+            if provided, changes the confidence level, between 0 and 1.
+            Default: None (0.95 initially)
+        prediction: bool, optional
+            if provided, displays the prediction range of a new measure (True)
+            or the confidence range of the fitted curve (False).
+            Default: None (False initially)
         """
-        slope, ok = QtWidgets.QInputDialog.getText(
-            self.menu, "Enter the slope to show", "ex: -1"
-        )
-        if ok:
-            lin = DrawLine(self._fig, show_slope=float(slope))
-            self._lines.append(lin)
-            self._lastLine = lin
-        else:
-            pass
-
-    def show_fitInfo(self):
+        if level is not None:
+            self._level = level
+        if prediction is not None:
+            self._prediction = prediction
+        if self._linConfidence is not None and (
+            level is not None or prediction is not None
+        ):
+            self._linConfidence.set_verts([self._confidence_polygon()])
+        self._show(self._linConfidence, disp, self._plot_confidence)
+        self._draw()
+
+    def remove(self):
         """
-        Slot to show a text box containing some fit infos of the last fit.
+        Removes all the artists of the fit from the figure
         """
-        if self._lastFit is None:
-            return
+        self.stop_stream()
+        figure = None if self._linfit is None else self._linfit.figure
+        for artist in (self._linfit, self._linConfidence, self._fitbox):
+            if artist is not None:
+                artist.remove()
+        self._linfit, self._linConfidence, self._fitbox = None, None, None
+        if figure is not None:
+            figure.canvas.draw_idle()
         else:
-            self._lastFit.show_fitInfo(self.showFitInfoAction.isChecked())
+            self._draw()
 
-    def show_confidence(self):
-        """
-        Slot to plot the range of confidence around fitting curves.
-        """
-        for f in self._fits:
-            f.show_confidence(self.showConfidenceAction.isChecked())
-
-
-if __name__ == "__main__":
-    plt.ion()
-    my_fig = plt.figure()
-    ax = my_fig.add_subplot(111)
-    (my_line,) = ax.plot(
-        np.arange(0, 100, 1),
-        np.arange(50, 250, 2) + 10 * (np.random.rand(100) - 1 / 2),
-        "b+",
-    )
-    ax.plot(
-        np.arange(0, 100, 1),
-        np.arange(0, 300, 3) + 30 * (np.random.rand(100) - 1 / 2),
-        "rx",
-    )
-    ax.plot(
-        np.arange(0, 100, 1),
-        np.square(np.arange(0, 10, 0.1)) + 5 * (np.random.rand(100) - 1 / 2),
-        "k.",
-    )
-    test = Figure(my_fig)
+    def __repr__(self):
+        xrange = "Xrange : [{0:.1f}, {1:.1f}]".format(
+            np.min(self._x), np.max(self._x)
+        )
+        fit = "Fitting function : " + self._fname
+        init = "Initialising parameters : {0}".format(self._p)
+        coef = "Coeff. : {0}".format(self._popt)
+        uncert = "Uncertainty : {0}".format(self._sigma)
+        return fit + "\n" + xrange + "\n" + init + "\n" + coef + "\n" + uncert + "\n"
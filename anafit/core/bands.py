@@ -0,0 +1,111 @@
+import numpy as np
+
+from .render import evaluate
+
+
+def numerical_jac(f, x, p):
+    """
+    Returns the (len(x), len(p)) array of the derivatives of f(x, *p) with
+    respect to p, estimated by central finite differences
+
+    Parameters
+    ----------
+
+    f: function
+        function of type f(x, *p)
+    x: numpy.ndarray
+        1D array of x values
+    p: numpy.ndarray
+        parameters of f
+
+    Returns
+    ----------
+    numpy.ndarray
+    """
+    p = np.asarray(p, dtype=float)
+    jac = np.empty((np.size(x), p.size))
+    for i in range(p.size):
+        h = np.sqrt(np.finfo(float).eps) * max(abs(p[i]), 1)
+        dp = np.zeros(p.size)
+        dp[i] = h
+        jac[:, i] = (evaluate(f, x, p + dp) - evaluate(f, x, p - dp)) / (2 * h)
+    return jac
+
+
+def critical_value(level, dof):
+    """
+    Returns the two-sided critical value of Student's t distribution with dof
+    degrees of freedom at the confidence level. The normal distribution is
+    used if dof is None.
+
+    Parameters
+    ----------
+
+    level: float
+        confidence level, between 0 and 1
+    dof: int or None
+        number of degrees of freedom
+
+    Returns
+    ----------
+    float
+    """
+    from scipy import stats
+
+    q = (1 + level) / 2
+    if dof is None or dof <= 0:
+        return stats.norm.ppf(q)
+    return stats.t.ppf(q, dof)
+
+
+def bands(f, x, popt, pcov, jac=None, level=0.95, dof=None, s2=None):
+    """
+    Returns pointwise confidence bounds of f(x, *popt), propagating the
+    covariance of the parameters at first order (delta method):
+    var(f(x)) = J(x) @ pcov @ J(x).T, J being the jacobian of f. If s2 is
+    given, the bounds are prediction bounds, for a new measure at x.
+
+    Parameters
+    ----------
+
+    f: function
+        fitted function, of type f(x, *p)
+    x: numpy.ndarray
+        1D array of x values where to compute the bounds
+    popt: numpy.ndarray
+        fitted parameters
+    pcov: numpy.ndarray
+        covariance matrix of popt
+    jac: function, optional
+        jacobian of f, of type jac(x, *p). If not provided, it is estimated
+        by finite differences.
+        Default: None
+    level: float, optional
+        confidence level, between 0 and 1
+        Default: 0.95
+    dof: int, optional
+        number of degrees of freedom of the fit (number of points minus
+        number of parameters). If not provided, the normal distribution is
+        used instead of Student's t.
+        Default: None
+    s2: float, optional
+        residual variance of the fit, added to the variance of f(x) to get
+        prediction bounds
+        Default: None
+
+    Returns
+    ----------
+    low: numpy.ndarray
+    up: numpy.ndarray
+    """
+    x = np.asarray(x, dtype=float)
+    y = evaluate(f, x, popt)
+    if jac is None:
+        j = numerical_jac(f, x, popt)
+    else:
+        j = jac(x, *popt)
+    var = np.sum((j @ pcov) * j, axis=1)
+    if s2 is not None:
+        var = var + s2
+    half = critical_value(level, dof) * np.sqrt(np.maximum(var, 0))
+    return y - half, y + half
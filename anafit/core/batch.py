@@ -0,0 +1,387 @@
+import concurrent.futures
+import time
+
+import numpy as np
+
+from ..utilities import get_fdef, get_func
+from .anafit import fit_arrays
+from .cache import fit_cache, fit_key
+from .selection import data_index, range_index
+
+
+class BatchResult(object):
+    def __init__(self, index, fdef, npts):
+        """
+        Class containing the outcome of one fit of a batch: the optimal
+        parameters, or the error raised while fitting
+
+        Parameters
+        ----------
+
+        index: int
+            position of the fitted dataset in the batch
+        fdef: str
+            definition of the fitting function, of type 'fdef ; (param)'
+        npts: int
+            number of fitted points
+        """
+        self.index = index
+        self.fdef = fdef
+        self.npts = npts
+        self.popt = None
+        self.pcov = None
+        self.sigma = None
+        self.error = None
+        self.time = None
+        self.info = None
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def ssr(self):
+        # sum of the squared residuals
+        if not self.ok or self.info is None:
+            return None
+        return 2 * self.info["cost"]
+
+    @property
+    def aic(self):
+        # Akaike information criterion of a least-squares fit
+        if self.ssr is None:
+            return None
+        with np.errstate(divide="ignore"):
+            return self.npts * np.log(self.ssr / self.npts) + 2 * self.popt.size
+
+    @property
+    def bic(self):
+        # Bayesian information criterion of a least-squares fit
+        if self.ssr is None:
+            return None
+        k = self.popt.size
+        with np.errstate(divide="ignore"):
+            return self.npts * np.log(self.ssr / self.npts) + k * np.log(self.npts)
+
+    @property
+    def redchi2(self):
+        # reduced chi-squared, the residual variance with unit uncertainties
+        if self.ssr is None:
+            return None
+        return self.ssr / max(self.npts - self.popt.size, 1)
+
+    def __repr__(self):
+        if self.ok:
+            status = "Coeff. : {0}, Uncertainty : {1}".format(self.popt, self.sigma)
+        else:
+            status = "Error : {0!r}".format(self.error)
+        return "BatchResult {0} ({1} points) : {2}".format(
+            self.index, self.npts, status
+        )
+
+
+def _fit_item(fdef, x, y, p):
+    # Runs in the workers: the function is compiled there from its string
+    # definition, as lambdas can not be sent to other processes
+    start = time.perf_counter()
+    info = {}
+    popt, pcov, sigma = fit_arrays(fdef, x, y, p, info=info)
+    return popt, pcov, sigma, time.perf_counter() - start, info
+
+
+def _fit_model(fdef, x, y):
+    # Runs in the workers, see _fit_item. Models unsuited to the datas are
+    # expected to overflow or to be evaluated out of their domain
+    start = time.perf_counter()
+    info = {}
+    with np.errstate(all="ignore"):
+        popt, pcov, sigma = fit_arrays(fdef, x, y, info=info)
+    return popt, pcov, sigma, time.perf_counter() - start, info
+
+
+def _select(data, xrange):
+    # Returns the x and y arrays to fit from a Line2D, a (x, y) pair or the
+    # path of a .npy file
+    return data_index(data).select(xrange)
+
+
+def make_executor(executor="thread", max_workers=None):
+    """
+    Returns a concurrent.futures executor
+
+    Parameters
+    ----------
+
+    executor: str or concurrent.futures.Executor, optional
+        'thread' for a thread pool, 'process' for a process pool. An already
+        built executor is returned as it is.
+        Default: 'thread'
+    max_workers: int, optional
+        number of workers of the pool. If not provided, the default of
+        concurrent.futures is used.
+        Default: None
+
+    Returns
+    ----------
+    concurrent.futures.Executor
+    """
+    if isinstance(executor, concurrent.futures.Executor):
+        return executor
+    if executor == "thread":
+        return concurrent.futures.ThreadPoolExecutor(max_workers)
+    if executor == "process":
+        return concurrent.futures.ProcessPoolExecutor(max_workers)
+    raise ValueError("executor must be 'thread', 'process' or an Executor")
+
+
+def fit_many(datasets, fname, xrange=None, p=None, executor="thread", max_workers=None):
+    """
+    Fits many datasets with the same function, concurrently in a pool of
+    threads or processes. Errors raised while reading or fitting a dataset
+    are caught and stored in its result, without stopping the others.
+
+    Parameters
+    ----------
+
+    datasets: iterable
+        matplotlib Line2D objects, (x, y) pairs of arrays or paths of .npy
+        files to fit (see anafit.core.selection.data_index)
+    fname: str
+        fitting function name (a key from fitting functions dict), or its
+        definition, of type 'fdef ; (param)'
+    xrange: tuple, optional
+        tuple defining the range of data to consider when fitting
+        Default: None
+    p: tuple, optional
+        initialising parameters. If not provided, they are estimated from
+        each dataset for built-in functions, and taken from the definition
+        of the fitting function otherwise (see fit_arrays).
+        Default: None
+    executor: str or concurrent.futures.Executor, optional
+        'thread', 'process' or an executor to run the fits in. An executor
+        given here is not shut down at the end.
+        Default: 'thread'
+    max_workers: int, optional
+        number of workers of the pool.
+        Default: None
+
+    Returns
+    ----------
+    list
+        one BatchResult per dataset, in the same order as datasets
+    """
+    fdef = get_fdef(fname)
+    pool = make_executor(executor, max_workers)
+    results = []
+    futures = []
+    try:
+        for index, data in enumerate(datasets):
+            try:
+                x, y = _select(data, xrange)
+            except Exception as error:
+                # unreadable file, x and y of different lengths...
+                result = BatchResult(index, fdef, 0)
+                result.error = error
+                results.append(result)
+                futures.append(None)
+                continue
+            results.append(BatchResult(index, fdef, len(x)))
+            futures.append(pool.submit(_fit_item, fdef, x, y, p))
+        for result, future in zip(results, futures):
+            if future is None:
+                continue
+            try:
+                (
+                    result.popt,
+                    result.pcov,
+                    result.sigma,
+                    result.time,
+                    result.info,
+                ) = future.result()
+            except Exception as error:
+                result.error = error
+    finally:
+        if pool is not executor:
+            pool.shutdown()
+    return results
+
+
+# criteria available to rank models, see compare_models
+CRITERIA = ("aic", "bic", "redchi2")
+
+
+class ModelComparison(object):
+    def __init__(self, results, criterion="aic", time=None):
+        """
+        Class containing the fits of several models to the same datas, ranked
+        from the best to the worst by an information criterion. The models
+        whose fit failed come last.
+
+        Parameters
+        ----------
+
+        results: list
+            BatchResult objects, one per model. Their fdef attribute is the
+            model name.
+        criterion: str, optional
+            'aic' (Akaike information criterion), 'bic' (Bayesian information
+            criterion) or 'redchi2' (reduced chi-squared)
+            Default: 'aic'
+        time: float, optional
+            wall time of the whole comparison, in seconds
+            Default: None
+        """
+        if criterion not in CRITERIA:
+            raise ValueError("criterion must be one of {0}".format(CRITERIA))
+        self.criterion = criterion
+        self.time = time
+        self.results = sorted(results, key=self._rank)
+
+    def _rank(self, result):
+        value = getattr(result, self.criterion)
+        if value is None or np.isnan(value):
+            return (1, 0.0, result.index)
+        return (0, value, result.index)
+
+    @property
+    def best(self):
+        # the best model, or None if no fit succeeded
+        if not self.results or not self.results[0].ok:
+            return None
+        return self.results[0]
+
+    def __iter__(self):
+        return iter(self.results)
+
+    def __len__(self):
+        return len(self.results)
+
+    def table(self):
+        """
+        Returns the comparison table, one line per model, from the best to
+        the worst
+
+        Returns
+        ----------
+        str
+        """
+        head = "{0:>4}  {1:<24} {2:>2} {3:>12} {4:>12} {5:>12} {6:>10}".format(
+            "rank", "model", "k", "AIC", "BIC", "red. chi2", "time (ms)"
+        )
+        lines = [head]
+        for rank, result in enumerate(self.results, 1):
+            if result.ok:
+                values = "{0:>2} {1:>12.5g} {2:>12.5g} {3:>12.5g}".format(
+                    result.popt.size, result.aic, result.bic, result.redchi2
+                )
+            else:
+                values = "   error: {0!r}".format(result.error)
+            time_ms = "" if result.time is None else "{0:.1f}".format(1e3 * result.time)
+            lines.append(
+                "{0:>4}  {1:<24} {2}{3:>11}".format(
+                    rank, result.fdef[:24], values, time_ms
+                )
+            )
+        if self.time is not None:
+            lines.append("Total wall time: {0:.1f} ms".format(1e3 * self.time))
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return self.table()
+
+
+def compare_models(
+    data, fnames=None, xrange=None, criterion="aic", executor="thread", max_workers=None
+):
+    """
+    Fits several models to the same datas, concurrently in a pool of threads
+    or processes, and ranks them by an information criterion. Errors raised
+    while resolving or fitting a model are caught and stored in its result;
+    the ones raised while reading the datas are stored in every result. When
+    data is a Line2D, the results are also stored in anafit.core.fit_cache,
+    so that fitting one of the models with Fit afterwards is immediate.
+
+    Parameters
+    ----------
+
+    data: matplotlib.lines.Line2D, tuple, str or os.PathLike
+        Line2D object, (x, y) pair of arrays or path of a .npy file to fit
+    fnames: iterable, optional
+        names of the fitting functions to compare (keys from fitting
+        functions dict). If not provided, all the built-in and custom
+        functions are compared.
+        Default: None
+    xrange: tuple, optional
+        tuple defining the range of data to consider when fitting
+        Default: None
+    criterion: str, optional
+        'aic', 'bic' or 'redchi2', see ModelComparison
+        Default: 'aic'
+    executor: str or concurrent.futures.Executor, optional
+        'thread', 'process' or an executor to run the fits in. An executor
+        given here is not shut down at the end.
+        Default: 'thread'
+    max_workers: int, optional
+        number of workers of the pool.
+        Default: None
+
+    Returns
+    ----------
+    ModelComparison
+    """
+    if criterion not in CRITERIA:
+        raise ValueError("criterion must be one of {0}".format(CRITERIA))
+    if fnames is None:
+        fnames = list(get_func())
+    start = time.perf_counter()
+    try:
+        x, y = _select(data, xrange)
+    except Exception as error:
+        # unreadable file, x and y of different lengths...: no model is fitted
+        x = y = None
+        selection_error = error
+    pool = make_executor(executor, max_workers)
+    results = []
+    futures = []
+    try:
+        for index, fname in enumerate(fnames):
+            result = BatchResult(index, fname, 0 if x is None else len(x))
+            results.append(result)
+            futures.append(None)
+            if x is None:
+                result.error = selection_error
+                continue
+            try:
+                futures[-1] = pool.submit(_fit_model, get_fdef(fname), x, y)
+            except Exception as error:
+                # unknown function name
+                result.error = error
+        for result, future in zip(results, futures):
+            if future is None:
+                continue
+            try:
+                (
+                    result.popt,
+                    result.pcov,
+                    result.sigma,
+                    result.time,
+                    result.info,
+                ) = future.result()
+            except Exception as error:
+                result.error = error
+    finally:
+        if pool is not executor:
+            pool.shutdown()
+    if hasattr(data, "get_xydata"):
+        _cache_results(data, xrange, results)
+    return ModelComparison(results, criterion, time.perf_counter() - start)
+
+
+def _cache_results(line, xrange, results):
+    # Stores the successful fits in fit_cache, as Fit.fit would
+    index = range_index(line)
+    bounds = None if xrange is None else index.bounds(xrange)
+    for result in results:
+        if result.ok:
+            key = fit_key(index.fingerprint, get_fdef(result.fdef), bounds, None)
+            fit_cache.put(key, result.popt, result.pcov, result.sigma, result.info)
@@ -0,0 +1,288 @@
+import time
+
+import numpy as np
+
+from ..utilities import builtin_name, from_fdef
+from .anafit import fit_arrays
+from .batch import make_executor
+from .linear import REPARAMETRIZATIONS, linear_basis
+from .render import evaluate
+
+# maximum number of values of the arrays of resampled datas built at once
+CHUNK_ELEMENTS = 2**22
+# number of resamples fitted per task of the pool, for non linear functions
+CHUNK_SIZE = 25
+
+
+class BootstrapResult(object):
+    def __init__(self, popt, samples, level=0.95, method="residuals", nboot=None):
+        """
+        Class containing the parameters fitted on bootstrap resamples of the
+        datas, and the percentile intervals derived from them
+
+        Parameters
+        ----------
+
+        popt: numpy.ndarray
+            parameters fitted on the original datas
+        samples: numpy.ndarray
+            (n, len(popt)) array of the parameters fitted on each resample
+        level: float, optional
+            confidence level of the intervals, between 0 and 1
+            Default: 0.95
+        method: str, optional
+            resampling method, 'residuals' or 'pairs'
+            Default: 'residuals'
+        nboot: int, optional
+            number of resamples asked for. Less may have been fitted, if some
+            fits failed or if the time budget was exceeded.
+            Default: None
+        """
+        self.popt = np.asarray(popt, dtype=float)
+        self.samples = np.asarray(samples, dtype=float).reshape(-1, self.popt.size)
+        self.level = level
+        self.method = method
+        self.nboot = nboot
+        self.failed = 0
+        self.time = None
+
+    @property
+    def n(self):
+        # number of resamples fitted
+        return self.samples.shape[0]
+
+    @property
+    def sigma(self):
+        # standard deviation of the parameters over the resamples
+        if self.n < 2:
+            return np.full(self.popt.size, np.nan)
+        return np.std(self.samples, axis=0, ddof=1)
+
+    @property
+    def intervals(self):
+        # (len(popt), 2) array of the percentile intervals at self.level
+        return self.interval()
+
+    def interval(self, level=None):
+        """
+        Returns the percentile intervals of the parameters
+
+        Parameters
+        ----------
+
+        level: float, optional
+            confidence level, between 0 and 1. If not provided, self.level is
+            used.
+            Default: None
+
+        Returns
+        ----------
+        numpy.ndarray
+            (len(popt), 2) array of the lower and upper bounds
+        """
+        if level is None:
+            level = self.level
+        if self.n == 0:
+            return np.full((self.popt.size, 2), np.nan)
+        q = 100 * np.array([(1 - level) / 2, (1 + level) / 2])
+        return np.percentile(self.samples, q, axis=0).T
+
+    def summary(self):
+        """
+        Returns the main results as a json serializable dict
+        """
+        return {
+            "method": self.method,
+            "nboot": self.nboot,
+            "n": self.n,
+            "failed": self.failed,
+            "level": self.level,
+            "sigma": self.sigma.tolist(),
+            "intervals": self.intervals.tolist(),
+            "time": self.time,
+        }
+
+    def __repr__(self):
+        low, up = self.intervals.T
+        return (
+            "Bootstrap ({0}, {1} resamples) :\n".format(self.method, self.n)
+            + "Coeff. : {0}\n".format(self.popt)
+            + "Uncertainty : {0}\n".format(self.sigma)
+            + "{0:g} % interval : {1} - {2}\n".format(100 * self.level, low, up)
+        )
+
+
+def _resample(rng, x, y, fitted, residuals, method):
+    # Returns one resample of the datas
+    n = x.size
+    if method == "residuals":
+        return x, fitted + residuals[rng.integers(0, n, n)]
+    index = rng.integers(0, n, n)
+    return x[index], y[index]
+
+
+def _bootstrap_chunk(fdef, x, y, popt, method, seed, count, deadline):
+    # Runs in the workers: fits count resamples, starting from popt, until
+    # the deadline (time.time() value) is exceeded
+    f, _ = from_fdef(fdef)
+    fitted = evaluate(f, x, popt)
+    residuals = y - fitted
+    rng = np.random.default_rng(seed)
+    samples = []
+    failed = 0
+    with np.errstate(all="ignore"):
+        for _ in range(count):
+            if deadline is not None and time.time() > deadline:
+                break
+            xb, yb = _resample(rng, x, y, fitted, residuals, method)
+            try:
+                p, _, _ = fit_arrays(fdef, xb, yb, popt, linear=False, guess=False)
+            except (RuntimeError, ValueError, TypeError, ArithmeticError):
+                failed += 1
+                continue
+            samples.append(p)
+    return np.array(samples).reshape(-1, np.size(popt)), failed
+
+
+def _linear_samples(basis, offset, y, popt_lin, method, seeds, sizes, deadline):
+    # Fits the resamples of a linear least-squares problem in batches: the
+    # resampled datas of a chunk are stacked as the rows of a matrix
+    n, k = basis.shape
+    yc = y - offset
+    fitted = basis @ popt_lin
+    residuals = yc - fitted
+    pinv = np.linalg.pinv(basis)
+    products = (basis[:, :, None] * basis[:, None, :]).reshape(n, k * k)
+    weighted = basis * yc[:, None]
+    samples = []
+    for seed, size in zip(seeds, sizes):
+        if deadline is not None and time.time() > deadline:
+            break
+        rng = np.random.default_rng(seed)
+        index = rng.integers(0, n, (size, n))
+        if method == "residuals":
+            samples.append((fitted + residuals[index]) @ pinv.T)
+        else:
+            flat = (index + n * np.arange(size)[:, None]).ravel()
+            counts = np.bincount(flat, minlength=size * n).reshape(size, n)
+            gram = (counts @ products).reshape(size, k, k)
+            rhs = counts @ weighted
+            cov = np.linalg.pinv(gram, hermitian=True)
+            samples.append(np.einsum("mij,mj->mi", cov, rhs))
+    if not samples:
+        return np.empty((0, k))
+    return np.concatenate(samples)
+
+
+def _chunks(nboot, nchunks):
+    # Splits nboot resamples into nchunks chunks of nearly equal sizes
+    nchunks = max(1, min(nchunks, nboot))
+    sizes = np.full(nchunks, nboot // nchunks)
+    sizes[: nboot % nchunks] += 1
+    return sizes.tolist()
+
+
+def bootstrap(
+    fdef,
+    x,
+    y,
+    popt,
+    nboot=1000,
+    method="residuals",
+    level=0.95,
+    seed=None,
+    executor="process",
+    max_workers=None,
+    budget=None,
+):
+    """
+    Estimates the uncertainty of the parameters of a fit by bootstrap: the
+    datas are resampled nboot times, either by adding resampled residuals to
+    the fitted curve ('residuals'), or by drawing (x, y) pairs with
+    replacement ('pairs'), and each resample is fitted again. For functions
+    linear in their parameters, the resamples are solved together with a few
+    matrix products. Other functions are fitted in a pool of workers,
+    starting from popt.
+
+    Parameters
+    ----------
+
+    fdef: str
+        definition of the fitting function, of type 'fdef ; (param)'
+    x: numpy.ndarray
+        x values of the fitted datas
+    y: numpy.ndarray
+        y values of the fitted datas
+    popt: numpy.ndarray
+        parameters fitted on the datas
+    nboot: int, optional
+        number of resamples
+        Default: 1000
+    method: str, optional
+        'residuals' or 'pairs'
+        Default: 'residuals'
+    level: float, optional
+        confidence level of the percentile intervals, between 0 and 1
+        Default: 0.95
+    seed: int or numpy.random.SeedSequence, optional
+        seed of the random generator. The results only depend on it, not on
+        the number of workers.
+        Default: None
+    executor: str or concurrent.futures.Executor, optional
+        'thread', 'process' or an executor to run the fits of non linear
+        functions in. An executor given here is not shut down at the end.
+        Default: 'process'
+    max_workers: int, optional
+        number of workers of the pool.
+        Default: None
+    budget: float, optional
+        time in seconds after which no new resample is fitted: the results
+        are computed with the resamples fitted so far.
+        Default: None
+
+    Returns
+    ----------
+    BootstrapResult
+    """
+    if method not in ("residuals", "pairs"):
+        raise ValueError("method must be 'residuals' or 'pairs'")
+    start = time.time()
+    deadline = None if budget is None else start + budget
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    popt = np.asarray(popt, dtype=float)
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    f, _ = from_fdef(fdef)
+    g, inverse = REPARAMETRIZATIONS.get(builtin_name(fdef), (f, None))
+    basis, offset = linear_basis(g, x, popt.size)
+    failed = 0
+    if basis is not None:
+        sizes = _chunks(nboot, -(-nboot * x.size // CHUNK_ELEMENTS))
+        popt_lin = np.linalg.lstsq(basis, y - offset, rcond=None)[0]
+        samples = _linear_samples(
+            basis, offset, y, popt_lin, method, seed.spawn(len(sizes)), sizes, deadline
+        )
+        if inverse is not None:
+            zeros = np.zeros((popt.size, popt.size))
+            samples = np.array([inverse(s, zeros)[0] for s in samples])
+    else:
+        sizes = _chunks(nboot, -(-nboot // CHUNK_SIZE))
+        pool = make_executor(executor, max_workers)
+        try:
+            futures = [
+                pool.submit(
+                    _bootstrap_chunk, fdef, x, y, popt, method, s, size, deadline
+                )
+                for s, size in zip(seed.spawn(len(sizes)), sizes)
+            ]
+            results = [future.result() for future in futures]
+        finally:
+            if pool is not executor:
+                pool.shutdown()
+        samples = np.concatenate([r[0] for r in results])
+        failed = sum(r[1] for r in results)
+    result = BootstrapResult(popt, samples, level, method, nboot)
+    result.failed = failed
+    result.time = time.time() - start
+    return result
@@ -0,0 +1,142 @@
+import collections
+import copy
+import threading
+
+import numpy as np
+
+# maximum number of fit results kept in memory by fit_cache
+FIT_CACHE_SIZE = 128
+
+CacheInfo = collections.namedtuple(
+    "CacheInfo", ["hits", "misses", "evictions", "maxsize", "currsize"]
+)
+
+
+class FitCache(object):
+    def __init__(self, maxsize=FIT_CACHE_SIZE):
+        """
+        Class keeping the results of the last fits in memory, so that a fit
+        identical to a recent one (same datas, function, range and
+        initialising parameters) is not computed again. The least recently
+        used results are evicted once maxsize results are stored.
+
+        Parameters
+        ----------
+
+        maxsize: int, optional
+            maximum number of results kept
+            Default: FIT_CACHE_SIZE
+        """
+        self.maxsize = maxsize
+        self._results = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Returns the results stored for key, or None
+
+        Parameters
+        ----------
+
+        key: tuple
+            key of the fit, see fit_key
+
+        Returns
+        ----------
+        tuple or None
+            (popt, pcov, sigma, info) copies of the stored results
+        """
+        with self._lock:
+            results = self._results.get(key)
+            if results is None:
+                self.misses += 1
+                return None
+            self._results.move_to_end(key)
+            self.hits += 1
+        popt, pcov, sigma, info = results
+        return popt.copy(), pcov.copy(), sigma.copy(), copy.deepcopy(info)
+
+    def put(self, key, popt, pcov, sigma, info):
+        """
+        Stores the results of a fit
+
+        Parameters
+        ----------
+
+        key: tuple
+            key of the fit, see fit_key
+        popt, pcov, sigma: numpy.ndarray
+            results of the fit
+        info: dict
+            information on the fit
+        """
+        results = (popt.copy(), pcov.copy(), sigma.copy(), copy.deepcopy(info))
+        with self._lock:
+            self._results[key] = results
+            self._results.move_to_end(key)
+            while len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+                self.evictions += 1
+
+    def info(self):
+        """
+        Returns the statistics of the cache
+
+        Returns
+        ----------
+        CacheInfo
+            named tuple (hits, misses, evictions, maxsize, currsize)
+        """
+        return CacheInfo(
+            self.hits, self.misses, self.evictions, self.maxsize, len(self._results)
+        )
+
+    def clear(self):
+        """
+        Empties the cache and resets its statistics
+        """
+        with self._lock:
+            self._results.clear()
+            self.hits, self.misses, self.evictions = 0, 0, 0
+
+
+def fit_key(fingerprint, fdef, bounds, p, subsample=None, polish=True):
+    """
+    Returns the key identifying a fit in a FitCache
+
+    Parameters
+    ----------
+
+    fingerprint: tuple
+        fingerprint of the datas, see RangeIndex.fingerprint
+    fdef: str
+        definition of the fitting function, of type 'fdef ; (param)'
+    bounds: slice or None
+        slice of the sorted datas lying in the fitted range, see
+        RangeIndex.bounds, or None if all the datas are fitted
+    p: tuple or None
+        initialising parameters given by the user
+    subsample: int, optional
+        size of the subsample fitted first, see fit_arrays
+        Default: None
+    polish: bool, optional
+        whether the fit on the subsample is refined, see fit_arrays
+        Default: True
+
+    Returns
+    ----------
+    tuple
+    """
+    if bounds is not None:
+        bounds = (bounds.start, bounds.stop)
+    if p is not None:
+        p = tuple(np.atleast_1d(p).astype(float).tolist())
+    decimation = None if subsample is None else (subsample, polish)
+    return fingerprint, fdef, bounds, p, decimation
+
+
+# cache of the fit results used by Fit.fit
+fit_cache = FitCache()
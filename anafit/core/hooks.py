@@ -0,0 +1,96 @@
+import logging
+
+# functions called at each stage of the life of a fit, see add_fit_hook
+_fit_hooks = []
+
+logger = logging.getLogger("anafit")
+
+
+def add_fit_hook(hook):
+    """
+    Registers a function called at each stage of the life of the fits, to
+    display, log or collect their results and metrics (see Fit.metrics). The
+    hook is called as hook(fit, event), event being:
+        - 'fit': the fit was computed (by Fit.fit or Fit.update)
+        - 'plot': the fit was plotted (by Fit.plot)
+        - 'figure': the fit was made from the anafit menu of a figure, and is
+        plotted (by Figure.fit)
+        - 'failed': the fit made from the anafit menu of a figure failed (by
+        Figure.fit). The error is described by fit.info['error'].
+    Exceptions raised by hooks are logged, and do not interrupt the fit.
+
+    Parameters
+    ----------
+
+    hook: function
+        function of type hook(fit, event)
+    """
+    if hook not in _fit_hooks:
+        _fit_hooks.append(hook)
+
+
+def remove_fit_hook(hook):
+    """
+    Unregisters a function registered by add_fit_hook
+
+    Parameters
+    ----------
+
+    hook: function
+        function of type hook(fit, event)
+    """
+    if hook in _fit_hooks:
+        _fit_hooks.remove(hook)
+
+
+def fit_hooks():
+    """
+    Returns the list of the registered hooks
+    """
+    return list(_fit_hooks)
+
+
+def run_fit_hooks(fit, event):
+    """
+    Calls the registered hooks
+
+    Parameters
+    ----------
+
+    fit: Fit object
+    event: str
+        'fit', 'plot', 'figure' or 'failed', see add_fit_hook
+    """
+    for hook in list(_fit_hooks):
+        try:
+            hook(fit, event)
+        except Exception:
+            logger.exception("Fit hook %r failed", hook)
+
+
+def print_fit(fit, event):
+    """
+    Hook printing the fits made from the anafit menu of a figure. Registered
+    by default.
+    """
+    if event == "figure":
+        print(fit)
+
+
+def log_fit(fit, event):
+    """
+    Hook logging the metrics of the fits with the 'anafit' logger, at INFO
+    level. The metrics are attached to the log records as their 'metrics'
+    attribute, to be collected by a logging handler.
+    """
+    metrics = fit.metrics
+    logger.info(
+        "%s %s: %s",
+        event,
+        metrics["fname"],
+        metrics["timings"],
+        extra={"metrics": dict(metrics, event=event)},
+    )
+
+
+add_fit_hook(print_fit)
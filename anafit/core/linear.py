@@ -0,0 +1,651 @@
+import warnings
+
+import numpy as np
+
+from ..utilities import builtin_name
+from .render import evaluate
+
+# number of data points used to probe whether a function is linear in its
+# parameters
+PROBE_POINTS = 16
+# number of random parameter vectors of the probe
+PROBE_PARAMETERS = 3
+
+
+def linear_basis(f, x, nparams):
+    """
+    Decomposes f(x, *p) = f0(x) + sum(p[i] * g[i](x)) if f is linear in its
+    parameters, i.e. if f is a linear combination of basis functions plus an
+    offset (polynomials for instance). Linearity is probed on a few points of
+    x, with random parameters of both signs: each parameter draws its sign,
+    and the first two probes have alternating signs, so that functions like
+    np.abs(a)*x are not taken for linear ones.
+
+    Parameters
+    ----------
+
+    f: function
+        function of type f(x, *p)
+    x: numpy.ndarray
+        x values of the datas to fit
+    nparams: int
+        number of parameters of f
+
+    Returns
+    ----------
+    basis: numpy.ndarray or None
+        (len(x), nparams) array of g[i](x), None if f is not linear in its
+        parameters
+    offset: numpy.ndarray or None
+        f0(x)
+    """
+    x = np.asarray(x, dtype=float)
+    if x.size == 0 or nparams == 0:
+        return None, None
+    probe = x[_probe_indices(x.size)]
+    rng = np.random.default_rng(0)
+    signs = rng.choice([-1, 1], (PROBE_PARAMETERS, nparams))
+    signs[0] = np.where(np.arange(nparams) % 2, -1, 1)
+    signs[1] = -signs[0]
+    with np.errstate(all="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        try:
+            g0, g = _basis(f, probe, nparams)
+            for p in signs * rng.uniform(0.5, 2, (PROBE_PARAMETERS, nparams)):
+                expected = evaluate(f, probe, p)
+                if not np.all(np.isfinite(expected)):
+                    return None, None
+                if not np.allclose(g0 + g @ p, expected, rtol=1e-9, atol=1e-12):
+                    return None, None
+        except (ArithmeticError, TypeError, ValueError):
+            return None, None
+        offset, basis = _basis(f, x, nparams)
+    return basis, offset
+
+
+def _probe_indices(n):
+    # Indices of the points of the probe, evenly spaced among n points
+    return np.linspace(0, n - 1, min(n, PROBE_POINTS)).astype(int)
+
+
+def _consistent(f, x, basis, offset, p):
+    # Checks on the points of the probe that f(x, *p) is the prediction of the
+    # basis for the solution p, to catch the nonlinearities missed by the probe
+    i = _probe_indices(x.size)
+    terms = basis[i] * p
+    predicted = terms.sum(axis=1)
+    if offset is not None:
+        predicted = predicted + offset[i]
+    with np.errstate(all="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        try:
+            value = evaluate(f, x[i], p)
+        except (ArithmeticError, TypeError, ValueError):
+            return False
+    scale = np.max(np.abs(terms), initial=0.0)
+    return np.allclose(value, predicted, rtol=1e-9, atol=1e-9 * scale + 1e-12)
+
+
+def _basis(f, x, nparams):
+    # Evaluates the offset f(x, 0, ..., 0) and the basis functions
+    # g[i](x) = f(x, e[i]) - f(x, 0, ..., 0)
+    offset = evaluate(f, x, np.zeros(nparams))
+    basis = np.empty((x.size, nparams))
+    for i, p in enumerate(np.eye(nparams)):
+        basis[:, i] = evaluate(f, x, p) - offset
+    if not (np.all(np.isfinite(offset)) and np.all(np.isfinite(basis))):
+        raise ArithmeticError("Non finite basis")
+    return offset, basis
+
+
+def solve_normal(gram, rhs):
+    """
+    Solves the normal equations gram @ p = rhs of a linear least-squares
+    problem. The columns are scaled beforehand to limit the loss of precision,
+    and the pseudo-inverse is used so that degenerate problems are solved too.
+
+    Parameters
+    ----------
+
+    gram: numpy.ndarray
+        (k, k) array basis.T @ basis
+    rhs: numpy.ndarray
+        (k,) array basis.T @ y
+
+    Returns
+    ----------
+    popt: numpy.ndarray
+        solution of the least-squares problem
+    cov: numpy.ndarray
+        inverse of gram, the covariance of popt for a unit residual variance
+    """
+    scale = np.sqrt(np.diagonal(gram))
+    scale = np.where(scale > 0, scale, 1)
+    cov = np.linalg.pinv(gram / np.outer(scale, scale), hermitian=True)
+    cov = cov / np.outer(scale, scale)
+    return cov @ rhs, cov
+
+
+def scale_covariance(cov, ssr, n):
+    """
+    Returns the covariance of the parameters of a least-squares fit, scaled by
+    the residual variance, as scipy.optimize.curve_fit does with
+    absolute_sigma=False. Like curve_fit, warns and returns an infinite
+    covariance if there are not more data points than parameters.
+
+    Parameters
+    ----------
+
+    cov: numpy.ndarray
+        covariance for a unit residual variance, see solve_normal
+    ssr: float
+        sum of the squared residuals
+    n: int
+        number of data points
+
+    Returns
+    ----------
+    numpy.ndarray
+    """
+    k = cov.shape[0]
+    if n > k:
+        return cov * ssr / (n - k)
+    from scipy.optimize import OptimizeWarning
+
+    warnings.warn(
+        "Covariance of the parameters could not be estimated",
+        category=OptimizeWarning,
+    )
+    return np.full_like(cov, np.inf)
+
+
+def _column_means(z):
+    # Means of the columns of z, exact for the constant columns, so that they
+    # are exactly zero once centered
+    means = z.mean(axis=0)
+    constant = np.all(z == z[:1], axis=0)
+    means[constant] = z[0, constant]
+    return means
+
+
+def _intercept(means, squares):
+    # Index of the basis function constant over the datas (the intercept of
+    # the function, whose centered sum of squares is zero), or None
+    for i in np.flatnonzero((squares == 0) & (means != 0)):
+        return i
+    return None
+
+
+def _add_intercept(p, cov, means, ymean, i, n):
+    # Returns the parameters and their covariance (for a unit residual
+    # variance) from the solution p, cov of the problem centered on the mean
+    # point of the datas, without the intercept i: the fitted function passes
+    # through the mean point, whose y has a variance 1/n independent of p
+    k = means.size
+    others = np.flatnonzero(np.arange(k) != i)
+    popt = np.empty(k)
+    popt[others] = p
+    popt[i] = (ymean - means[others] @ p) / means[i]
+    jac = np.zeros((k, k))
+    jac[others, np.arange(k - 1)] = 1
+    jac[i] = np.append(-means[others], 1) / means[i]
+    full = np.zeros((k, k))
+    full[: k - 1, : k - 1] = cov
+    full[k - 1, k - 1] = 1 / n
+    return popt, jac @ full @ jac.T
+
+
+def _lstsq(a, b):
+    # Solves a @ p = b in the least-squares sense from the singular value
+    # decomposition of a, with its columns scaled to unit norm, and returns p
+    # and inv(a.T @ a), without forming a.T @ a. Degenerate directions are
+    # dropped, as by the pseudo-inverse.
+    if a.shape[1] == 0:
+        return np.empty(0), np.empty((0, 0))
+    scale = np.linalg.norm(a, axis=0)
+    scale = np.where(scale > 0, scale, 1)
+    u, s, vt = np.linalg.svd(a / scale, full_matrices=False)
+    keep = s > np.finfo(float).eps * max(a.shape) * s[0]
+    v = vt.T * np.where(keep, 1 / np.where(keep, s, 1), 0)
+    return (v @ (u.T @ b)) / scale, (v @ v.T) / np.outer(scale, scale)
+
+
+def solve_linear(basis, y, offset=None, full_output=False):
+    """
+    Solves the linear least-squares problem y = offset + basis @ p, and returns
+    the same results than scipy.optimize.curve_fit would. The problem is
+    solved by singular value decomposition of the basis, with scaled columns.
+    If the function has an intercept (a basis function constant over the
+    datas), the basis and y are centered on their means first, so that the
+    precision is kept for datas far from x = 0.
+
+    Parameters
+    ----------
+
+    basis: numpy.ndarray
+        (n, k) array of the basis functions evaluated at the data points
+    y: numpy.ndarray
+        y values of the datas to fit
+    offset: numpy.ndarray, optional
+        part of the function independent from the parameters
+        Default: None
+    full_output: bool, optional
+        if True, the sum of the squared residuals is returned too
+        Default: False
+
+    Returns
+    ----------
+    popt: numpy.ndarray
+    pcov: numpy.ndarray
+    ssr: float
+        only if full_output is True
+    """
+    n, k = basis.shape
+    if k > n:
+        raise TypeError(
+            "Improper input: func (n={0}) must not exceed data (m={1})".format(k, n)
+        )
+    yc = np.asarray(y, dtype=float)
+    if offset is not None and np.any(offset):
+        yc = yc - offset
+    means, ymean = _column_means(basis), yc.mean()
+    centered = basis - means
+    i = _intercept(means, np.einsum("ij,ij->j", centered, centered))
+    if i is None:
+        popt, cov = _lstsq(basis, yc)
+    else:
+        others = np.arange(k) != i
+        p, cov = _lstsq(centered[:, others], yc - ymean)
+        popt, cov = _add_intercept(p, cov, means, ymean, i, n)
+    residuals = yc - basis @ popt
+    ssr = residuals @ residuals
+    pcov = scale_covariance(cov, ssr, n)
+    if full_output:
+        return popt, pcov, ssr
+    return popt, pcov
+
+
+def _affine(x, c1, c0):
+    return c1 * x + c0
+
+
+def _line(x, c0, c1):
+    return c0 + c1 * x
+
+
+def _proportional(x, c):
+    return c * x
+
+
+def _from_affine(c, ccov):
+    # a*(x-b) = c[0]*x + c[1]: a = c[0], b = -c[1]/c[0]
+    a, b = c[0], -c[1] / c[0]
+    transform = np.array([[1, 0], [c[1] / c[0] ** 2, -1 / c[0]]])
+    return np.array([a, b]), transform @ ccov @ transform.T
+
+
+# built-in functions not linear in their parameters, but which become linear
+# after a change of parameters: name -> (linear function, inverse change)
+REPARAMETRIZATIONS = {
+    "a(x-b)": (_affine, _from_affine),
+}
+
+
+def _from_power(c, ccov):
+    # log(a*x**n) = c[0] + c[1]*log(x): a = exp(c[0]), n = c[1]
+    transform = np.diag([np.exp(c[0]), 1.0])
+    return np.array([np.exp(c[0]), c[1]]), transform @ ccov @ transform.T
+
+
+def _from_exponential(c, ccov):
+    # log(a*exp(x/b)) = c[0] + c[1]*x: a = exp(c[0]), b = 1/c[1]
+    transform = np.diag([np.exp(c[0]), -1 / c[1] ** 2])
+    return np.array([np.exp(c[0]), 1 / c[1]]), transform @ ccov @ transform.T
+
+
+def _from_rate(c, ccov):
+    # log(exp(x/a)) = c[0]*x: a = 1/c[0]
+    transform = np.array([[-1 / c[0] ** 2]])
+    return np.array([1 / c[0]]), transform @ ccov @ transform.T
+
+
+def _log_y(x, y):
+    # semilog scale
+    if np.any(y <= 0):
+        raise ValueError("The log scale needs positive y values")
+    return x, np.log(y)
+
+
+def _log_xy(x, y):
+    # log-log scale
+    if np.any(x <= 0):
+        raise ValueError("The log scale needs positive x values")
+    return np.log(x), _log_y(x, y)[1]
+
+
+# built-in functions which become linear in their parameters when the datas
+# are fitted in log scale, as on a log-log or semilog plot: name -> (linear
+# function, inverse change of parameters, transform of the datas)
+LOG_LINEARIZATIONS = {
+    "ax^n": (_line, _from_power, _log_xy),
+    "a*exp(x/b)": (_line, _from_exponential, _log_y),
+    "exp(x/a)": (_proportional, _from_rate, _log_y),
+}
+
+
+def fit_linear(fdef, f, x, y, nparams, full_output=False):
+    """
+    Fits the datas y(x) in closed form, if the function f defined by fdef is
+    linear in its parameters, or can be reparametrized to be so.
+
+    Parameters
+    ----------
+
+    fdef: str
+        definition of the fitting function, of type 'fdef ; (param)'
+    f: function
+        the fitting function, compiled from fdef
+    x: numpy.ndarray
+        x values of the datas to fit
+    y: numpy.ndarray
+        y values of the datas to fit
+    nparams: int
+        number of parameters of f
+    full_output: bool, optional
+        if True, the sum of the squared residuals is returned too
+        Default: False
+
+    Returns
+    ----------
+    popt, pcov: numpy.ndarray, or None, None if f is not linear in its
+        parameters
+    ssr: float or None
+        only if full_output is True
+    """
+    g, inverse = REPARAMETRIZATIONS.get(builtin_name(fdef), (f, None))
+    basis, offset = linear_basis(g, x, nparams)
+    if basis is None:
+        return (None, None, None) if full_output else (None, None)
+    popt, pcov, ssr = solve_linear(basis, y, offset, full_output=True)
+    if not _consistent(g, np.asarray(x, dtype=float), basis, offset, popt):
+        return (None, None, None) if full_output else (None, None)
+    if inverse is not None:
+        popt, pcov = inverse(popt, pcov)
+    if full_output:
+        return popt, pcov, ssr
+    return popt, pcov
+
+
+def _moments_constant(n, mx, my, sxx, sxy, syy):
+    return np.array([my]), np.array([[1 / n]]), syy
+
+
+def _moments_proportional(n, mx, my, sxx, sxy, syy):
+    # sums of x*x and x*y about 0
+    xx, xy = sxx + n * mx * mx, sxy + n * mx * my
+    a = xy / xx
+    return np.array([a]), np.array([[1 / xx]]), syy + n * my * my - a * xy
+
+
+def _moments_affine(n, mx, my, sxx, sxy, syy):
+    # a*x + b, with the covariance of (a, b) for a unit residual variance
+    a = sxy / sxx
+    cov = np.array([[1, -mx], [-mx, sxx / n + mx * mx]]) / sxx
+    return np.array([a, my - a * mx]), cov, syy - a * sxy
+
+
+# built-in functions fitted from the moments of the datas, see fit_moments:
+# name -> (solution from the moments, inverse change of parameters)
+MOMENT_FITS = {
+    "constant": (_moments_constant, None),
+    "ax": (_moments_proportional, None),
+    "ax+b": (_moments_affine, None),
+    "a(x-b)": (_moments_affine, _from_affine),
+}
+
+
+def fit_moments(fdef, moments, full_output=False):
+    """
+    Fits in constant time a built-in function of MOMENT_FITS (a straight line
+    or a constant) from the moments of the datas, as returned by
+    anafit.core.selection.RangeIndex.moments. The results are the ones of
+    scipy.optimize.curve_fit.
+
+    Parameters
+    ----------
+
+    fdef: str
+        definition of the fitting function, of type 'fdef ; (param)'
+    moments: tuple
+        (n, mx, my, sxx, sxy, syy), number of points, means of x and y, and
+        sums of the squared deviations from the means
+    full_output: bool, optional
+        if True, the sum of the squared residuals and the coefficient of
+        determination R2 are returned too
+        Default: False
+
+    Returns
+    ----------
+    popt: numpy.ndarray
+    pcov: numpy.ndarray
+    ssr: float
+        only if full_output is True
+    r2: float
+        only if full_output is True, nan if y is constant
+
+    Raises
+    ----------
+    ValueError
+        if fdef does not define a function of MOMENT_FITS
+    """
+    name = builtin_name(fdef)
+    if name not in MOMENT_FITS:
+        raise ValueError("{0} can not be fitted from moments".format(fdef))
+    solve, inverse = MOMENT_FITS[name]
+    n, syy = moments[0], moments[5]
+    with np.errstate(all="ignore"):
+        # numpy floats, so that degenerate ranges give inf or nan values
+        popt, cov, ssr = solve(*np.asarray(moments, dtype=float))
+    k = popt.size
+    if k > n:
+        raise TypeError(
+            "Improper input: func (n={0}) must not exceed data (m={1})".format(k, n)
+        )
+    ssr = max(ssr, 0.0)
+    pcov = scale_covariance(cov, ssr, n)
+    if inverse is not None:
+        popt, pcov = inverse(popt, pcov)
+    if not full_output:
+        return popt, pcov
+    return popt, pcov, ssr, 1 - ssr / syy if syy > 0 else np.nan
+
+
+class LinearAccumulator(object):
+    def __init__(self, f, nparams, inverse=None, transform=None):
+        """
+        Class accumulating the sufficient statistics of a linear least-squares
+        fit (the number of points, and the sums and sums of products of the
+        basis functions and y), so that points can be added to the fit at a
+        cost proportional to their number only. Accumulators filled with
+        different parts of the datas, in parallel workers for instance, can be
+        merged. The sums are taken around the first point added, so that the
+        precision is kept for datas far from x = 0.
+
+        Parameters
+        ----------
+
+        f: function
+            function of type f(x, *p), linear in its parameters
+        nparams: int
+            number of parameters of f
+        inverse: function, optional
+            change of parameters applied to the solution, see
+            REPARAMETRIZATIONS
+            Default: None
+        transform: function, optional
+            function of type transform(x, y), returning the datas actually
+            fitted, see LOG_LINEARIZATIONS
+            Default: None
+        """
+        self._f = f
+        self._inverse = inverse
+        self._transform = transform
+        self._k = nparams
+        # sums and sums of products of the columns z = [basis, y], shifted by
+        # their values at the first point
+        self._shift = np.zeros(nparams + 1)
+        self._sums = np.zeros(nparams + 1)
+        self._products = np.zeros((nparams + 1, nparams + 1))
+        self._n = 0
+
+    @property
+    def n(self):
+        return self._n
+
+    def add(self, x, y, basis=None, offset=None):
+        """
+        Adds datas to the fit
+
+        Parameters
+        ----------
+
+        x: numpy.ndarray
+            x values of the datas to add
+        y: numpy.ndarray
+            y values of the datas to add
+        basis, offset: numpy.ndarray, optional
+            basis functions and offset evaluated at x (transformed, if the
+            accumulator has a transform), see linear_basis. They are computed
+            if not provided.
+            Default: None
+        """
+        x = np.asarray(x, dtype=float)
+        if x.size == 0:
+            return
+        if self._transform is not None:
+            x, y = self._transform(x, np.asarray(y, dtype=float))
+        if basis is None:
+            offset, basis = _basis(self._f, x, self._k)
+        yc = np.asarray(y, dtype=float)
+        if offset is not None and np.any(offset):
+            yc = yc - offset
+        z = np.column_stack((basis, yc))
+        shifted = z - z[0]
+        self._combine(x.size, z[0], shifted.sum(axis=0), shifted.T @ shifted)
+
+    def _combine(self, n, shift, sums, products):
+        # Adds the sums of n other points, taken around another shift, once
+        # moved around the shift of the accumulator
+        if n == 0:
+            return
+        if self._n == 0:
+            self._shift = shift
+        else:
+            d = shift - self._shift
+            sums, products = (
+                sums + n * d,
+                products + np.outer(d, sums) + np.outer(sums, d) + n * np.outer(d, d),
+            )
+        self._sums = self._sums + sums
+        self._products = self._products + products
+        self._n += n
+
+    def merge(self, other):
+        """
+        Adds the datas of another accumulator of the same function
+
+        Parameters
+        ----------
+
+        other: LinearAccumulator
+
+        Returns
+        ----------
+        LinearAccumulator
+            self, holding the datas of both accumulators
+        """
+        if other._k != self._k:
+            raise ValueError("Accumulators of different functions can not be merged")
+        self._combine(other._n, other._shift, other._sums, other._products)
+        return self
+
+    def solve(self, full_output=False):
+        """
+        Solves the least-squares problem on all the datas added so far
+
+        Parameters
+        ----------
+
+        full_output: bool, optional
+            if True, the sum of the squared residuals is returned too
+            Default: False
+
+        Returns
+        ----------
+        popt: numpy.ndarray
+        pcov: numpy.ndarray
+        ssr: float
+            only if full_output is True
+        """
+        k, n = self._k, self._n
+        if k > n:
+            raise TypeError(
+                "Improper input: func (n={0}) must not exceed data (m={1})".format(k, n)
+            )
+        # centered scatter matrix of the columns, exact zeros for the constant
+        # ones, whose shifted sums are zero
+        mean = self._sums / n
+        means = self._shift + mean
+        scatter = self._products - n * np.outer(mean, mean)
+        i = _intercept(means[:k], np.diagonal(scatter)[:k])
+        if i is None:
+            # no intercept: back to the moments about zero
+            moments = scatter + n * np.outer(means, means)
+            popt, cov = solve_normal(moments[:k, :k], moments[:k, k])
+            ssr = moments[k, k] - popt @ moments[:k, k]
+        else:
+            others = np.flatnonzero(np.arange(k + 1) != i)[:-1]
+            p, cov = solve_normal(scatter[np.ix_(others, others)], scatter[others, k])
+            popt, cov = _add_intercept(p, cov, means[:k], means[k], i, n)
+            ssr = scatter[k, k] - p @ scatter[others, k]
+        ssr = max(ssr, 0.0)
+        pcov = scale_covariance(cov, ssr, n)
+        if self._inverse is not None:
+            popt, pcov = self._inverse(popt, pcov)
+        if full_output:
+            return popt, pcov, ssr
+        return popt, pcov
+
+
+def linear_accumulator(fdef, f, x, y, nparams):
+    """
+    Returns a LinearAccumulator filled with the datas y(x), if the function f
+    defined by fdef is linear in its parameters, or can be reparametrized to
+    be so.
+
+    Parameters
+    ----------
+
+    fdef: str
+        definition of the fitting function, of type 'fdef ; (param)'
+    f: function
+        the fitting function, compiled from fdef
+    x: numpy.ndarray
+        x values of the datas to fit
+    y: numpy.ndarray
+        y values of the datas to fit
+    nparams: int
+        number of parameters of f
+
+    Returns
+    ----------
+    LinearAccumulator or None
+        None if f is not linear in its parameters
+    """
+    g, inverse = REPARAMETRIZATIONS.get(builtin_name(fdef), (f, None))
+    basis, offset = linear_basis(g, x, nparams)
+    if basis is None:
+        return None
+    accumulator = LinearAccumulator(g, nparams, inverse)
+    accumulator.add(x, y, basis, offset)
+    return accumulator
@@ -0,0 +1,158 @@
+import warnings
+
+import numpy as np
+
+# Bounds on the number of points of a render grid
+MIN_RENDER_POINTS = 50
+MAX_RENDER_POINTS = 10000
+
+
+def render_grid(ax, x, npts=None):
+    """
+    Returns the x values where to evaluate a fitted curve to draw it in ax:
+    npts points spanning the range of x, evenly spaced in the scale of the
+    x axis (geometrically spaced if the scale is log).
+
+    Parameters
+    ----------
+
+    ax: matplotlib.axes.Axes object
+        the axes where the curve will be drawn
+    x: numpy.ndarray
+        x values of the fitted data
+    npts: int, optional
+        number of points of the grid. If not provided, the width of ax in
+        pixels is used, bounded by MIN_RENDER_POINTS and MAX_RENDER_POINTS.
+        Default: None
+
+    Returns
+    ----------
+    numpy.ndarray
+    """
+    x = np.asarray(x, dtype=float)
+    if npts is None:
+        width = ax.get_window_extent().width
+        npts = int(np.clip(np.ceil(width), MIN_RENDER_POINTS, MAX_RENDER_POINTS))
+    if ax.get_xscale() == "log":
+        xpos = x[x > 0]
+        if xpos.size > 0:
+            return np.geomspace(np.nanmin(xpos), np.nanmax(xpos), npts)
+    return np.linspace(np.nanmin(x), np.nanmax(x), npts)
+
+
+def evaluate(f, x, p):
+    """
+    Evaluates f(x, *p) on an array x in a single vectorized call. Functions
+    that do not support numpy arrays (using math.exp for instance) are
+    evaluated point by point instead.
+
+    Parameters
+    ----------
+
+    f: function
+        function of type f(x, *p)
+    x: numpy.ndarray
+        1D array of x values
+    p: tuple or numpy.ndarray
+        parameters of f
+
+    Returns
+    ----------
+    numpy.ndarray
+        array of same shape as x
+    """
+    x = np.asarray(x, dtype=float)
+    try:
+        y = np.asarray(f(x, *p), dtype=float)
+    except (TypeError, ValueError):
+        y = None
+    if y is not None:
+        if y.shape == x.shape:
+            return y
+        if y.ndim == 0:
+            return np.full(x.shape, y)
+    return np.fromiter((f(xi, *p) for xi in x), dtype=float, count=x.size)
+
+
+def _binned(a, size):
+    # Splits a into consecutive bins of size values, the last one being padded
+    # with nan, and returns the (nbins, size) array of the bins
+    nbins = -(-a.size // size)
+    out = np.full(nbins * size, np.nan)
+    out[: a.size] = a
+    return out.reshape(nbins, size)
+
+
+def minmax_decimate(x, y, nbins):
+    """
+    Downsamples the curve y(x) to at most 2 * nbins points, preserving its
+    shape: the points are split into nbins consecutive bins of equal size, and
+    the points of minimum and maximum y of each bin are kept, in their order.
+    Peaks narrower than a bin are thus kept, unlike with a regular sampling.
+
+    Parameters
+    ----------
+
+    x: numpy.ndarray
+        1D array of x values
+    y: numpy.ndarray
+        1D array of y values
+    nbins: int
+        number of bins, typically the width of the axes in pixels
+
+    Returns
+    ----------
+    x: numpy.ndarray
+    y: numpy.ndarray
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if x.size <= 2 * nbins:
+        return x, y
+    size = -(-x.size // nbins)
+    xb, yb = _binned(x, size), _binned(y, size)
+    imin = np.argmin(np.where(np.isnan(yb), np.inf, yb), axis=1)
+    imax = np.argmax(np.where(np.isnan(yb), -np.inf, yb), axis=1)
+    rows = np.arange(xb.shape[0])[:, None]
+    cols = np.column_stack((np.minimum(imin, imax), np.maximum(imin, imax)))
+    xs, ys = xb[rows, cols].ravel(), yb[rows, cols].ravel()
+    keep = ~np.isnan(xs)
+    return xs[keep], ys[keep]
+
+
+def envelope(x, low, up, nbins):
+    """
+    Downsamples a range low(x) < y < up(x) to nbins points, keeping its
+    envelope: the points are split into nbins consecutive bins of equal size,
+    and the minimum of low and the maximum of up are kept in each bin.
+
+    Parameters
+    ----------
+
+    x: numpy.ndarray
+        1D array of x values
+    low: numpy.ndarray
+        1D array of the lower bounds of the range
+    up: numpy.ndarray
+        1D array of the upper bounds of the range
+    nbins: int
+        number of bins, typically the width of the axes in pixels
+
+    Returns
+    ----------
+    x: numpy.ndarray
+        mean x of each bin
+    low: numpy.ndarray
+    up: numpy.ndarray
+    """
+    x = np.asarray(x, dtype=float)
+    if x.size <= nbins:
+        return x, np.asarray(low, dtype=float), np.asarray(up, dtype=float)
+    size = -(-x.size // nbins)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return (
+            np.nanmean(_binned(x, size), axis=1),
+            np.nanmin(_binned(np.asarray(low, dtype=float), size), axis=1),
+            np.nanmax(_binned(np.asarray(up, dtype=float), size), axis=1),
+        )
@@ -0,0 +1,320 @@
+import hashlib
+import os
+import weakref
+
+import numpy as np
+
+# number of points hashed to fingerprint a data set
+FINGERPRINT_POINTS = 4096
+# number of points compared at once to check whether x is monotonic
+MONOTONIC_CHUNK = 2**20
+# ranges of less than 1/PREFIX_RATIO of the points have their moments summed
+# directly, as differences of cumulative sums lose precision on them
+PREFIX_RATIO = 100
+
+# Range indexes already built, one per matplotlib Line2D object
+_line_indexes = weakref.WeakKeyDictionary()
+
+
+class RangeIndex(object):
+    def __init__(self, x, y):
+        """
+        Class indexing a set of xy data by its x values, so that the points
+        lying in any x-range can be extracted without scanning the whole set.
+        If x is already monotonic, the data are used as they are, else they are
+        sorted along x the first time a range is selected. The arrays are not
+        copied: memory-mapped arrays stay on disk until their points are read.
+
+        Parameters
+        ----------
+
+        x: numpy.ndarray
+            1D array of x values
+        y: numpy.ndarray
+            1D array of y values, of same length as x
+        """
+        self._x = np.asarray(x)
+        self._y = np.asarray(y)
+        if self._x.shape != self._y.shape or self._x.ndim != 1:
+            raise ValueError("x and y must be 1D arrays of same length")
+        self._order = None
+        self._xs, self._ys = None, None
+        self._fingerprint = None
+        self._prefix, self._shift = None, None
+
+    def _sort(self):
+        # Finds the order of the data along x, sorting them only if x is not
+        # monotonic
+        if self._xs is not None:
+            return
+        direction = _monotonic(self._x)
+        if direction > 0:
+            self._order = slice(None)
+            self._xs, self._ys = self._x, self._y
+        elif direction < 0:
+            self._order = slice(None, None, -1)
+            self._xs, self._ys = self._x[::-1], self._y[::-1]
+        else:
+            self._order = np.argsort(self._x, kind="stable")
+            self._xs, self._ys = self._x[self._order], self._y[self._order]
+
+    @property
+    def x(self):
+        return self._x
+
+    @property
+    def y(self):
+        return self._y
+
+    @property
+    def sorted_x(self):
+        self._sort()
+        return self._xs
+
+    @property
+    def sorted_y(self):
+        self._sort()
+        return self._ys
+
+    @property
+    def is_monotonic(self):
+        self._sort()
+        return not isinstance(self._order, np.ndarray)
+
+    @property
+    def fingerprint(self):
+        """
+        Cheap fingerprint of the indexed data, identifying them in the fit
+        results cache: the size and the sums of x and y, plus a hash of
+        FINGERPRINT_POINTS evenly spaced points. It is computed once.
+        """
+        if self._fingerprint is None:
+            step = max(1, self._x.size // FINGERPRINT_POINTS)
+            digest = hashlib.blake2b(digest_size=16)
+            for a in (self._x, self._y):
+                digest.update(np.ascontiguousarray(a[::step]).tobytes())
+            with np.errstate(all="ignore"):
+                sums = (float(np.sum(self._x)), float(np.sum(self._y)))
+            self._fingerprint = (self._x.size, sums, digest.hexdigest())
+        return self._fingerprint
+
+    def bounds(self, xrange):
+        """
+        Returns the slice of the sorted data lying strictly inside xrange.
+
+        Parameters
+        ----------
+
+        xrange: tuple
+            (xmin, xmax) bounds of the range, excluded
+
+        Returns
+        ----------
+        slice
+        """
+        self._sort()
+        start = np.searchsorted(self._xs, xrange[0], side="right")
+        stop = np.searchsorted(self._xs, xrange[1], side="left")
+        return slice(int(start), int(max(start, stop)))
+
+    def select(self, xrange=None):
+        """
+        Returns the x and y data lying strictly inside xrange. The returned
+        arrays are views on the indexed data, no copy is made.
+
+        Parameters
+        ----------
+
+        xrange: tuple, optional
+            (xmin, xmax) bounds of the range, excluded. If not provided, the
+            full data set is returned in its original order.
+            Default: None
+
+        Returns
+        ----------
+        x: numpy.ndarray
+        y: numpy.ndarray
+        """
+        if xrange is None:
+            return self._x, self._y
+        sl = self.bounds(xrange)
+        return self._xs[sl], self._ys[sl]
+
+    def _cumulative_sums(self):
+        # Cumulative sums of x, y, x*x, x*y and y*y over the sorted data,
+        # shifted by their middle point to limit the loss of precision
+        if self._prefix is None:
+            self._sort()
+            mid = self._xs.size // 2
+            self._shift = (float(self._xs[mid]), float(self._ys[mid]))
+            dx = np.asarray(self._xs, dtype=float) - self._shift[0]
+            dy = np.asarray(self._ys, dtype=float) - self._shift[1]
+            self._prefix = np.zeros((dx.size + 1, 5))
+            for i, values in enumerate((dx, dy, dx * dx, dx * dy, dy * dy)):
+                np.cumsum(values, out=self._prefix[1:, i])
+        return self._prefix, self._shift
+
+    def moments(self, xrange=None):
+        """
+        Returns the number of points, the means of x and y, and the sums of
+        the squared deviations (x-mx)**2, (x-mx)*(y-my) and (y-my)**2 of the
+        data lying strictly inside xrange: the sufficient statistics of the
+        fit of a straight line (see anafit.core.linear.fit_moments). They are
+        computed in O(log n) time from cumulative sums over the sorted data,
+        built the first time, except for ranges of few points, which are
+        summed directly.
+
+        Parameters
+        ----------
+
+        xrange: tuple, optional
+            (xmin, xmax) bounds of the range, excluded. If not provided, the
+            full data set is used.
+            Default: None
+
+        Returns
+        ----------
+        tuple
+            (n, mx, my, sxx, sxy, syy)
+        """
+        n = self._x.size
+        sl = slice(0, n) if xrange is None else self.bounds(xrange)
+        npts = sl.stop - sl.start
+        if npts == 0:
+            return 0, np.nan, np.nan, 0.0, 0.0, 0.0
+        if npts * PREFIX_RATIO < n:
+            x = np.asarray(self._xs[sl], dtype=float)
+            y = np.asarray(self._ys[sl], dtype=float)
+            dx, dy = x - x.mean(), y - y.mean()
+            return npts, x.mean(), y.mean(), dx @ dx, dx @ dy, dy @ dy
+        prefix, shift = self._cumulative_sums()
+        sx, sy, sxx, sxy, syy = prefix[sl.stop] - prefix[sl.start]
+        mx, my = sx / npts, sy / npts
+        return (
+            npts,
+            shift[0] + mx,
+            shift[1] + my,
+            max(sxx - sx * mx, 0.0),
+            sxy - sx * my,
+            max(syy - sy * my, 0.0),
+        )
+
+
+def _monotonic(x):
+    # Returns 1 if x is non-decreasing, -1 if it is non-increasing (and not
+    # constant), 0 otherwise. x is compared by chunks, so that no temporary
+    # array of its size is created.
+    increasing, decreasing = True, True
+    for start in range(0, max(x.size - 1, 0), MONOTONIC_CHUNK):
+        chunk = x[start : start + MONOTONIC_CHUNK + 1]
+        diff = np.diff(chunk)
+        increasing = increasing and not np.any(diff < 0)
+        decreasing = decreasing and not np.any(diff > 0)
+        if not (increasing or decreasing):
+            return 0
+    return 1 if increasing else -1
+
+
+def load_xy(path, columns=(0, 1)):
+    """
+    Opens the x and y data of a .npy file by memory mapping: the returned
+    arrays are views on the file, whose points are only read when used.
+
+    Parameters
+    ----------
+
+    path: str or os.PathLike
+        path of a .npy file, containing a (npts, ncolumns) array, or a 1D
+        array of y values, fitted against their indices
+    columns: tuple, optional
+        indices of the x and y columns of a 2D array
+        Default: (0, 1)
+
+    Returns
+    ----------
+    x: numpy.ndarray
+    y: numpy.ndarray
+    """
+    data = np.load(path, mmap_mode="r")
+    if data.ndim == 1:
+        return np.arange(data.size, dtype=float), data
+    if data.ndim != 2:
+        raise ValueError("{0} is not a 1D or 2D array".format(path))
+    return data[:, columns[0]], data[:, columns[1]]
+
+
+def data_index(data):
+    """
+    Returns the RangeIndex of datas to fit, given as a matplotlib Line2D
+    object (see range_index), a (x, y) pair of arrays, or the path of a .npy
+    file (see load_xy). Arrays are indexed without copy.
+
+    Parameters
+    ----------
+
+    data: matplotlib.lines.Line2D object, tuple, str or os.PathLike
+
+    Returns
+    ----------
+    RangeIndex
+    """
+    if hasattr(data, "get_xydata"):
+        return range_index(data)
+    if isinstance(data, (str, os.PathLike)):
+        return RangeIndex(*load_xy(data))
+    x, y = data
+    return RangeIndex(x, y)
+
+
+def range_index(line):
+    """
+    Returns the RangeIndex of a matplotlib Line2D object. The index is built
+    the first time and reused afterwards, as long as the line data are not
+    changed (through set_data, set_xdata...)
+
+    Parameters
+    ----------
+
+    line: matplotlib.lines.Line2D object
+
+    Returns
+    ----------
+    RangeIndex
+    """
+    xy = line.get_xydata()
+    cached = _line_indexes.get(line)
+    if cached is not None and cached[0] is xy:
+        return cached[1]
+    index = RangeIndex(xy[:, 0], xy[:, 1])
+    _line_indexes[line] = (xy, index)
+    return index
+
+
+def stratified_sample(n, npts, seed=0):
+    """
+    Returns the indices of a stratified random sample of npts points among n:
+    the n points are split into npts consecutive strata of equal size, and one
+    point is drawn at random in each. On data sorted along x, the sample
+    spans the whole x range evenly, unlike a plain random sample.
+
+    Parameters
+    ----------
+
+    n: int
+        number of points to sample from
+    npts: int
+        number of points of the sample
+    seed: int, optional
+        seed of the random generator
+        Default: 0
+
+    Returns
+    ----------
+    numpy.ndarray
+        sorted array of npts indices, or of all the indices if npts >= n
+    """
+    if npts >= n:
+        return np.arange(n)
+    edges = np.linspace(0, n, npts + 1).astype(int)
+    rng = np.random.default_rng(seed)
+    return edges[:-1] + (rng.random(npts) * np.diff(edges)).astype(int)
@@ -0,0 +1,212 @@
+import collections
+import os
+import time
+
+import numpy as np
+
+from ..utilities import builtin_name, from_fdef, get_fdef
+from .batch import make_executor
+from .linear import (
+    LOG_LINEARIZATIONS,
+    PROBE_POINTS,
+    REPARAMETRIZATIONS,
+    LinearAccumulator,
+    linear_basis,
+)
+from .selection import data_index
+
+# number of points of the chunks yielded by iter_chunks
+CHUNK_POINTS = 2**20
+# number of chunks submitted to the pool in advance, per worker
+QUEUE_PER_WORKER = 2
+
+
+def iter_chunks(data, xrange=None, chunk_size=CHUNK_POINTS):
+    """
+    Yields the datas lying in xrange by chunks of chunk_size points. The
+    chunks are views on the datas: the points of a memory-mapped file are
+    only read when the chunk is used.
+
+    Parameters
+    ----------
+
+    data: matplotlib.lines.Line2D object, tuple, str or os.PathLike
+        datas to split, see anafit.core.selection.data_index
+    xrange: tuple, optional
+        (xmin, xmax) bounds of the range, excluded
+        Default: None
+    chunk_size: int, optional
+        Default: CHUNK_POINTS
+
+    Yields
+    ----------
+    tuple
+        (x, y) arrays of a chunk
+    """
+    x, y = data_index(data).select(xrange)
+    for start in range(0, x.size, chunk_size):
+        yield x[start : start + chunk_size], y[start : start + chunk_size]
+
+
+def _linearization(fdef, log):
+    # Returns the linear function fitted in place of fdef, the inverse change
+    # of parameters, the transform of the datas and the number of parameters
+    f, p0 = from_fdef(fdef)
+    name = builtin_name(fdef)
+    if log:
+        if name not in LOG_LINEARIZATIONS:
+            raise ValueError(
+                "{0} is not linear in log scale, the functions which are: "
+                "{1}".format(fdef, ", ".join(LOG_LINEARIZATIONS))
+            )
+        g, inverse, transform = LOG_LINEARIZATIONS[name]
+    else:
+        g, inverse = REPARAMETRIZATIONS.get(name, (f, None))
+        transform = None
+    return g, inverse, transform, np.size(p0)
+
+
+def chunk_accumulator(fdef, x, y, log=False):
+    """
+    Returns a LinearAccumulator filled with a chunk of the datas. The
+    accumulators of the chunks can be computed in parallel workers, and
+    merged with LinearAccumulator.merge.
+
+    Parameters
+    ----------
+
+    fdef: str
+        definition of the fitting function, of type 'fdef ; (param)'
+    x, y: numpy.ndarray
+        datas of the chunk
+    log: bool, optional
+        see fit_chunks
+        Default: False
+
+    Returns
+    ----------
+    LinearAccumulator
+
+    Raises
+    ----------
+    ValueError
+        if the function is not linear in its parameters, or if the datas
+        are not positive in log scale
+    """
+    g, inverse, transform, nparams = _linearization(fdef, log)
+    accumulator = LinearAccumulator(g, nparams, inverse, transform)
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    probe = slice(None, None, max(1, x.size // PROBE_POINTS))
+    xp, yp = x[probe], y[probe]
+    if transform is not None:
+        xp, yp = transform(xp, yp)
+    if x.size and linear_basis(g, xp, nparams)[0] is None:
+        raise ValueError(
+            "{0} is not linear in its parameters, it can not be fitted by "
+            "chunks".format(fdef)
+        )
+    accumulator.add(x, y)
+    return accumulator
+
+
+def _accumulators(fdef, chunks, log, executor, max_workers):
+    # Yields the accumulators of the chunks, computed in the calling thread,
+    # or in a pool with a bounded number of chunks waiting for a worker
+    if executor is None:
+        for x, y in chunks:
+            yield chunk_accumulator(fdef, x, y, log)
+        return
+    pool = make_executor(executor, max_workers)
+    queue = collections.deque()
+    size = QUEUE_PER_WORKER * (max_workers or os.cpu_count() or 1)
+    try:
+        for x, y in chunks:
+            queue.append(pool.submit(chunk_accumulator, fdef, x, y, log))
+            while len(queue) > size:
+                yield queue.popleft().result()
+        while queue:
+            yield queue.popleft().result()
+    finally:
+        for future in queue:
+            future.cancel()
+        if pool is not executor:
+            pool.shutdown()
+
+
+def fit_chunks(fname, chunks, log=False, executor=None, max_workers=None, info=None):
+    """
+    Fits a function linear in its parameters (polynomials for instance) to
+    datas given by chunks, in bounded memory: only the sufficient statistics
+    of the linear least-squares problem are kept between chunks (see
+    LinearAccumulator), so that datas larger than the memory can be fitted.
+    The results are the ones of fit_arrays on all the datas at once.
+
+    Parameters
+    ----------
+
+    fname: str
+        fitting function name (a key from fitting functions dict), or its
+        definition, of type 'fdef ; (param)'
+    chunks: iterable
+        (x, y) pairs of arrays, see iter_chunks
+    log: bool, optional
+        if True, built-in functions which become linear in log scale are
+        fitted on the logarithms of the datas, as a straight line on a
+        log-log plot for 'ax^n', or on a semilog plot for 'a*exp(x/b)' and
+        'exp(x/a)' (see anafit.core.linear.LOG_LINEARIZATIONS). The squared
+        residuals of the logarithms are minimized, not the ones of y.
+        Default: False
+    executor: str or concurrent.futures.Executor, optional
+        'thread', 'process' or an executor to accumulate the chunks in. An
+        executor given here is not shut down at the end. If not provided,
+        the chunks are accumulated in the calling thread.
+        Default: None
+    max_workers: int, optional
+        number of workers of the pool.
+        Default: None
+    info: dict, optional
+        if provided, filled with information on the fit, as by fit_arrays,
+        plus 'chunks' (number of chunks), 'npts' (number of points) and
+        'log'
+        Default: None
+
+    Returns
+    ----------
+    popt: numpy.ndarray
+        optimal parameters
+    pcov: numpy.ndarray
+        covariance matrix of popt
+    sigma: numpy.ndarray
+        standard deviation of popt
+
+    Raises
+    ----------
+    ValueError
+        if the function is not linear in its parameters
+    """
+    start = time.perf_counter()
+    fdef = get_fdef(fname)
+    g, inverse, transform, nparams = _linearization(fdef, log)
+    accumulator = LinearAccumulator(g, nparams, inverse, transform)
+    nchunks = 0
+    for part in _accumulators(fdef, chunks, log, executor, max_workers):
+        accumulator.merge(part)
+        nchunks += 1
+    popt, pcov, ssr = accumulator.solve(full_output=True)
+    message = "Closed-form linear least-squares solution, by chunks"
+    if info is not None:
+        info.update(
+            method="linear",
+            p0=None,
+            guessed=False,
+            nfev=None,
+            njev=0,
+            cost=0.5 * float(ssr),
+            converged=True,
+            message=message + (" in log scale" if log else ""),
+            chunks=nchunks,
+            npts=accumulator.n,
+            log=log,
+            timings={"linear": time.perf_counter() - start},
+        )
+    return popt, pcov, np.sqrt(np.diagonal(pcov))
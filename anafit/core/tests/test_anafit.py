@@ -1,10 +1,16 @@
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from unittest import TestCase
 
 import matplotlib.pyplot as plt
 import numpy as np
+from scipy import stats
 from scipy.optimize import curve_fit
 
-from anafit.core import Fit
+from anafit.core import Fit, FitInterrupted, fit_arrays, fit_cache
+from anafit.utilities import from_fdef, get_func
 
 
 class TestFit(TestCase):
@@ -22,12 +28,22 @@ class TestFit(TestCase):
         self.p_init = (1, 1)
         self.fname = "ax+b"
 
+    def tearDown(self):
+        plt.close(self.fig)
+
     def get_expected_fit(self, func, x, y, p):
         popt_expected, pcov_expected = curve_fit(func, x, y, p0=p)
         sigma_expected = np.sqrt(np.diagonal(pcov_expected))
 
         return popt_expected, pcov_expected, sigma_expected
 
+    def get_expected_confidence(self, x, popt, pcov, level=0.95, s2=0):
+        # Delta method for the linear function: J = [x, 1]
+        var = x**2 * pcov[0, 0] + 2 * x * pcov[0, 1] + pcov[1, 1] + s2
+        half = stats.t.ppf((1 + level) / 2, self.x.size - 2) * np.sqrt(var)
+        y = self.linear(x, *popt)
+        return y - half, y + half
+
     def test_init_no_options(self):
         # Test if the Fit object is correctly initialized when no optional arguments
         # are provided
@@ -185,30 +201,26 @@ class TestFit(TestCase):
         popt_expected, pcov_expected, sigma_expected = self.get_expected_fit(
             self.linear, self.x, self.y, self.p_init
         )
-        up_expected = self.linear(self.x, *(popt_expected + sigma_expected))
-        low_expected = self.linear(self.x, *(popt_expected - sigma_expected))
 
         # When
         fit.plot()
 
         # Then
-        np.testing.assert_array_almost_equal(fit.linfit.get_xdata(), self.x)
+        xfit = fit.linfit.get_xdata()
+        low_expected, up_expected = self.get_expected_confidence(
+            xfit, popt_expected, pcov_expected
+        )
+        np.testing.assert_array_almost_equal(xfit, fit.xfit)
+        self.assertEqual(xfit[0], self.x[0])
+        self.assertEqual(xfit[-1], self.x[-1])
         np.testing.assert_array_almost_equal(
-            fit.linfit.get_ydata(), self.linear(self.x, *popt_expected)
+            fit.linfit.get_ydata(), self.linear(xfit, *popt_expected)
         )
         np.testing.assert_array_almost_equal(fit.upConfidence, up_expected)
         np.testing.assert_array_almost_equal(fit.lowConfidence, low_expected)
         self.assertTrue(fit._linfit.get_visible())
-        self.assertFalse(fit._linConfidence.get_visible())
-        self.assertFalse(fit._fitbox.get_visible())
-        self.assertEqual(
-            fit._fitbox.get_text(),
-            (
-                f"Fit {self.fname} :\n"
-                f"{popt_expected[0]:.2f} +/- {sigma_expected[0]:.2f}\n"
-                f"{popt_expected[1]:.2f} +/- {sigma_expected[1]:.2f}"
-            ),
-        )
+        self.assertIsNone(fit._linConfidence)
+        self.assertIsNone(fit._fitbox)
 
     def test_plot_show_confidence_and_fitbox(self):
         # Test if the plot method correctly plots the fit, the confidence intervals
@@ -220,16 +232,20 @@ class TestFit(TestCase):
         popt_expected, pcov_expected, sigma_expected = self.get_expected_fit(
             self.linear, self.x, self.y, self.p_init
         )
-        up_expected = self.linear(self.x, *(popt_expected + sigma_expected))
-        low_expected = self.linear(self.x, *(popt_expected - sigma_expected))
 
         # When
         fit.plot(showInfo=True, showConf=True)
 
         # Then
-        np.testing.assert_array_almost_equal(fit.linfit.get_xdata(), self.x)
+        xfit = fit.linfit.get_xdata()
+        low_expected, up_expected = self.get_expected_confidence(
+            xfit, popt_expected, pcov_expected
+        )
+        np.testing.assert_array_almost_equal(xfit, fit.xfit)
+        self.assertEqual(xfit[0], self.x[0])
+        self.assertEqual(xfit[-1], self.x[-1])
         np.testing.assert_array_almost_equal(
-            fit.linfit.get_ydata(), self.linear(self.x, *popt_expected)
+            fit.linfit.get_ydata(), self.linear(xfit, *popt_expected)
         )
         np.testing.assert_array_almost_equal(fit.upConfidence, up_expected)
         np.testing.assert_array_almost_equal(fit.lowConfidence, low_expected)
@@ -245,6 +261,177 @@ class TestFit(TestCase):
             ),
         )
 
+    def test_plot_npts(self):
+        # Test if the fitted curve is evaluated on a grid of npts points
+
+        # Given
+        fit = Fit(self.line, self.fname)
+        fit.fit()
+
+        # When
+        fit.plot(npts=500)
+
+        # Then
+        xfit = fit.linfit.get_xdata()
+        self.assertEqual(xfit.size, 500)
+        np.testing.assert_array_almost_equal(xfit, np.linspace(0, 9, 500))
+        np.testing.assert_array_almost_equal(
+            fit.linfit.get_ydata(), self.linear(xfit, *fit.popt)
+        )
+
+    def test_plot_log_scale(self):
+        # Test if the render grid is geometrically spaced on a log x axis
+
+        # Given
+        x = np.arange(1, 11, 1.0)
+        (line,) = self.ax.plot(x, 3 * x**2)
+        self.ax.set_xscale("log")
+        fit = Fit(line, "ax^n")
+        fit.fit()
+
+        # When
+        fit.plot(npts=100)
+
+        # Then
+        np.testing.assert_array_almost_equal(
+            fit.linfit.get_xdata(), np.geomspace(1, 10, 100)
+        )
+
+    def test_plot_not_vectorized_function(self):
+        # Test the point by point fallback for functions not supporting arrays
+
+        # Given
+        fname = "lambda x, a, b: a*x + b if x > 5 else b ; (1, 1)"
+        fit = Fit(self.line, fname)
+        fit._popt, fit._sigma = np.array([2.0, 1.0]), np.array([0.1, 0.1])
+
+        # When
+        fit.plot(npts=20)
+
+        # Then
+        xfit = fit.linfit.get_xdata()
+        np.testing.assert_array_almost_equal(
+            fit.linfit.get_ydata(), np.where(xfit > 5, 2 * xfit + 1, 1)
+        )
+
+    def test_confidence_level_and_prediction(self):
+        # Given
+        fit = Fit(self.line, self.fname)
+        fit.fit()
+        fit.plot(npts=20)
+        residuals = self.y - self.linear(self.x, *fit.popt)
+        s2 = residuals @ residuals / (self.x.size - 2)
+
+        # When
+        fit.show_confidence(True, level=0.68, prediction=True)
+
+        # Then
+        low_expected, up_expected = self.get_expected_confidence(
+            fit.xfit, fit.popt, fit.pcov, level=0.68, s2=s2
+        )
+        np.testing.assert_array_almost_equal(fit.lowConfidence, low_expected)
+        np.testing.assert_array_almost_equal(fit.upConfidence, up_expected)
+        vertices = fit._linConfidence.get_paths()[0].vertices
+        self.assertAlmostEqual(vertices[:, 1].max(), up_expected.max())
+
+    def test_confidence_cached(self):
+        # Given
+        fit = Fit(self.line, self.fname)
+        fit.fit()
+        fit.plot(npts=20)
+
+        # When
+        low, up = fit.confidence()
+
+        # Then
+        self.assertIs(fit.confidence()[0], low)
+        fit.p = (2, 2)
+        self.assertIsNot(fit.confidence()[0], low)
+
+    def test_confidence_numerical_jacobian(self):
+        # Test if the confidence range of a function without jacobian matches
+        # the one of the same function with an analytic jacobian
+
+        # Given
+        fit = Fit(self.line, "lambda x, a, b: a*x + b if True else 0 ; (1, 1)")
+        fit.fit()
+        fit.plot(npts=20)
+
+        # When
+        low, up = fit.confidence()
+
+        # Then
+        low_expected, up_expected = self.get_expected_confidence(
+            fit.xfit, fit.popt, fit.pcov
+        )
+        np.testing.assert_array_almost_equal(low, low_expected)
+        np.testing.assert_array_almost_equal(up, up_expected)
+
+    def test_show_hide_artists(self):
+        # Test if the confidence range and the fit box are created when first
+        # shown, and only hidden afterwards
+
+        # Given
+        fit = Fit(self.line, self.fname)
+        fit.fit()
+        fit.plot()
+
+        # When
+        fit.show_confidence(True)
+        fit.show_fitInfo(True)
+        confidence, fitbox = fit._linConfidence, fit._fitbox
+        fit.show_confidence(False)
+        fit.show_fitInfo(False)
+
+        # Then
+        self.assertIs(fit._linConfidence, confidence)
+        self.assertIs(fit._fitbox, fitbox)
+        self.assertFalse(confidence.get_visible())
+        self.assertFalse(fitbox.get_visible())
+
+    def test_refit_updates_artists(self):
+        # Test if the artists of a plotted fit are updated in place on refit
+
+        # Given
+        fit = Fit(self.line, self.fname)
+        fit.fit()
+        fit.plot(showInfo=True, showConf=True, npts=50)
+        linfit, confidence, fitbox = fit.linfit, fit._linConfidence, fit._fitbox
+        nartists = len(self.ax.get_children())
+
+        # When
+        fit.xrange = (2, 7)
+
+        # Then
+        self.assertIs(fit.linfit, linfit)
+        self.assertIs(fit._linConfidence, confidence)
+        self.assertIs(fit._fitbox, fitbox)
+        self.assertEqual(len(self.ax.get_children()), nartists)
+        np.testing.assert_array_almost_equal(
+            fit.linfit.get_xdata(), np.linspace(3, 6, 50)
+        )
+        np.testing.assert_array_almost_equal(
+            fit.linfit.get_ydata(), self.linear(fit.xfit, *fit.popt)
+        )
+        vertices = confidence.get_paths()[0].vertices
+        self.assertAlmostEqual(vertices[:, 0].min(), 3)
+        self.assertAlmostEqual(vertices[:, 0].max(), 6)
+        self.assertIn(f"{fit.popt[0]:.2f} +/- {fit.sigma[0]:.2f}", fitbox.get_text())
+
+    def test_remove(self):
+        # Given
+        fit = Fit(self.line, self.fname)
+        fit.fit()
+        fit.plot(showInfo=True, showConf=True)
+        nartists = len(self.ax.get_children())
+
+        # When
+        fit.remove()
+
+        # Then
+        self.assertEqual(len(self.ax.get_children()), nartists - 3)
+        self.assertIsNone(fit.linfit)
+
     def test_show_fitInfo(self):
         # Given
         fit = Fit(self.line, self.fname)
@@ -307,3 +494,279 @@ class TestFit(TestCase):
                 f"Uncertainty : {fit.sigma}\n"
             ),
         )
+
+    def test_fit_with_jacobian(self):
+        # Test if fitting with the analytic jacobian gives the same result than
+        # with finite differences
+
+        # Given
+        x = np.linspace(0, 5, 50)
+        (line,) = self.ax.plot(x, 2 * np.exp(x / 1.5) + 0.1 * np.cos(7 * x))
+        f, _ = from_fdef(get_func("a*exp(x/b)"))
+        popt_expected, pcov_expected = curve_fit(f, x, line.get_ydata(), p0=(1, 1))
+
+        # When
+        fit = Fit(line, "a*exp(x/b)")
+        fit.fit()
+
+        # Then
+        self.assertIsNotNone(fit.jac)
+        np.testing.assert_array_almost_equal(fit.popt, popt_expected)
+        np.testing.assert_allclose(fit.pcov, pcov_expected, rtol=1e-4)
+
+    def test_fit_with_guess(self):
+        # Test if initialising parameters are estimated from the datas when not
+        # provided
+
+        # Given
+        x = np.linspace(0, 5, 50)
+        (line,) = self.ax.plot(x, 50 * np.exp(-x / 3) + 0.1 * np.cos(7 * x))
+        fit = Fit(line, "a*exp(x/b)")
+
+        # When
+        fit.fit()
+
+        # Then
+        self.assertTrue(fit.info["guessed"])
+        self.assertEqual(fit.p, (1, 1))
+        np.testing.assert_allclose(fit.p0, (50, -3), rtol=0.05)
+        np.testing.assert_allclose(fit.popt, (50, -3), rtol=0.01)
+        self.assertGreater(fit.guess_savings(), 0)
+        self.assertEqual(fit.info["nfev_saved"], fit.guess_savings())
+
+    def test_fit_without_guess_when_p_given(self):
+        # Given
+        x = np.linspace(0, 5, 50)
+        (line,) = self.ax.plot(x, 2 * np.exp(x / 1.5))
+        fit = Fit(line, "a*exp(x/b)", p=(1.5, 1))
+
+        # When
+        fit.fit()
+
+        # Then
+        self.assertFalse(fit.info["guessed"])
+        self.assertEqual(fit.p0, (1.5, 1))
+        self.assertEqual(fit.guess_savings(), 0)
+
+    def test_update_unchanged_line(self):
+        # Given
+        fit = Fit(self.line, self.fname)
+        fit.fit()
+
+        # Then
+        self.assertFalse(fit.update())
+
+    def test_stream_appended_points_linear(self):
+        # Given
+        fit = Fit(self.line, self.fname, xrange=(-1, 12))
+        fit.stream()
+        x = np.arange(0, 15, 1)
+        y = 2 * x + 5 + np.array([-1, 1] * 7 + [0])
+
+        # When
+        self.line.set_data(x, y)
+        updated = fit.update()
+
+        # Then
+        keep = x < 12
+        popt_expected, pcov_expected, _ = self.get_expected_fit(
+            self.linear, x[keep], y[keep], self.p_init
+        )
+        self.assertTrue(updated)
+        self.assertTrue(fit.info["incremental"])
+        self.assertEqual(fit.info["npts_added"], 2)
+        self.assertIsNone(fit.info["nfev"])
+        np.testing.assert_allclose(fit.popt, popt_expected)
+        np.testing.assert_allclose(fit.pcov, pcov_expected, rtol=1e-6)
+        np.testing.assert_array_equal(fit.xdata, x[keep])
+        fit.stop_stream()
+        self.assertFalse(fit.streaming)
+
+    def test_stream_edited_point_refit(self):
+        # Given
+        x = np.arange(0, 100, 1.0)
+        y = 2 * x + 5 + np.cos(x)
+        self.line.set_data(x, y)
+        fit = Fit(self.line, self.fname)
+        fit.stream()
+
+        # When
+        x, y = np.append(x, 100), np.append(y, 205)
+        y[50] += 10
+        self.line.set_data(x, y)
+        fit.update()
+
+        # Then
+        popt_expected, pcov_expected, _ = self.get_expected_fit(
+            self.linear, x, y, self.p_init
+        )
+        self.assertFalse(fit.info["incremental"])
+        np.testing.assert_allclose(fit.popt, popt_expected)
+        np.testing.assert_allclose(fit.pcov, pcov_expected, rtol=1e-6)
+        fit.stop_stream()
+
+    def test_stream_offset_x(self):
+        # Given
+        x = 1e8 + np.linspace(0, 1, 1000)
+        y = 2 * (x - 1e8) + 1 + np.cos(50 * x)
+        self.line.set_data(x[:600], y[:600])
+        fit = Fit(self.line, self.fname)
+        fit.stream()
+
+        # When
+        self.line.set_data(x, y)
+        fit.update()
+
+        # Then
+        popt, pcov, _ = fit_arrays(get_func(self.fname), x, y)
+        self.assertTrue(fit.info["incremental"])
+        np.testing.assert_allclose(fit.popt, popt, rtol=1e-9)
+        np.testing.assert_allclose(fit.pcov, pcov, rtol=1e-6)
+        fit.stop_stream()
+
+    def test_stream_replaced_datas_warm_start(self):
+        # Given
+        x = np.linspace(1, 10, 50)
+        self.line.set_data(x, 2 * np.exp(x / 4))
+        fit = Fit(self.line, "a*exp(x/b)")
+        fit.stream()
+
+        # When
+        self.line.set_data(x, 2.5 * np.exp(x / 4))
+        fit.update()
+
+        # Then
+        self.assertTrue(fit.info["warm_start"])
+        self.assertFalse(fit.info["incremental"])
+        np.testing.assert_allclose(fit.info["p0"], [2, 4])
+        np.testing.assert_allclose(fit.popt, [2.5, 4])
+        fit.remove()
+        self.assertFalse(fit.streaming)
+
+    def test_fit_subsample_and_polish(self):
+        # Given
+        x = np.linspace(1, 10, 5000)
+        y = 2 * np.exp(x / 4) + np.cos(50 * x)
+        self.line.set_data(x, y)
+        expected = Fit(self.line, "a*exp(x/b)")
+        expected.fit(cache=False)
+
+        # When
+        fit = Fit(self.line, "a*exp(x/b)", subsample=200)
+        fit.fit()
+        preview = Fit(self.line, "a*exp(x/b)", subsample=200, polish=False)
+        preview.fit()
+
+        # Then
+        np.testing.assert_allclose(fit.popt, expected.popt, rtol=1e-6)
+        self.assertEqual(fit.info["subsample"]["npts"], 200)
+        self.assertTrue(fit.info["subsample"]["polished"])
+        self.assertLessEqual(fit.info["nfev"], expected.info["nfev"])
+        np.testing.assert_allclose(preview.popt, expected.popt, rtol=1e-2)
+        self.assertFalse(np.allclose(preview.popt, expected.popt, rtol=1e-9))
+
+    def test_plot_oversample(self):
+        # Given
+        x = np.linspace(0, 10, 100)
+        self.line.set_data(x, np.sin(50 * x))
+        fit = Fit(self.line, "lambda x, a: np.sin(a*x) ; (50)", oversample=20)
+        fit.fit()
+
+        # When
+        fit.plot(showConf=True, npts=100)
+
+        # Then
+        xline, yline = fit.linfit.get_data()
+        self.assertEqual(fit.xfit.size, 2000)
+        self.assertLessEqual(xline.size, 200)
+        self.assertGreater(yline.max(), 0.99)
+        self.assertLess(yline.min(), -0.99)
+        polygon = fit._linConfidence.get_paths()[0].vertices
+        self.assertLessEqual(len(polygon), 2 * 100 + 3)
+
+    def test_xrange_setter_from_moments(self):
+        # Given
+        fit = Fit(self.line, self.fname)
+        expected = Fit(self.line, self.fname, xrange=(2, 7))
+        expected.fit(cache=False)
+
+        # When
+        fit.xrange = (2, 7)
+
+        # Then
+        np.testing.assert_allclose(fit.popt, expected.popt)
+        np.testing.assert_allclose(fit.pcov, expected.pcov)
+        self.assertEqual(fit.info["method"], "moments")
+        self.assertAlmostEqual(fit.info["cost"], expected.info["cost"])
+        y = self.y[3:7]
+        r2 = 1 - 2 * expected.info["cost"] / np.sum((y - y.mean()) ** 2)
+        self.assertAlmostEqual(fit.info["r2"], r2)
+        fit.fname = "a*exp(x/b)"
+        fit.xrange = (1, 8)
+        self.assertEqual(fit.info["method"], "curve_fit")
+
+    def test_fit_arrays_and_npy_file(self):
+        # Given
+        expected = Fit(self.line, self.fname, xrange=(1, 8))
+        expected.fit(cache=False)
+
+        # When
+        fit = Fit((self.x, self.y), self.fname, xrange=(1, 8))
+        fit.fit(cache=False)
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "data.npy")
+            np.save(path, self.xy.astype(float))
+            mapped = Fit(path, self.fname, xrange=(1, 8))
+            mapped.fit(cache=False)
+            mapped_x, mapped_popt = np.array(mapped.xdata), mapped.popt
+            del mapped
+
+        # Then
+        np.testing.assert_allclose(fit.popt, expected.popt)
+        np.testing.assert_allclose(mapped_popt, expected.popt)
+        np.testing.assert_array_equal(mapped_x, self.x[2:8])
+        self.assertFalse(fit.update())
+        with self.assertRaises(TypeError):
+            fit.stream()
+        fit.plot(ax=self.ax)
+        self.assertIs(fit.linfit.axes, self.ax)
+
+    def test_submit_and_set_results(self):
+        # Given
+        fit_cache.clear()
+        fit = Fit(self.line, "a*exp(x/b)")
+
+        # When
+        with ThreadPoolExecutor(1) as executor:
+            future = fit.submit(executor)
+            fit.set_results(future.result())
+        cached = Fit(self.line, "a*exp(x/b)").submit(None)
+
+        # Then
+        expected = Fit(self.line, "a*exp(x/b)")
+        expected.fit(cache=False)
+        np.testing.assert_array_equal(fit.popt, expected.popt)
+        self.assertFalse(fit.info["cached"])
+        self.assertTrue(cached.done())
+        np.testing.assert_array_equal(cached.result()[0], expected.popt)
+
+    def test_fit_budget_and_cancel(self):
+        # Given
+        fit = Fit(self.line, "a*exp(x/b)")
+        cancel = threading.Event()
+        cancel.set()
+
+        # Then
+        with self.assertRaisesRegex(FitInterrupted, "budget"):
+            fit.fit(cache=False, budget=0)
+        with self.assertRaisesRegex(FitInterrupted, "cancelled"):
+            fit.fit(cache=False, cancel=cancel)
+        self.assertIsNone(fit.popt)
+
+    def test_fit_maxfev(self):
+        # Given
+        fit = Fit(self.line, "a*exp(x/b)")
+
+        # Then
+        with self.assertRaisesRegex(RuntimeError, "maxfev"):
+            fit.fit(cache=False, maxfev=2)
@@ -0,0 +1,203 @@
+from unittest import TestCase
+
+import matplotlib.pyplot as plt
+import numpy as np
+from scipy.optimize import curve_fit
+
+from anafit.core import Fit, compare_models, fit_cache, fit_many
+
+
+class TestFitMany(TestCase):
+    def setUp(self):
+        self.x = np.arange(0, 10, 1.0)
+        noise = np.array([-1, 1] * 5)
+        self.datasets = [(self.x, a * self.x + 5 + noise) for a in (1, 2, 3)]
+        self.linear = lambda x, a, b: a * x + b
+
+    def get_expected_popt(self, x, y, p=(1, 1)):
+        return curve_fit(self.linear, x, y, p0=p)[0]
+
+    def assert_results(self, results, datasets):
+        self.assertEqual([r.index for r in results], list(range(len(datasets))))
+        for result, (x, y) in zip(results, datasets):
+            self.assertTrue(result.ok)
+            self.assertEqual(result.npts, len(x))
+            np.testing.assert_array_almost_equal(
+                result.popt, self.get_expected_popt(x, y)
+            )
+
+    def test_fit_many_threads(self):
+        # When
+        results = fit_many(self.datasets, "ax+b")
+
+        # Then
+        self.assert_results(results, self.datasets)
+
+    def test_fit_many_info(self):
+        # When
+        results = fit_many(self.datasets, "ax+b", executor="process")
+
+        # Then
+        for result, (x, y) in zip(results, self.datasets):
+            self.assertEqual(result.info["method"], "linear")
+            ssr = np.sum((y - self.linear(x, *result.popt)) ** 2)
+            self.assertAlmostEqual(result.ssr, ssr)
+            self.assertAlmostEqual(result.redchi2, ssr / (x.size - 2))
+            self.assertIsNotNone(result.aic)
+
+    def test_fit_many_processes(self):
+        # When
+        results = fit_many(self.datasets, "ax+b", executor="process", max_workers=2)
+
+        # Then
+        self.assert_results(results, self.datasets)
+
+    def test_fit_many_inline_definition_processes(self):
+        # When
+        results = fit_many(
+            self.datasets,
+            "lambda x, a, b: a*x + b ; (1, 1)",
+            executor="process",
+            max_workers=2,
+        )
+
+        # Then
+        self.assert_results(results, self.datasets)
+
+    def test_fit_many_lines_with_xrange(self):
+        # Given
+        fig, ax = plt.subplots()
+        lines = [ax.plot(x, y)[0] for x, y in self.datasets]
+
+        # When
+        results = fit_many(lines, "ax+b", xrange=(2, 7))
+
+        # Then
+        self.assert_results(results, [(x[3:7], y[3:7]) for x, y in self.datasets])
+        plt.close(fig)
+
+    def test_fit_many_errors(self):
+        # Given
+        datasets = [self.datasets[0], (self.x[:1], self.x[:1]), self.datasets[1]]
+
+        # When
+        results = fit_many(datasets, "ax+b")
+
+        # Then
+        self.assertTrue(results[0].ok)
+        self.assertFalse(results[1].ok)
+        self.assertIsInstance(results[1].error, TypeError)
+        self.assertIsNone(results[1].popt)
+        self.assertTrue(results[2].ok)
+
+    def test_fit_many_bad_datasets(self):
+        # Given
+        datasets = [
+            self.datasets[0],
+            (self.x, self.x[:5]),
+            "missing.npy",
+            self.datasets[1],
+        ]
+
+        # When
+        results = fit_many(datasets, "ax+b")
+
+        # Then
+        self.assert_results([results[0]], self.datasets[:1])
+        self.assertIsInstance(results[1].error, ValueError)
+        self.assertIsInstance(results[2].error, OSError)
+        self.assertEqual(results[2].npts, 0)
+        self.assertTrue(results[3].ok)
+        self.assertEqual(results[3].index, 3)
+
+
+class TestCompareModels(TestCase):
+    def setUp(self):
+        fit_cache.clear()
+        self.x = np.linspace(1, 10, 200)
+        self.y = 2 * self.x**1.5 * (1 + 0.01 * np.cos(37 * self.x))
+
+    def tearDown(self):
+        fit_cache.clear()
+
+    def test_ranking(self):
+        # When
+        comparison = compare_models(
+            (self.x, self.y), ["ax+b", "ax^n", "constant"], criterion="bic"
+        )
+
+        # Then
+        self.assertEqual([r.fdef for r in comparison], ["ax^n", "ax+b", "constant"])
+        self.assertEqual(comparison.best.fdef, "ax^n")
+        bics = [r.bic for r in comparison]
+        self.assertEqual(bics, sorted(bics))
+        self.assertGreater(comparison.time, 0)
+        self.assertIn("ax^n", comparison.table())
+
+    def test_criteria(self):
+        # Given
+        comparison = compare_models((self.x, self.y), ["ax+b"])
+        result = comparison.best
+        n, k = self.x.size, 2
+
+        # When
+        popt = np.polyfit(self.x, self.y, 1)
+        ssr = np.sum((self.y - np.polyval(popt, self.x)) ** 2)
+
+        # Then
+        self.assertAlmostEqual(result.ssr, ssr)
+        self.assertAlmostEqual(result.aic, n * np.log(ssr / n) + 2 * k)
+        self.assertAlmostEqual(result.bic, n * np.log(ssr / n) + k * np.log(n))
+        self.assertAlmostEqual(result.redchi2, ssr / (n - k))
+
+    def test_errors_ranked_last(self):
+        # When
+        comparison = compare_models(
+            (self.x[:2], self.y[:2]), ["a+b(x-c)^n", "constant"], criterion="redchi2"
+        )
+
+        # Then
+        self.assertEqual(comparison.best.fdef, "constant")
+        self.assertFalse(comparison.results[-1].ok)
+        self.assertIn("error", comparison.table())
+
+    def test_unknown_model(self):
+        # When
+        comparison = compare_models((self.x, self.y), ["ax+b", "nosuch", "ax^n"])
+
+        # Then
+        self.assertEqual(comparison.best.fdef, "ax^n")
+        self.assertEqual(comparison.results[-1].fdef, "nosuch")
+        self.assertIsInstance(comparison.results[-1].error, KeyError)
+        self.assertTrue(comparison.results[1].ok)
+
+    def test_unreadable_datas(self):
+        # When
+        comparison = compare_models("missing.npy", ["ax+b", "constant"])
+
+        # Then
+        self.assertIsNone(comparison.best)
+        for result in comparison:
+            self.assertIsInstance(result.error, OSError)
+            self.assertEqual(result.npts, 0)
+
+    def test_all_models_on_line_fill_cache(self):
+        # Given
+        fig, ax = plt.subplots()
+        (line,) = ax.plot(self.x, self.y)
+
+        # When
+        comparison = compare_models(line, xrange=(2, 9))
+        fit = Fit(line, comparison.results[3].fdef, xrange=(2, 9))
+        fit.fit()
+        plt.close(fig)
+
+        # Then
+        self.assertEqual(comparison.best.fdef, "ax^n")
+        self.assertTrue(fit.info["cached"])
+        np.testing.assert_array_equal(fit.popt, comparison.results[3].popt)
+
+    def test_unknown_criterion(self):
+        # Then
+        with self.assertRaises(ValueError):
+            compare_models((self.x, self.y), ["ax"], criterion="r2")
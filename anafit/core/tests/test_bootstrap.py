@@ -0,0 +1,117 @@
+import json
+from unittest import TestCase
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from anafit.core import Fit, bootstrap, fit_arrays, fit_cache
+from anafit.utilities import get_func
+
+
+class TestBootstrap(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.x = np.linspace(1, 10, 200)
+        self.noise = rng.normal(0, 0.5, self.x.size)
+
+    def fit(self, fname, y):
+        fdef = get_func(fname)
+        return fdef, fit_arrays(fdef, self.x, y)
+
+    def test_linear_residuals_matches_covariance(self):
+        # Given
+        y = 2 * self.x + 1 + self.noise
+        fdef, (popt, pcov, sigma) = self.fit("ax+b", y)
+
+        # When
+        result = bootstrap(fdef, self.x, y, popt, nboot=2000, seed=1)
+
+        # Then
+        self.assertEqual(result.n, 2000)
+        np.testing.assert_allclose(result.sigma, sigma, rtol=0.1)
+        low, up = result.intervals.T
+        self.assertTrue(np.all(low < popt) and np.all(popt < up))
+
+    def test_linear_pairs_matches_loop(self):
+        # Given
+        y = 2 * self.x + 1 + self.noise
+        fdef, (popt, pcov, sigma) = self.fit("ax+b", y)
+        seed = np.random.SeedSequence(3)
+
+        # When
+        result = bootstrap(fdef, self.x, y, popt, nboot=20, method="pairs", seed=seed)
+
+        # Then
+        rng = np.random.default_rng(np.random.SeedSequence(3).spawn(1)[0])
+        index = rng.integers(0, self.x.size, (20, self.x.size))
+        expected = [np.polyfit(self.x[i], y[i], 1) for i in index]
+        np.testing.assert_allclose(result.samples, expected)
+
+    def test_reparametrized_linear(self):
+        # Given
+        y = 2 * (self.x - 3) + self.noise
+        fdef, (popt, pcov, sigma) = self.fit("a(x-b)", y)
+
+        # When
+        result = bootstrap(fdef, self.x, y, popt, nboot=2000, seed=1)
+
+        # Then
+        np.testing.assert_allclose(np.median(result.samples, axis=0), popt, rtol=0.01)
+        np.testing.assert_allclose(result.sigma, sigma, rtol=0.1)
+
+    def test_nonlinear_is_reproducible_across_executors(self):
+        # Given
+        y = 2 * np.exp(self.x / 4) + self.noise
+        fdef, (popt, pcov, sigma) = self.fit("a*exp(x/b)", y)
+
+        # When
+        threads = bootstrap(fdef, self.x, y, popt, nboot=100, seed=2, executor="thread")
+        processes = bootstrap(fdef, self.x, y, popt, nboot=100, seed=2, max_workers=2)
+
+        # Then
+        self.assertEqual(threads.n + threads.failed, 100)
+        np.testing.assert_allclose(threads.samples, processes.samples)
+        np.testing.assert_allclose(threads.sigma, sigma, rtol=0.3)
+
+    def test_budget(self):
+        # Given
+        y = 2 * np.exp(self.x / 4) + self.noise
+        fdef, (popt, pcov, sigma) = self.fit("a*exp(x/b)", y)
+
+        # When
+        result = bootstrap(
+            fdef, self.x, y, popt, nboot=10**6, executor="thread", budget=0.2
+        )
+
+        # Then
+        self.assertLess(result.n, 10**6)
+        self.assertLess(result.time, 5)
+
+    def test_wrong_method(self):
+        with self.assertRaises(ValueError):
+            bootstrap(get_func("ax+b"), self.x, self.x, (1, 0), method="jackknife")
+
+
+class TestFitBootstrap(TestCase):
+    def setUp(self):
+        fit_cache.clear()
+        self.fig, ax = plt.subplots()
+        x = np.linspace(1, 10, 100)
+        (self.line,) = ax.plot(x, 3 * x - 2 + np.cos(7 * x))
+
+    def tearDown(self):
+        plt.close(self.fig)
+
+    def test_fit_bootstrap(self):
+        # Given
+        fit = Fit(self.line, "ax+b")
+
+        # When
+        result = fit.bootstrap(nboot=500, level=0.9, seed=0)
+
+        # Then
+        np.testing.assert_array_equal(result.popt, fit.popt)
+        self.assertEqual(result.level, 0.9)
+        metrics = json.loads(json.dumps(fit.metrics))
+        self.assertEqual(metrics["bootstrap"]["n"], 500)
+        np.testing.assert_allclose(metrics["bootstrap"]["sigma"], result.sigma)
@@ -0,0 +1,157 @@
+from unittest import TestCase, mock
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from anafit.core import anafit
+from anafit.core.anafit import Fit
+from anafit.core.cache import FitCache, fit_cache, fit_key
+from anafit.core.selection import RangeIndex
+
+
+class TestFitCache(TestCase):
+    def setUp(self):
+        self.results = (np.ones(2), np.eye(2), np.ones(2), {"nfev": 3})
+
+    def test_get_returns_copies_and_counts(self):
+        # Given
+        cache = FitCache(maxsize=2)
+        cache.put("a", *self.results)
+
+        # When
+        popt, pcov, sigma, info = cache.get("a")
+        popt[0] = 5
+        missing = cache.get("b")
+
+        # Then
+        self.assertIsNone(missing)
+        np.testing.assert_array_equal(cache.get("a")[0], [1, 1])
+        self.assertEqual(info, {"nfev": 3})
+        self.assertEqual(cache.info()[:3], (2, 1, 0))
+
+    def test_least_recently_used_is_evicted(self):
+        # Given
+        cache = FitCache(maxsize=2)
+        cache.put("a", *self.results)
+        cache.put("b", *self.results)
+        cache.get("a")
+
+        # When
+        cache.put("c", *self.results)
+
+        # Then
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertEqual(cache.info().evictions, 1)
+        self.assertEqual(cache.info().currsize, 2)
+
+    def test_clear(self):
+        # Given
+        cache = FitCache()
+        cache.put("a", *self.results)
+        cache.get("a")
+
+        # When
+        cache.clear()
+
+        # Then
+        self.assertEqual(cache.info()[:3], (0, 0, 0))
+        self.assertIsNone(cache.get("a"))
+
+    def test_fingerprint_depends_on_datas(self):
+        # Given
+        x = np.linspace(0, 1, 100000)
+        y = x.copy()
+        y2 = x.copy()
+        y2[1] += 1e-3
+
+        # When
+        fp = RangeIndex(x, y).fingerprint
+        fp_same = RangeIndex(x.copy(), y.copy()).fingerprint
+        fp_other = RangeIndex(x, y2).fingerprint
+
+        # Then
+        self.assertEqual(fp, fp_same)
+        self.assertNotEqual(fp, fp_other)
+
+    def test_fit_key_uses_selected_points(self):
+        # Given
+        index = RangeIndex(np.arange(10.0), np.arange(10.0))
+
+        # When
+        key1 = fit_key(index.fingerprint, "f", index.bounds((2.5, 6.5)), None)
+        key2 = fit_key(index.fingerprint, "f", index.bounds((2.1, 6.9)), None)
+
+        # Then
+        self.assertEqual(key1, key2)
+
+
+class TestFitMemoization(TestCase):
+    def setUp(self):
+        fit_cache.clear()
+        self.fig, ax = plt.subplots()
+        x = np.linspace(1, 10, 200)
+        (self.line,) = ax.plot(x, 2 * np.exp(x / 4))
+
+    def tearDown(self):
+        plt.close(self.fig)
+        fit_cache.clear()
+
+    def test_repeated_fit_is_not_recomputed(self):
+        # Given
+        first = Fit(self.line, "a*exp(x/b)", (2, 8))
+        first.fit()
+
+        # When
+        with mock.patch.object(anafit, "fit_arrays") as fit_arrays:
+            second = Fit(self.line, "a*exp(x/b)", (2, 8))
+            second.fit()
+
+        # Then
+        fit_arrays.assert_not_called()
+        np.testing.assert_array_equal(second.popt, first.popt)
+        np.testing.assert_array_equal(second.pcov, first.pcov)
+        self.assertFalse(first.info["cached"])
+        self.assertTrue(second.info["cached"])
+
+    def test_setters_reuse_previous_results(self):
+        # Given
+        fit = Fit(self.line, "a*exp(x/b)")
+        fit.fit()
+        popt = fit.popt
+
+        # When
+        fit.xrange = (2, 8)
+        fit.xrange = None
+
+        # Then
+        np.testing.assert_array_equal(fit.popt, popt)
+        self.assertTrue(fit.info["cached"])
+        self.assertEqual(fit_cache.info().hits, 1)
+
+    def test_changed_datas_are_fitted_again(self):
+        # Given
+        fit = Fit(self.line, "a*exp(x/b)")
+        fit.fit()
+
+        # When
+        x = self.line.get_xdata()
+        self.line.set_data(x, 3 * np.exp(x / 4))
+        fit = Fit(self.line, "a*exp(x/b)")
+        fit.fit()
+
+        # Then
+        self.assertFalse(fit.info["cached"])
+        self.assertAlmostEqual(fit.popt[0], 3)
+
+    def test_cache_can_be_bypassed(self):
+        # Given
+        Fit(self.line, "a*exp(x/b)").fit()
+
+        # When
+        fit = Fit(self.line, "a*exp(x/b)")
+        fit.fit(cache=False)
+
+        # Then
+        self.assertFalse(fit.info["cached"])
+        self.assertEqual(fit_cache.info().hits, 0)
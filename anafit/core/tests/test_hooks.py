@@ -0,0 +1,171 @@
+import contextlib
+import io
+import json
+from unittest import TestCase
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from anafit.core import (
+    Fit,
+    add_fit_hook,
+    fit_arrays,
+    fit_cache,
+    fit_hooks,
+    log_fit,
+    print_fit,
+    remove_fit_hook,
+)
+from anafit.utilities import get_func
+
+
+class TestFitInfo(TestCase):
+    def setUp(self):
+        self.x = np.linspace(1, 10, 100)
+        self.y = 2 * np.exp(self.x / 4) + np.cos(7 * self.x)
+
+    def test_curve_fit_info(self):
+        # Given
+        info = {}
+
+        # When
+        popt, pcov, sigma = fit_arrays(
+            get_func("a*exp(x/b)"), self.x, self.y, info=info
+        )
+
+        # Then
+        residuals = self.y - popt[0] * np.exp(self.x / popt[1])
+        self.assertAlmostEqual(info["cost"], 0.5 * residuals @ residuals)
+        self.assertTrue(info["converged"])
+        self.assertIsInstance(info["message"], str)
+        self.assertGreater(info["njev"], 0)
+        self.assertEqual(
+            set(info["timings"]), {"linear", "guess", "optimizer", "model"}
+        )
+        self.assertGreater(info["timings"]["model"], 0)
+
+    def test_linear_info(self):
+        # Given
+        info = {}
+
+        # When
+        popt, pcov, sigma = fit_arrays(get_func("ax+b"), self.x, self.y, info=info)
+
+        # Then
+        residuals = self.y - popt[0] * self.x - popt[1]
+        self.assertAlmostEqual(info["cost"], 0.5 * residuals @ residuals)
+        self.assertTrue(info["converged"])
+        self.assertEqual(set(info["timings"]), {"linear"})
+
+
+class TestFitHooks(TestCase):
+    def setUp(self):
+        fit_cache.clear()
+        self.events = []
+        self.hook = lambda fit, event: self.events.append((fit, event))
+        add_fit_hook(self.hook)
+        self.fig, ax = plt.subplots()
+        x = np.linspace(1, 10, 100)
+        (self.line,) = ax.plot(x, 2 * np.exp(x / 4))
+
+    def tearDown(self):
+        remove_fit_hook(self.hook)
+        plt.close(self.fig)
+
+    def test_fit_and_plot_events(self):
+        # Given
+        fit = Fit(self.line, "a*exp(x/b)")
+
+        # When
+        fit.fit()
+        fit.plot()
+
+        # Then
+        self.assertEqual(self.events, [(fit, "fit"), (fit, "plot")])
+        self.assertIn("select", fit.info["timings"])
+        self.assertIn("plot", fit.info["timings"])
+
+    def test_add_and_remove(self):
+        # When
+        add_fit_hook(self.hook)
+        hooks = fit_hooks()
+        remove_fit_hook(self.hook)
+
+        # Then
+        self.assertEqual(hooks.count(self.hook), 1)
+        self.assertNotIn(self.hook, fit_hooks())
+        self.assertIn(print_fit, fit_hooks())
+
+    def test_failing_hook_does_not_interrupt_fit(self):
+        # Given
+        def failing(fit, event):
+            raise ValueError("metrics system down")
+
+        add_fit_hook(failing)
+        fit = Fit(self.line, "a*exp(x/b)")
+
+        # When
+        with self.assertLogs("anafit", level="ERROR"):
+            fit.fit()
+        remove_fit_hook(failing)
+
+        # Then
+        self.assertIsNotNone(fit.popt)
+        self.assertEqual(self.events, [(fit, "fit")])
+
+    def test_metrics_are_json_serializable(self):
+        # Given
+        fit = Fit(self.line, "a*exp(x/b)", xrange=(2, 8))
+        fit.fit()
+
+        # When
+        metrics = json.loads(json.dumps(fit.metrics))
+
+        # Then
+        self.assertEqual(metrics["fname"], "a*exp(x/b)")
+        self.assertEqual(metrics["npts"], fit.xdata.size)
+        self.assertEqual(metrics["method"], "curve_fit")
+        np.testing.assert_allclose(metrics["popt"], fit.popt)
+        self.assertIn("optimizer", metrics["timings"])
+
+    def test_cached_fit_timings(self):
+        # Given
+        Fit(self.line, "a*exp(x/b)").fit()
+
+        # When
+        fit = Fit(self.line, "a*exp(x/b)")
+        fit.fit()
+
+        # Then
+        self.assertEqual(set(fit.info["timings"]), {"cache", "select"})
+        self.assertIn("cost", fit.info)
+
+    def test_print_fit_only_for_figure_event(self):
+        # Given
+        fit = Fit(self.line, "a*exp(x/b)")
+        fit.fit()
+        out = io.StringIO()
+
+        # When
+        with contextlib.redirect_stdout(out):
+            print_fit(fit, "fit")
+            printed_fit = out.getvalue()
+            print_fit(fit, "figure")
+
+        # Then
+        self.assertEqual(printed_fit, "")
+        self.assertEqual(out.getvalue(), repr(fit) + "\n")
+
+    def test_log_fit(self):
+        # Given
+        fit = Fit(self.line, "a*exp(x/b)")
+        fit.fit()
+
+        # When
+        with self.assertLogs("anafit", level="INFO") as logs:
+            log_fit(fit, "fit")
+
+        # Then
+        metrics = logs.records[0].metrics
+        self.assertEqual(metrics["event"], "fit")
+        self.assertEqual(metrics["nfev"], fit.info["nfev"])
@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+from unittest import TestCase
+
+import anafit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(anafit.__file__)))
+
+
+class TestHeadlessImport(TestCase):
+    def loaded_modules(self, code, modules):
+        # Runs code in a fresh interpreter and returns which of modules it loads
+        code = code + "; import sys; print([m for m in {0!r} if m in sys.modules])"
+        proc = subprocess.run(
+            [sys.executable, "-c", code.format(modules)],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=ROOT,
+        )
+        return eval(proc.stdout)
+
+    def test_import_anafit_is_headless(self):
+        # When
+        loaded = self.loaded_modules(
+            "import anafit", ["PyQt5", "matplotlib.pyplot", "scipy.optimize"]
+        )
+
+        # Then
+        self.assertEqual(loaded, [])
+
+    def test_import_fit_is_headless(self):
+        # When
+        loaded = self.loaded_modules(
+            "from anafit.core import Fit; from anafit.utilities import from_fdef",
+            ["PyQt5", "matplotlib.pyplot"],
+        )
+
+        # Then
+        self.assertEqual(loaded, [])
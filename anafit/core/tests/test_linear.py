@@ -0,0 +1,224 @@
+import pickle
+import warnings
+from unittest import TestCase
+
+import numpy as np
+from scipy.optimize import OptimizeWarning, curve_fit
+
+from anafit.core import fit_arrays
+from anafit.core.linear import (
+    MOMENT_FITS,
+    fit_linear,
+    fit_moments,
+    linear_accumulator,
+    linear_basis,
+)
+from anafit.core.selection import RangeIndex
+from anafit.utilities import from_fdef, get_func
+
+
+class TestLinearFit(TestCase):
+    def setUp(self):
+        self.x = np.linspace(0.5, 10, 200)
+        noise = np.cos(13 * self.x)
+        self.y = 3 * (self.x - 2) + 0.2 * self.x**2 + noise
+
+    def assert_same_as_curve_fit(self, fdef, x, y):
+        f, p = from_fdef(fdef)
+        popt_expected, pcov_expected = curve_fit(f, x, y, p0=p)
+        popt, pcov = fit_linear(fdef, f, x, y, np.size(p))
+        np.testing.assert_allclose(popt, popt_expected, rtol=1e-6, atol=1e-10)
+        np.testing.assert_allclose(pcov, pcov_expected, rtol=1e-5, atol=1e-12)
+
+    def test_builtin_linear_functions(self):
+        for name in get_func(typefunc="linear"):
+            with self.subTest(name=name):
+                self.assert_same_as_curve_fit(get_func(name), self.x, self.y)
+
+    def test_polynomial_with_offset(self):
+        self.assert_same_as_curve_fit(
+            "lambda x, a, b, c: a*x**2 + b*x + c + 5 ; (1, 1, 1)", self.x, self.y
+        )
+
+    def test_non_linear_functions(self):
+        for name in list(get_func(typefunc="power")) + list(get_func(typefunc="exp")):
+            with self.subTest(name=name):
+                # Given
+                f, p = from_fdef(get_func(name))
+
+                # When
+                basis, offset = linear_basis(f, self.x, np.size(p))
+
+                # Then
+                self.assertIsNone(basis)
+
+    def test_offset_x(self):
+        for offset in (1e6, 1e8):
+            with self.subTest(offset=offset):
+                # Given
+                x = offset + np.linspace(0, 1, 1000)
+                y = 2 * (x - offset) + 3 + 0.01 * np.cos(37 * x)
+
+                # When
+                popt, pcov, sigma = fit_arrays(get_func("ax+b"), x, y)
+
+                # Then
+                np.testing.assert_allclose(popt, np.polyfit(x, y, 1), rtol=1e-7)
+                dx = x - x.mean()
+                slope = dx @ (y - y.mean()) / (dx @ dx)
+                np.testing.assert_allclose(popt[0], slope, rtol=1e-12)
+                residuals = y - np.polyval(popt, x)
+                s2 = residuals @ residuals / (x.size - 2)
+                self.assertAlmostEqual(sigma[0] / np.sqrt(s2 / (dx @ dx)), 1)
+
+    def test_offset_x_quadratic(self):
+        # Given
+        x = np.linspace(1000, 1010, 500)
+        y = 0.5 * x**2 - 3 * x + 2 + np.cos(7 * x)
+
+        # When
+        popt, pcov, sigma = fit_arrays(
+            "lambda x, a, b, c: a*x**2 + b*x + c ; (1, 1, 1)", x, y
+        )
+
+        # Then
+        np.testing.assert_allclose(popt, np.polyfit(x, y, 2), rtol=1e-7)
+
+    def test_no_initialising_parameters_needed(self):
+        # When
+        popt, pcov, sigma = fit_arrays(
+            "lambda x, a, b: a*x + b ; (0, 0)", self.x, 1e6 * self.x - 3e7
+        )
+
+        # Then
+        np.testing.assert_allclose(popt, [1e6, -3e7])
+
+    def test_too_few_points(self):
+        # Then
+        with self.assertRaises(TypeError):
+            fit_arrays(get_func("ax+b"), self.x[:1], self.y[:1])
+
+    def test_as_many_points_as_parameters(self):
+        # When
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            popt, pcov, sigma = fit_arrays(get_func("ax+b"), [0, 1], [1, 3])
+
+        # Then
+        np.testing.assert_allclose(popt, [2, 1])
+        self.assertTrue(np.all(np.isinf(pcov)))
+        self.assertTrue(any(w.category is OptimizeWarning for w in caught))
+
+    def test_accumulator_in_chunks(self):
+        for name in get_func(typefunc="linear"):
+            with self.subTest(name=name):
+                # Given
+                fdef = get_func(name)
+                f, p = from_fdef(fdef)
+                expected = fit_linear(fdef, f, self.x, self.y, np.size(p))
+                k = np.size(p)
+                acc = linear_accumulator(fdef, f, self.x[:50], self.y[:50], k)
+
+                # When
+                acc.add(self.x[50:120], self.y[50:120])
+                acc.add(self.x[120:], self.y[120:])
+                popt, pcov = acc.solve()
+
+                # Then
+                self.assertEqual(acc.n, self.x.size)
+                np.testing.assert_allclose(popt, expected[0], rtol=1e-8)
+                np.testing.assert_allclose(pcov, expected[1], rtol=1e-6)
+
+    def test_merge_accumulators(self):
+        for name in get_func(typefunc="linear"):
+            with self.subTest(name=name):
+                # Given
+                fdef = get_func(name)
+                f, p = from_fdef(fdef)
+                k = np.size(p)
+                expected = linear_accumulator(fdef, f, self.x, self.y, k).solve()
+                first = linear_accumulator(fdef, f, self.x[:80], self.y[:80], k)
+                second = linear_accumulator(fdef, f, self.x[80:], self.y[80:], k)
+
+                # When
+                popt, pcov = pickle.loads(pickle.dumps(first)).merge(second).solve()
+
+                # Then
+                np.testing.assert_allclose(popt, expected[0], rtol=1e-8)
+                np.testing.assert_allclose(pcov, expected[1], rtol=1e-6)
+
+    def test_fit_moments(self):
+        # Given
+        moments = RangeIndex(self.x, self.y).moments((2, 8))
+        keep = (self.x > 2) & (self.x < 8)
+        x, y = self.x[keep], self.y[keep]
+
+        for name in MOMENT_FITS:
+            with self.subTest(name=name):
+                # When
+                f, p = from_fdef(get_func(name))
+                popt, pcov, ssr, r2 = fit_moments(get_func(name), moments, True)
+
+                # Then
+                popt_expected, pcov_expected = curve_fit(f, x, y, p0=p)
+                residuals = y - f(x, *popt_expected)
+                np.testing.assert_allclose(popt, popt_expected, rtol=1e-6)
+                np.testing.assert_allclose(pcov, pcov_expected, rtol=1e-5)
+                self.assertAlmostEqual(ssr, residuals @ residuals, places=6)
+                self.assertAlmostEqual(r2, 1 - ssr / np.sum((y - y.mean()) ** 2))
+
+    def test_fit_moments_errors(self):
+        # Given
+        moments = RangeIndex(self.x, self.y).moments((2, 2.01))
+
+        # Then
+        with self.assertRaises(TypeError):
+            fit_moments(get_func("ax+b"), moments)
+        with self.assertRaises(ValueError):
+            fit_moments(get_func("a*exp(x/b)"), moments)
+
+    def test_nonlinear_for_negative_parameters(self):
+        # Given
+        y = -2 * self.x + 1
+        sources = (
+            "lambda x, a, b : np.abs(a)*x + b ; (1, 1)",
+            "lambda x, a : np.abs(a)*x ; (1)",
+            "lambda x, a, b : np.sqrt(a**2)*x + b ; (1, 1)",
+        )
+
+        for fdef in sources:
+            with self.subTest(fdef=fdef):
+                # When
+                f, p = from_fdef(fdef)
+                basis, offset = linear_basis(f, self.x, np.size(p))
+
+                # Then
+                self.assertIsNone(basis)
+                popt, pcov = fit_linear(fdef, f, self.x, y, np.size(p))
+                self.assertIsNone(popt)
+
+    def test_solution_checked_against_function(self):
+        # Given
+        fdef = "lambda x, a, b : np.maximum(a, -100)*x + b ; (1, 1)"
+        f, p = from_fdef(fdef)
+        y = -200 * self.x + 1
+
+        # When
+        info = {}
+        popt, pcov, sigma = fit_arrays(fdef, self.x, y, linear=True, info=info)
+
+        # Then
+        self.assertIsNotNone(linear_basis(f, self.x, 2)[0])
+        self.assertEqual(fit_linear(fdef, f, self.x, y, 2), (None, None))
+        self.assertEqual(info["method"], "curve_fit")
+        self.assertGreater(info["nfev"], 0)
+        cost = 0.5 * np.sum((f(self.x, *popt) - y) ** 2)
+        np.testing.assert_allclose(info["cost"], cost)
+
+    def test_no_accumulator_for_non_linear_functions(self):
+        # Given
+        f, p = from_fdef(get_func("a*exp(x/b)"))
+
+        # Then
+        fdef = get_func("a*exp(x/b)")
+        self.assertIsNone(linear_accumulator(fdef, f, self.x, self.y, np.size(p)))
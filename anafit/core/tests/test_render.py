@@ -0,0 +1,55 @@
+from unittest import TestCase
+
+import numpy as np
+
+from anafit.core.render import envelope, minmax_decimate
+
+
+class TestDecimation(TestCase):
+    def test_minmax_keeps_narrow_peaks(self):
+        # Given
+        x = np.arange(10000.0)
+        y = np.zeros(x.size)
+        y[1234] = 5
+        y[7001] = -3
+
+        # When
+        xd, yd = minmax_decimate(x, y, 100)
+
+        # Then
+        self.assertLessEqual(xd.size, 200)
+        self.assertIn(5, yd)
+        self.assertIn(-3, yd)
+        self.assertTrue(np.all(np.diff(xd) >= 0))
+        self.assertEqual(xd[yd == 5][0], 1234)
+
+    def test_minmax_uneven_bins_and_small_inputs(self):
+        # Given
+        x = np.linspace(0, 1, 1001)
+        y = np.sin(40 * x)
+
+        # When
+        xd, yd = minmax_decimate(x, y, 100)
+        xs, ys = minmax_decimate(x[:150], y[:150], 100)
+
+        # Then
+        self.assertLessEqual(xd.size, 200)
+        self.assertFalse(np.any(np.isnan(xd)))
+        self.assertAlmostEqual(yd.max(), y.max())
+        self.assertAlmostEqual(yd.min(), y.min())
+        np.testing.assert_array_equal(xs, x[:150])
+
+    def test_envelope(self):
+        # Given
+        x = np.linspace(0, 1, 1000)
+        low = -1 - np.cos(300 * x) ** 2
+        up = 1 + np.sin(300 * x) ** 2
+
+        # When
+        xe, le, ue = envelope(x, low, up, 10)
+
+        # Then
+        self.assertEqual(xe.size, 10)
+        np.testing.assert_allclose(le, -2, atol=1e-3)
+        np.testing.assert_allclose(ue, 2, atol=1e-3)
+        self.assertAlmostEqual(xe[0], x[:100].mean())
@@ -0,0 +1,209 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from anafit.core import selection
+from anafit.core.selection import (
+    RangeIndex,
+    data_index,
+    load_xy,
+    range_index,
+    stratified_sample,
+)
+
+
+class TestRangeIndex(TestCase):
+    def setUp(self):
+        self.x = np.arange(0, 10, 1.0)
+        self.y = 2 * self.x + 5
+
+    def test_select_monotonic_is_a_view(self):
+        # Given
+        index = RangeIndex(self.x, self.y)
+
+        # When
+        x, y = index.select((2, 7))
+
+        # Then
+        np.testing.assert_array_equal(x, self.x[3:7])
+        np.testing.assert_array_equal(y, self.y[3:7])
+        self.assertTrue(index.is_monotonic)
+        self.assertTrue(np.shares_memory(x, self.x))
+        self.assertTrue(np.shares_memory(y, self.y))
+
+    def test_select_decreasing(self):
+        # Given
+        index = RangeIndex(self.x[::-1], self.y[::-1])
+
+        # When
+        x, y = index.select((2, 7))
+
+        # Then
+        np.testing.assert_array_equal(x, self.x[3:7])
+        np.testing.assert_array_equal(y, self.y[3:7])
+        self.assertTrue(index.is_monotonic)
+
+    def test_select_unsorted(self):
+        # Given
+        order = np.random.default_rng(0).permutation(self.x.size)
+        index = RangeIndex(self.x[order], self.y[order])
+
+        # When
+        x, y = index.select((2, 7))
+
+        # Then
+        np.testing.assert_array_equal(x, self.x[3:7])
+        np.testing.assert_array_equal(y, self.y[3:7])
+        self.assertFalse(index.is_monotonic)
+
+    def test_select_full_range_keeps_order(self):
+        # Given
+        order = np.random.default_rng(0).permutation(self.x.size)
+        index = RangeIndex(self.x[order], self.y[order])
+
+        # When
+        x, y = index.select()
+
+        # Then
+        np.testing.assert_array_equal(x, self.x[order])
+        np.testing.assert_array_equal(y, self.y[order])
+
+    def test_select_empty_range(self):
+        # Given
+        index = RangeIndex(self.x, self.y)
+
+        # When
+        x, y = index.select((7, 2))
+
+        # Then
+        self.assertEqual(x.size, 0)
+        self.assertEqual(y.size, 0)
+
+    def test_range_index_reused_for_line(self):
+        # Given
+        fig, ax = plt.subplots()
+        (line,) = ax.plot(self.x, self.y)
+
+        # When
+        index = range_index(line)
+
+        # Then
+        self.assertIs(range_index(line), index)
+        line.set_data(self.x[:5], self.y[:5])
+        new_index = range_index(line)
+        self.assertIsNot(new_index, index)
+        self.assertEqual(new_index.x.size, 5)
+        plt.close(fig)
+
+    def test_full_range_does_not_sort(self):
+        # Given
+        order = np.random.default_rng(0).permutation(self.x.size)
+        index = RangeIndex(self.x[order], self.y[order])
+
+        # When
+        index.select()
+
+        # Then
+        self.assertIsNone(index._xs)
+
+    def test_monotonic_checked_by_chunks(self):
+        # Given
+        x = np.arange(100.0)
+        x[57], x[58] = x[58], x[57]
+
+        # Then
+        with mock.patch.object(selection, "MONOTONIC_CHUNK", 10):
+            self.assertEqual(selection._monotonic(np.arange(100.0)), 1)
+            self.assertEqual(selection._monotonic(np.arange(100.0)[::-1]), -1)
+            self.assertEqual(selection._monotonic(x), 0)
+
+    def test_moments(self):
+        # Given
+        rng = np.random.default_rng(0)
+        x = np.sort(rng.uniform(1000, 2000, 5000))
+        y = 3 * x + rng.normal(0, 1, x.size)
+        index = RangeIndex(x, y)
+
+        for ratio in (1, 10**6):
+            with self.subTest(ratio=ratio):
+                # When
+                with mock.patch.object(selection, "PREFIX_RATIO", ratio):
+                    n, mx, my, sxx, sxy, syy = index.moments((1200.5, 1800.5))
+
+                # Then
+                keep = (x > 1200.5) & (x < 1800.5)
+                dx, dy = x[keep] - x[keep].mean(), y[keep] - y[keep].mean()
+                self.assertEqual(n, keep.sum())
+                np.testing.assert_allclose([mx, my], [x[keep].mean(), y[keep].mean()])
+                np.testing.assert_allclose(
+                    [sxx, sxy, syy], [dx @ dx, dx @ dy, dy @ dy], rtol=1e-9
+                )
+        self.assertEqual(index.moments((3000, 4000))[0], 0)
+
+
+class TestLoadXY(TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.x = np.linspace(0, 10, 50)
+        self.y = 3 * self.x - 1
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def save(self, data):
+        path = os.path.join(self.dir.name, "data.npy")
+        np.save(path, data)
+        return path
+
+    def test_columns_are_memory_mapped_views(self):
+        # Given
+        path = self.save(np.column_stack((self.y, self.x)))
+
+        # When
+        x, y = load_xy(path, columns=(1, 0))
+
+        # Then
+        np.testing.assert_array_equal(x, self.x)
+        np.testing.assert_array_equal(y, self.y)
+        self.assertIsInstance(x.base, np.memmap)
+        self.assertIs(x.base, y.base)
+
+    def test_one_column(self):
+        # When
+        x, y = load_xy(self.save(self.y))
+
+        # Then
+        np.testing.assert_array_equal(x, np.arange(50))
+        np.testing.assert_array_equal(y, self.y)
+
+    def test_data_index(self):
+        # Given
+        path = self.save(np.column_stack((self.x, self.y)))
+
+        # When
+        x, y = data_index(path).select((2, 7))
+
+        # Then
+        keep = (self.x > 2) & (self.x < 7)
+        np.testing.assert_array_equal(x, self.x[keep])
+        np.testing.assert_array_equal(y, self.y[keep])
+        self.assertTrue(np.may_share_memory(x, y))
+        x, y = data_index((self.x, self.y)).select()
+        self.assertIs(x, self.x)
+
+
+class TestStratifiedSample(TestCase):
+    def test_one_point_per_stratum(self):
+        # When
+        sample = stratified_sample(1000, 10, seed=3)
+
+        # Then
+        np.testing.assert_array_equal(sample // 100, np.arange(10))
+        np.testing.assert_array_equal(sample, stratified_sample(1000, 10, seed=3))
+
+    def test_small_datas(self):
+        # Then
+        np.testing.assert_array_equal(stratified_sample(5, 10), np.arange(5))
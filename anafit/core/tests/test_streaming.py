@@ -0,0 +1,116 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from anafit.core import Fit, chunk_accumulator, fit_arrays, fit_chunks, iter_chunks
+from anafit.utilities import get_func
+
+
+class TestFitChunks(TestCase):
+    def setUp(self):
+        self.x = np.linspace(0.5, 10, 1000)
+        self.y = 1 + 2 * self.x - 0.3 * self.x**2 + np.cos(13 * self.x)
+        self.fdef = "lambda x, a, b, c: a + b*x + c*x**2 ; (1, 1, 1)"
+
+    def test_same_as_fit_arrays(self):
+        # Given
+        expected = fit_arrays(self.fdef, self.x, self.y)
+
+        for executor in (None, "thread", "process"):
+            with self.subTest(executor=executor):
+                # When
+                info = {}
+                chunks = iter_chunks((self.x, self.y), chunk_size=70)
+                results = fit_chunks(
+                    self.fdef, chunks, executor=executor, max_workers=2, info=info
+                )
+
+                # Then
+                for value, reference in zip(results, expected):
+                    np.testing.assert_allclose(value, reference, rtol=1e-8)
+                self.assertEqual(info["chunks"], 15)
+                self.assertEqual(info["npts"], self.x.size)
+
+    def test_offset_x(self):
+        # Given
+        rng = np.random.default_rng(0)
+        u = np.linspace(0, 1, 10000)
+        y = 2 * u + 1 + rng.normal(0, 0.01, u.size)
+
+        for offset in (1e6, 1e8):
+            for name in ("ax+b", "ax"):
+                with self.subTest(offset=offset, name=name):
+                    # Given
+                    x = offset + u
+                    expected = fit_arrays(get_func(name), x, y)
+
+                    # When
+                    chunks = iter_chunks((x, y), chunk_size=997)
+                    results = fit_chunks(name, chunks, executor="thread")
+
+                    # Then
+                    for value, reference in zip(results, expected):
+                        np.testing.assert_allclose(value, reference, rtol=1e-8)
+
+    def test_chunks_in_xrange(self):
+        # When
+        chunks = list(iter_chunks((self.x, self.y), (2, 4), chunk_size=50))
+
+        # Then
+        keep = (self.x > 2) & (self.x < 4)
+        np.testing.assert_array_equal(np.concatenate(chunks, axis=1)[0], self.x[keep])
+        self.assertTrue(all(x.size <= 50 for x, _ in chunks))
+
+    def test_log_scale(self):
+        # Given
+        noise = np.exp(0.1 * np.cos(13 * self.x))
+        cases = [
+            ("ax^n", 2 * self.x**1.5 * noise, np.log(self.x)),
+            ("a*exp(x/b)", 2 * np.exp(self.x / 1.5) * noise, self.x),
+        ]
+
+        for name, y, u in cases:
+            with self.subTest(name=name):
+                # When
+                chunks = iter_chunks((self.x, y), chunk_size=300)
+                popt, pcov, sigma = fit_chunks(name, chunks, log=True)
+
+                # Then
+                c1, c0 = np.polyfit(u, np.log(y), 1)
+                expected = [np.exp(c0), c1 if name == "ax^n" else 1 / c1]
+                np.testing.assert_allclose(popt, expected, rtol=1e-8)
+                self.assertTrue(np.all(sigma > 0))
+
+    def test_errors(self):
+        # Then
+        with self.assertRaisesRegex(ValueError, "not linear"):
+            fit_chunks(get_func("a*exp(x/b)"), [(self.x, self.y)])
+        with self.assertRaisesRegex(ValueError, "log scale"):
+            fit_chunks("ax+b", [(self.x, self.y)], log=True)
+        with self.assertRaisesRegex(ValueError, "positive"):
+            chunk_accumulator(get_func("ax^n"), self.x, -self.y, log=True)
+
+    def test_fit_memory_mapped_file(self):
+        # Given
+        fig, ax = plt.subplots()
+        (line,) = ax.plot(self.x, self.y)
+        expected = Fit(line, self.fdef, xrange=(1, 9))
+        expected.fit(cache=False)
+
+        # When
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "data.npy")
+            np.save(path, np.column_stack((self.x, self.y)))
+            fit = Fit(path, self.fdef, xrange=(1, 9))
+            fit.fit_chunks(chunk_size=100)
+
+        # Then
+        np.testing.assert_allclose(fit.popt, expected.popt, rtol=1e-8)
+        np.testing.assert_allclose(fit.pcov, expected.pcov, rtol=1e-6)
+        self.assertEqual(fit.info["npts"], expected.xdata.size)
+        self.assertEqual(fit.info["chunks"], 9)
+        self.assertFalse(fit.info["cached"])
+        plt.close(fig)
@@ -0,0 +1,125 @@
+import csv
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+import anafit
+from anafit.cli import fit_files, main, read_table, table_fields, write_table
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(anafit.__file__)))
+
+
+class TestCli(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.x = np.linspace(1, 10, 200)
+        self.y1 = 2 * np.exp(self.x / 4) + np.cos(9 * self.x)
+        self.y2 = 3 * np.exp(self.x / 5)
+        self.csv = self.path("datas.csv")
+        with open(self.csv, "w") as fid:
+            fid.write("t,s1,s2\n")
+            np.savetxt(fid, np.column_stack((self.x, self.y1, self.y2)), delimiter=",")
+        self.npy = self.path("datas.npy")
+        np.save(self.npy, np.column_stack((self.x, self.y2)))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def test_read_table(self):
+        # When
+        names, data = read_table(self.csv)
+        npy_names, npy_data = read_table(self.npy)
+
+        # Then
+        self.assertEqual(names, ["t", "s1", "s2"])
+        np.testing.assert_allclose(data[:, 1], self.y1)
+        self.assertEqual(npy_names, ["0", "1"])
+        self.assertIsInstance(npy_data, np.memmap)
+
+    def test_fit_files(self):
+        # When
+        rows = list(fit_files("a*exp(x/b)", [self.csv, self.npy], executor="thread"))
+
+        # Then
+        self.assertEqual(
+            [(r["file"], r["y"]) for r in rows],
+            [(self.csv, "s1"), (self.csv, "s2"), (self.npy, "1")],
+        )
+        np.testing.assert_allclose((rows[1]["a"], rows[1]["b"]), (3, 5))
+        np.testing.assert_allclose((rows[2]["a"], rows[2]["b"]), (3, 5))
+        self.assertGreater(rows[0]["sigma_a"], 0)
+        self.assertGreater(rows[0]["time"], 0)
+
+    def test_errors_do_not_stop_the_batch(self):
+        # When
+        rows = list(
+            fit_files("ax+b", [self.path("missing.csv"), self.npy], executor="thread")
+        )
+
+        # Then
+        self.assertIn("FileNotFoundError", rows[0]["error"])
+        self.assertNotIn("error", rows[1])
+
+    def test_write_table(self):
+        # Given
+        fields = table_fields("lambda x, a, b : a*np.exp(x/b) ; (1, 1)")
+        rows = fit_files("a*exp(x/b)", [self.csv], y=["s2"], executor="thread")
+        output = io.StringIO()
+
+        # When
+        failed = write_table(rows, fields, output)
+
+        # Then
+        output.seek(0)
+        table = list(csv.DictReader(output))
+        self.assertEqual(failed, 0)
+        self.assertEqual(len(table), 1)
+        self.assertAlmostEqual(float(table[0]["b"]), 5)
+        self.assertIn("time_optimizer", table[0])
+
+    def test_main_with_process_pool(self):
+        # Given
+        output = self.path("results.json")
+
+        # When
+        status = main(
+            ["ax+b", self.csv, "--x", "t", "--y", "2", "--xrange", "2,8"]
+            + ["--workers", "2", "--output", output]
+        )
+
+        # Then
+        with open(output) as fid:
+            rows = json.load(fid)
+        self.assertEqual(status, 0)
+        self.assertEqual(rows[0]["y"], "s2")
+        self.assertEqual(rows[0]["npts"], np.sum((self.x >= 2) & (self.x <= 8)))
+
+    def test_cli_is_headless(self):
+        # When
+        proc = subprocess.run(
+            [sys.executable, "-m", "anafit", "ax+b", self.npy, "--executor", "thread"]
+            + ["--output", self.path("results.csv")],
+            capture_output=True,
+            text=True,
+            cwd=ROOT,
+        )
+        code = "import sys, anafit.cli; print('PyQt5' in sys.modules)"
+        loaded = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            cwd=ROOT,
+        )
+
+        # Then
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        self.assertEqual(loaded.stdout.strip(), "False")
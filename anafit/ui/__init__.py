@@ -1 +1,3 @@
 from .ui import CustomFitDialog, Ui_Fit  # noqa: F401
+from .figure import DrawLine, Figure  # noqa: F401
+from .jobs import FitJob  # noqa: F401
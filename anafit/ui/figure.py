@@ -0,0 +1,978 @@
+import functools
+import sys
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import matplotlib
+import numpy as np
+from matplotlib.lines import Line2D
+from matplotlib.patches import Rectangle
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+from ..core.anafit import Fit
+from ..core.batch import compare_models, make_executor
+from ..core.hooks import logger, run_fit_hooks
+from ..core.linear import MOMENT_FITS, fit_moments
+from ..core.render import evaluate, render_grid
+from ..core.selection import range_index
+from ..utilities import (
+    BlitManager,
+    builtin_name,
+    evaluate_constant,
+    from_fdef,
+    get_fdef,
+    get_func,
+    save_customlist,
+    str_line,
+)
+from .jobs import ComparisonJob, FitJob, FitSignals
+from .ui import CustomFitDialog, Ui_Fit
+
+if "matplotlib.pyplot" in sys.modules:
+    matplotlib.pyplot.switch_backend("Qt5Agg")
+elif "matplotlib.pylab" in sys.modules:
+    matplotlib.pylab.switch_backend("Qt5Agg")
+elif matplotlib.get_backend() != "Qt5Agg":
+    matplotlib.use("Qt5Agg")
+import matplotlib.pyplot as plt  # noqa : E402
+
+
+def refresh_rate():
+    """
+    Returns the refresh rate of the primary screen, in Hz, or None if unknown
+    """
+    app = QtWidgets.QApplication.instance()
+    if app is None or app.primaryScreen() is None:
+        return None
+    return app.primaryScreen().refreshRate() or None
+
+
+class DrawLine(object):
+    def __init__(self, fig, show_slope=None):
+        """
+        Class allowing to draw dynamically a line on a matplotlib plot
+
+        Parameters
+        ----------
+
+        fig: matplotlib.pyplot.figure object
+            the figure window to draw the line in
+        show_slope: float, optional
+            If provided, the line to be drawn will have a slope given by
+            show_slope. If the scale is log-log, this corresponds to the
+            exponent of a power law
+            Default: None
+        """
+        self.b = None
+        self.fig = fig
+        self.ax = fig.gca()
+        self.slope = show_slope
+        self.pt1 = np.array(plt.ginput(1)[0])
+        self.pt2 = None
+        (self.lx,) = self.ax.plot(*self.pt1, "k--")
+        self.blit = BlitManager(self.fig.canvas, [self.lx], refresh_rate())
+        self.cmove = self.fig.canvas.mpl_connect("motion_notify_event", self.mouse_move)
+        self.cclicked = self.fig.canvas.mpl_connect(
+            "button_press_event", self.mouse_clicked
+        )
+
+    def mouse_move(self, event):
+        """
+        Draws a line following the mouse cursor or a given slope when the mouse
+        is moved in the figure window
+
+        Parameters
+        ----------
+
+        event: matplotlib mouse motion_notify_event
+
+        """
+        if not event.inaxes:
+            return
+        x = event.xdata
+        if self.slope is None:
+            y = event.ydata
+        else:
+            if self.ax.get_xscale() == "log" and self.ax.get_yscale() == "log":
+                y = (
+                    np.exp(np.log(self.pt1[1]) - self.slope * np.log(self.pt1[0]))
+                    * x**self.slope
+                )
+            else:
+                y = self.slope * (x - self.pt1[0]) + self.pt1[1]
+        self.lx.set_ydata([self.pt1[1], y])
+        self.lx.set_xdata([self.pt1[0], x])
+        self.blit.update()
+
+    def mouse_clicked(self, event):
+        """
+        Terminates the line drawing to a clicked point in the figure window
+
+        Parameters
+        ----------
+
+        event: matplotlib mouse button_press_event
+
+        """
+        if not event.inaxes:
+            return
+        if self.slope is None:
+            self.pt2 = [event.xdata, event.ydata]
+        else:
+            if self.ax.get_xscale() == "log" and self.ax.get_yscale() == "log":
+                self.pt2 = [
+                    event.xdata,
+                    np.exp(np.log(self.pt1[1]) - self.slope * np.log(self.pt1[0]))
+                    * event.xdata**self.slope,
+                ]
+            else:
+                self.pt2 = [
+                    event.xdata,
+                    self.slope * (event.xdata - self.pt1[0]) + self.pt1[1],
+                ]
+        self.get_slope()
+        self.lx.set_xdata([self.pt1[0], self.pt2[0]])
+        self.lx.set_ydata([self.pt1[1], self.pt2[1]])
+        self.fig.canvas.mpl_disconnect(self.cmove)
+        self.fig.canvas.mpl_disconnect(self.cclicked)
+        self.blit.remove()
+        self.fig.canvas.draw_idle()
+
+    def get_slope(self):
+        """
+        Returns parameters corresponding to a drawn line on the figure window.
+        If scale is lin-lin, returns a and b from y = ax+b line definition.
+        If scale is log-log, returns n and a from y = ax^n line definition.
+
+        Returns
+        ----------
+        slope: float
+            slope or power law exponent
+        b: float
+            origin value or power law prefactor
+
+        """
+        if self.slope is None:
+            if self.ax.get_xscale() == "log" and self.ax.get_yscale() == "log":
+                num = np.log(self.pt2[1]) - np.log(self.pt1[1])
+                denom = np.log(self.pt2[0]) - np.log(self.pt1[0])
+                self.slope = num / denom
+            else:
+                num = self.pt2[1] - self.pt1[1]
+                self.slope = num / (self.pt2[0] - self.pt1[0])
+        if self.ax.get_xscale() == "log" and self.ax.get_yscale() == "log":
+            self.b = np.exp(np.log(self.pt2[1]) - self.slope * np.log(self.pt2[0]))
+        else:
+            if self.pt1[0] < self.pt2[0]:
+                self.b = self.pt1[1] - self.slope * self.pt1[0]
+            else:
+                self.b = self.pt2[1] - self.slope * self.pt2[0]
+        return self.slope, self.b
+
+    def __repr__(self):
+        if self.ax.get_xscale() == "log" and self.ax.get_yscale() == "log":
+            lstr = "Line a*x^n : a = {0:.1f} , n = {1:.1f} \n".format(
+                self.b, self.slope
+            )
+        else:
+            lstr = "Line a*x+b : a = {0:.1f} , b = {1:.1f} \n".format(
+                self.slope, self.b
+            )
+        return lstr
+
+
+class RoiSelector(object):
+    def __init__(self, fig, callback, line=None, fname="ax+b"):
+        """
+        Class allowing to select dynamically a x-range on a matplotlib plot, by
+        clicking its two bounds. The selected range is shaded while the mouse
+        moves, and the datas of line in the range are fitted on each move, from
+        their cumulative sums (see anafit.core.selection.RangeIndex.moments).
+
+        Parameters
+        ----------
+
+        fig: matplotlib.pyplot.figure object
+            the figure window to select the range in
+        callback: function
+            function called with the selected range (xmin, xmax) once the
+            second bound has been clicked
+        line: matplotlib.lines.Line2D object, optional
+            the line whose fit in the range is previewed, if it is plotted in
+            the current axes
+            Default: None
+        fname: str, optional
+            previewed function, a key of anafit.core.linear.MOMENT_FITS
+            Default: 'ax+b'
+        """
+        self.fig = fig
+        self.ax = fig.gca()
+        self.callback = callback
+        self.x0 = None
+        self.xrange = None
+        self.fname = fname
+        self.index = None
+        if line is not None and line.axes is self.ax:
+            self.index = range_index(line)
+        self.preview = Line2D([], [], color="black", linestyle="--", visible=False)
+        self.text = self.ax.text(
+            0.05, 0.95, "", transform=self.ax.transAxes, va="top", visible=False
+        )
+        self.ax.add_artist(self.preview)
+        self.span = Rectangle(
+            (0, 0),
+            0,
+            1,
+            transform=self.ax.get_xaxis_transform(),
+            color="black",
+            alpha=0.15,
+            visible=False,
+        )
+        self.ax.add_artist(self.span)
+        self.blit = BlitManager(
+            self.fig.canvas, [self.span, self.preview, self.text], refresh_rate()
+        )
+        self.cmove = self.fig.canvas.mpl_connect("motion_notify_event", self.mouse_move)
+        self.cclicked = self.fig.canvas.mpl_connect(
+            "button_press_event", self.mouse_clicked
+        )
+
+    def mouse_move(self, event):
+        """
+        Shades the range between the first clicked bound and the mouse cursor
+
+        Parameters
+        ----------
+
+        event: matplotlib mouse motion_notify_event
+
+        """
+        if self.x0 is None or event.inaxes is not self.ax:
+            return
+        self.span.set_x(min(self.x0, event.xdata))
+        self.span.set_width(abs(event.xdata - self.x0))
+        if self.index is not None:
+            self.update_preview((min(self.x0, event.xdata), max(self.x0, event.xdata)))
+        self.blit.update()
+
+    def update_preview(self, xrange):
+        """
+        Fits the datas of the line in xrange, in O(log n) time, and draws the
+        fitted function with its parameters and R2
+
+        Parameters
+        ----------
+
+        xrange: tuple
+            (xmin, xmax) bounds of the range, excluded
+        """
+        fdef = get_fdef(self.fname)
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                popt, pcov, _, r2 = fit_moments(
+                    fdef, self.index.moments(xrange), full_output=True
+                )
+        except TypeError:
+            # less points than parameters
+            self.preview.set_visible(False)
+            self.text.set_visible(False)
+            return
+        xfit = render_grid(self.ax, np.array(xrange))
+        self.preview.set_data(xfit, evaluate(from_fdef(fdef)[0], xfit, popt))
+        info = "Fit " + self.fname + " :"
+        for coef, err in zip(popt, np.sqrt(np.diagonal(pcov))):
+            info = info + "\n{0:.2f} +/- {1:.2f}".format(coef, err)
+        self.text.set_text(info + "\nR2 = {0:.4f}".format(r2))
+        self.preview.set_visible(True)
+        self.text.set_visible(True)
+
+    def mouse_clicked(self, event):
+        """
+        Sets a bound of the range to the clicked point. Once both are set,
+        terminates the selection and calls the callback with the range
+
+        Parameters
+        ----------
+
+        event: matplotlib mouse button_press_event
+
+        """
+        if event.inaxes is not self.ax:
+            return
+        if self.x0 is None:
+            self.x0 = event.xdata
+            self.span.set_x(self.x0)
+            self.span.set_visible(True)
+            self.blit.update()
+            return
+        self.xrange = (min(self.x0, event.xdata), max(self.x0, event.xdata))
+        self.fig.canvas.mpl_disconnect(self.cmove)
+        self.fig.canvas.mpl_disconnect(self.cclicked)
+        self.blit.remove()
+        self.span.remove()
+        self.preview.remove()
+        self.text.remove()
+        self.fig.canvas.draw_idle()
+        self.callback(self.xrange)
+
+
+class Figure(Ui_Fit):
+    def __init__(self, fig=None, executor="thread", budget=None, maxfev=None):
+        """
+        Class constructing the anafit menu and includes it in the toolbar of a
+        matplotlib.pyplot.figure
+
+        Parameters
+        ----------
+
+        fig: matplotlib.pyplot.figure object
+            the figure window where to include anafit. If not provided, the
+            current figure is used (plt.gcf())
+            Default: None
+        executor: str or concurrent.futures.Executor, optional
+            'thread', 'process' or an executor where the fits run, so that
+            the figure stays responsive (see self.fit)
+            Default: 'thread'
+        budget: float, optional
+            default time in seconds after which a fit is interrupted
+            Default: None
+        maxfev: int, optional
+            default maximum number of evaluations of the function per fit
+            Default: None
+        """
+        if fig is None:
+            fig = plt.gcf()
+        self._fig = fig
+        if not fig.axes:
+            raise ValueError("Needs an axis before fitting")
+        if not fig.axes[0].lines:
+            raise ValueError("Needs some points before fitting")
+        super().__init__()
+        self._ax = fig.axes
+        self._dictlin = {
+            (str(lin.get_color()) + lin.get_marker() + lin.get_linestyle()): lin
+            for axe in self._ax
+            for lin in axe.get_lines()
+        }
+        self._currentLine = (
+            str(self._ax[0].lines[0].get_color())
+            + self._ax[0].lines[0].get_marker()
+            + self._ax[0].lines[0].get_linestyle()
+        )
+        self._fits = []
+        self._lastFit = None
+        self._lastLine = None
+        self._xrange = None
+        self._lines = []
+        self._roi = None
+        self._comparison = None
+        self._executor = executor
+        self._pool = None
+        self._budget = budget
+        self._maxfev = maxfev
+        self._jobs = []
+        self._signals = FitSignals()
+        self._signals.finished.connect(self._fit_finished)
+        self._signals.compared.connect(self._comparison_finished)
+        self._fig.canvas.mpl_connect("close_event", lambda event: self.cancel_fits())
+
+        toolbar = self._fig.canvas.toolbar
+        toolbar.addWidget(self.button)
+
+        # Populating the datasets
+        for lin, linval in self._dictlin.items():
+            strlin = str_line(linval)
+            self.dataAction[lin] = QtWidgets.QAction(strlin, self.datasetMenu)
+            self.dataAction[lin].triggered.connect(
+                functools.partial(self.set_current_line, lin)
+            )
+            self.datasetMenu.insertAction(self.datasetSep, self.dataAction[lin])
+            self.dataAction[lin].setCheckable(True)
+            self.dataActionIcon[lin] = QtGui.QPixmap(100, 100)
+            self.dataActionIcon[lin].fill(
+                QtGui.QColor(
+                    *list(
+                        map(
+                            int,
+                            255
+                            * np.array(
+                                matplotlib.colors.to_rgb(linval.get_color()),
+                                dtype=float,
+                            ),
+                        )
+                    )
+                )
+            )
+            self.dataAction[lin].setIcon(QtGui.QIcon(self.dataActionIcon[lin]))
+        self.dataAction[self._currentLine].setChecked(True)
+
+        # Populating linear fits
+        for fname in get_func(typefunc="linear").keys():
+            self.linearFitMenu.addAction(fname, functools.partial(self.fit, fname))
+
+        # Populating power fits
+        for fname in get_func(typefunc="power").keys():
+            self.powerFitMenu.addAction(fname, functools.partial(self.fit, fname))
+
+        # Populating exp fits
+        for fname in get_func(typefunc="exp").keys():
+            self.expFitMenu.addAction(fname, functools.partial(self.fit, fname))
+
+        # Populating custom fits
+        for fname in get_func(typefunc="custom").keys():
+            self.showCustomFitActions[fname] = QtWidgets.QAction(
+                fname, self.showCustomFitActionGroup
+            )
+            self.showCustomFitActions[fname].triggered.connect(
+                functools.partial(self.fit, fname)
+            )
+            self.showCustomFitActionGroup.addAction(self.showCustomFitActions[fname])
+        self.showFitMenu.insertActions(
+            self.showFitSep, self.showCustomFitActionGroup.actions()
+        )
+
+        for fname in get_func(typefunc="custom").keys():
+            self.editFitActions[fname] = QtWidgets.QAction(
+                fname, self.editFitActionGroup
+            )
+            self.editFitActions[fname].triggered.connect(
+                functools.partial(self.edit_fit, fname)
+            )
+            self.editFitActionGroup.addAction(self.editFitActions[fname])
+        self.editFitMenu.insertActions(
+            self.editFitSep, self.editFitActionGroup.actions()
+        )
+
+    @property
+    def fig(self):
+        return self._fig
+
+    @fig.setter
+    def fig(self, fig):
+        self._fig = fig
+
+    @property
+    def current_line(self):
+        return self._currentLine
+
+    @current_line.setter
+    def current_line(self, lin):
+        for key in self._dictlin.keys():
+            self.dataAction[key].setChecked(False)
+        self.dataAction[lin].setChecked(True)
+        self._currentLine = lin
+
+    def set_current_line(self, lin):
+        """
+        Another setter for the current dataset. Used as a slot for the dataset
+        selection menu's actions
+
+        Parameters
+        ----------
+
+        lin: matplotlib.pyplot.line object
+            the dataset line object
+        """
+        self.current_line = lin
+
+    @property
+    def last_fit(self):
+        return self._lastFit
+
+    @property
+    def fits(self):
+        return self._fits
+
+    def undo_fit(self):
+        """
+        Slot to undo the last fit.
+        Note that it does not affect the fit history !
+        """
+        if len(self.fits) == 0:
+            return
+        self.fits[-1].remove()
+        del self._fits[-1]
+        try:
+            self._lastFit = self._fits[-1]
+            self._lastFit.show_fitInfo(self.showFitInfoAction.isChecked())
+        except IndexError:
+            self._lastFit = None
+        self.fig.canvas.draw()
+
+    def remove_all_fit(self):
+        """
+        Slot to remove all fit. Also deletes the fit history !
+        """
+        for f in self.fits:
+            f.remove()
+        self._fits = []
+        self._lastFit = None
+        self.fig.canvas.draw()
+
+    def refresh_dataset(self):
+        """
+        Slot to refresh dataset menu, for instance if a new plot has been added
+        after anafit.Figure() called
+        """
+        newlin = {
+            (str(lin.get_color()) + lin.get_marker() + lin.get_linestyle()): lin
+            for axe in self._ax
+            for lin in axe.get_lines()
+        }
+        for lin in set(newlin.keys()).difference(self._dictlin.keys()):
+            strlin = str_line(newlin[lin])
+            self.dataAction[lin] = QtWidgets.QAction(strlin, self.datasetMenu)
+            self.dataAction[lin].triggered.connect(
+                functools.partial(self.set_current_line, lin)
+            )
+            self.datasetMenu.insertAction(self.datasetSep, self.dataAction[lin])
+            self.dataAction[lin].setCheckable(True)
+            self.dataActionIcon[lin] = QtGui.QPixmap(100, 100)
+            self.dataActionIcon[lin].fill(
+                QtGui.QColor(
+                    *list(
+                        map(
+                            int,
+                            255
+                            * np.array(
+                                matplotlib.colors.to_rgb(
+                                    self._dictlin[lin].get_color()
+                                ),
+                                dtype=float,
+                            ),
+                        )
+                    )
+                )
+            )
+            self.dataAction[lin].setIcon(QtGui.QIcon(self.dataActionIcon[lin]))
+        for lin in set(self._dictlin.keys()).difference(newlin.keys()):
+            self.datasetMenu.removeAction(self.dataAction[lin])
+            del self.dataAction[lin]
+            del self.dataActionIcon[lin]
+        self._dictlin = newlin
+        for key in self._dictlin.keys():
+            self.dataAction[key].setChecked(False)
+        self._currentLine = (
+            str(self._ax[0].lines[0].get_color())
+            + self._ax[0].lines[0].get_marker()
+            + self._ax[0].lines[0].get_linestyle()
+        )
+        self.dataAction[self._currentLine].setChecked(True)
+
+    def define_range(self):
+        """
+        Slot to display a dialog asking the user for a tuple corresponding to
+        the xrange to consider for fitting
+        """
+        xrange, ok = QtWidgets.QInputDialog.getText(
+            self.showFitMenu, "Enter the x-range where to fit", "ex: (10, 100) :"
+        )
+        if ok:
+            self.set_range(evaluate_constant(xrange))
+        else:
+            pass
+
+    def define_roi(self):
+        """
+        Slot to define the x-fitting range graphically, by selecting two points.
+        The fit of the current dataset in the range is previewed while the
+        mouse moves: with the function of the last fit if it is a straight
+        line or a constant, else with 'ax+b'.
+        """
+        fname = "ax+b"
+        if self._lastFit is not None:
+            name = builtin_name(self._lastFit.fdef)
+            if name in MOMENT_FITS:
+                fname = name
+        line = self._dictlin[self._currentLine]
+        self._roi = RoiSelector(self._fig, self.set_range, line, fname)
+
+    def set_range(self, xrange):
+        """
+        Sets the x-fitting range, and displays it in the Define Range menu
+
+        Parameters
+        ----------
+
+        xrange: tuple
+            tuple defining the range of data to consider when fitting
+        """
+        self._xrange = xrange
+        self.rangeAction.setText("Current : ({0:.1f}, {1:.1f})".format(*self._xrange))
+
+    def reset_range(self):
+        """
+        Slot to reset the xr-fitting range, therefore using the full range
+        """
+        self._xrange = None
+        self.rangeAction.setText("Current : full")
+
+    @property
+    def budget(self):
+        return self._budget
+
+    @budget.setter
+    def budget(self, budget):
+        self._budget = budget
+
+    @property
+    def maxfev(self):
+        return self._maxfev
+
+    @maxfev.setter
+    def maxfev(self, maxfev):
+        self._maxfev = maxfev
+
+    @property
+    def jobs(self):
+        # fits running in the background
+        return list(self._jobs)
+
+    def fit(self, strfunc, budget=None, maxfev=None):
+        """
+        Fit the selected dataset by the function of name strfunc. The fit runs
+        in the background, in a thread or a process (see the executor of the
+        Figure), so that the figure stays responsive, and several fits can
+        run at once. When it is finished, the fit is plotted and passed to the
+        fit hooks with the event 'figure': by default, its infos are printed
+        in command line (see anafit.core.add_fit_hook). If it fails, the
+        error is logged with the 'anafit' logger, and the fit is passed to
+        the hooks with the event 'failed'. Running fits can be cancelled with
+        'Cancel Fitting'.
+
+        Parameters
+        ----------
+
+        strfunc: str
+            function name (a key from fitting functions dict)
+        budget: float, optional
+            time in seconds after which the fit is interrupted. If not
+            provided, self.budget.
+            Default: None
+        maxfev: int, optional
+            maximum number of evaluations of the function. If not provided,
+            self.maxfev.
+            Default: None
+
+        Returns
+        ----------
+        FitJob
+            the running fit. FitJob.wait() blocks until it is finished.
+        """
+        pool = self._get_pool()
+        cancel = None
+        if isinstance(pool, ThreadPoolExecutor):
+            cancel = threading.Event()
+        new_fit = Fit(self._dictlin[self._currentLine], strfunc, self._xrange)
+        future = new_fit.submit(
+            pool,
+            budget=self._budget if budget is None else budget,
+            maxfev=self._maxfev if maxfev is None else maxfev,
+            cancel=cancel,
+        )
+        job = FitJob(new_fit, future, cancel, self._fit_finished)
+        self._jobs.append(job)
+        self._show_fitting()
+        future.add_done_callback(lambda future: self._signals.finished.emit(job))
+        return job
+
+    def _get_pool(self):
+        # Returns the executor of the background fits, created on first use
+        if self._pool is None:
+            self._pool = make_executor(self._executor)
+        return self._pool
+
+    def _fit_finished(self, job):
+        # Plots a fit finished in the background. Called in the Qt event loop
+        # through self._signals, or by FitJob.wait.
+        if job not in self._jobs:
+            # cancelled, or already plotted by FitJob.wait
+            return
+        self._jobs.remove(job)
+        self._show_fitting()
+        future = job.future
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            job.fit.info["error"] = "{0}: {1}".format(type(error).__name__, error)
+            logger.warning("Fit %s failed: %s", job.fit.fname, error)
+            run_fit_hooks(job.fit, "failed")
+            return
+        try:
+            self._fits[-1].show_fitInfo(False)
+        except IndexError:
+            pass
+        job.fit.set_results(future.result())
+        self._fits.append(job.fit)
+        self._lastFit = self._fits[-1]
+        self._lastFit.plot(
+            self.showFitInfoAction.isChecked(), self.showConfidenceAction.isChecked()
+        )
+        start = time.perf_counter()
+        self.fig.canvas.draw()
+        self._lastFit.info["timings"]["draw"] = time.perf_counter() - start
+        run_fit_hooks(self._lastFit, "figure")
+
+    def _show_fitting(self):
+        # Shows the number of fits running in the background next to the
+        # anafit icon, and enables 'Cancel Fitting' while there are some
+        if self._jobs:
+            self.button.setText("Fitting… ({0})".format(len(self._jobs)))
+            self.button.setToolButtonStyle(QtCore.Qt.ToolButtonTextBesideIcon)
+        else:
+            self.button.setText("")
+            self.button.setToolButtonStyle(QtCore.Qt.ToolButtonIconOnly)
+        self.cancelFitAction.setEnabled(bool(self._jobs))
+
+    def cancel_fits(self):
+        """
+        Slot to cancel the fits running in the background
+        """
+        jobs, self._jobs = self._jobs, []
+        for job in jobs:
+            job.cancel()
+        self._show_fitting()
+
+    def other_fit(self):
+        """
+        Slot to fit the current selected dataset by a function asked to the
+        user through a dialog
+        """
+        fdef, ok = QtWidgets.QInputDialog.getText(
+            self.showFitMenu,
+            "Enter your fitting function",
+            "ex: lambda x, a, b : a*x+b ; (1, 0.1) :",
+        )
+        if ok:
+            self.fit(fdef)
+        else:
+            pass
+
+    def fit_all(self, fnames=None, criterion="aic", plot=None):
+        """
+        Fits all the fitting functions (or the ones of fnames) to the selected
+        dataset concurrently, and ranks the models by an information
+        criterion. The comparison runs in the background, in the executor of
+        the Figure (see self.fit), so that the figure stays responsive. When
+        it is finished, the comparison table is logged with the 'anafit'
+        logger at INFO level and kept in self.comparison, and only the best
+        model, or the model plot, is plotted. The other models can be plotted
+        from the 'Show Fit' menu without being fitted again.
+
+        Parameters
+        ----------
+
+        fnames: iterable, optional
+            names of the fitting functions to compare. If not provided, all
+            the built-in and custom functions are compared.
+            Default: None
+        criterion: str, optional
+            'aic', 'bic' or 'redchi2', see anafit.core.ModelComparison
+            Default: 'aic'
+        plot: str, optional
+            name of the fitting function to plot instead of the best one
+            Default: None
+
+        Returns
+        ----------
+        ComparisonJob
+            the running comparison. ComparisonJob.wait() blocks until it is
+            finished, and returns the anafit.core.ModelComparison.
+        """
+        pool = self._get_pool()
+        line = self._dictlin[self._currentLine]
+        if isinstance(pool, ThreadPoolExecutor):
+            # the results are stored in fit_cache, for the plot of the best
+            data = line
+        else:
+            # lines can not be sent to other processes
+            data = range_index(line).select(self._xrange)
+        future = pool.submit(compare_models, data, fnames, self._xrange, criterion)
+        job = ComparisonJob(
+            future, functools.partial(self._comparison_finished, plot=plot)
+        )
+        self._jobs.append(job)
+        self._show_fitting()
+        future.add_done_callback(lambda future: self._signals.compared.emit(job, plot))
+        return job
+
+    def _comparison_finished(self, job, plot=None):
+        # Applies a comparison of the models finished in the background, and
+        # fits the model to plot. Called in the Qt event loop through
+        # self._signals, or by ComparisonJob.wait.
+        if job not in self._jobs:
+            return
+        self._jobs.remove(job)
+        self._show_fitting()
+        future = job.future
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            logger.warning("Comparison of the models failed: %s", error)
+            return
+        self._comparison = future.result()
+        logger.info("Comparison of the models:\n%s", self._comparison)
+        if plot is None and self._comparison.best is not None:
+            plot = self._comparison.best.fdef
+        if plot is not None:
+            self.fit(plot)
+
+    @property
+    def comparison(self):
+        return self._comparison
+
+    def edit_fit(self, fname):
+        """
+        Slot to edit an already defined custom fitting function
+
+        Parameters
+        ----------
+
+        fname: str
+            function name (a key from fitting functions dict)
+        """
+        efDialog = QtWidgets.QDialog()
+        editFitDialog = CustomFitDialog(efDialog, fname)
+        efDialog.show()
+        if efDialog.exec_() == QtWidgets.QDialog.Accepted:
+            customlist = get_func(typefunc="custom")
+            del customlist[fname]
+            self.showFitMenu.removeAction(self.showCustomFitActions[fname])
+            self.editFitMenu.removeAction(self.editFitActions[fname])
+            customlist[editFitDialog.fname] = editFitDialog.fdef
+            save_customlist(customlist)
+            self.add_fit_in_menu(editFitDialog.fname)
+        else:
+            pass
+
+    def new_fit(self):
+        """
+        Slot to define a new custom fitting function that will be saved in
+        customFit.txt
+        """
+        cfDialog = QtWidgets.QDialog()
+        customFitDialog = CustomFitDialog(cfDialog)
+        cfDialog.show()
+        if cfDialog.exec_() == QtWidgets.QDialog.Accepted:
+            customlist = get_func(typefunc="custom")
+            customlist[customFitDialog.fname] = customFitDialog.fdef
+            save_customlist(customlist)
+            self.add_fit_in_menu(customFitDialog.fname)
+        else:
+            pass
+
+    def reset_fit(self):
+        """
+        Slot to delete all custom fitting functions and refresh the Show Fit
+        menu and Edit User Fit menu
+        """
+        fits = set(self.showCustomFitActions.keys()).difference(["a(x-b)^2"])
+        for k in fits:
+            self.showFitMenu.removeAction(self.showCustomFitActions[k])
+        for k in set(self.editFitActions.keys()).difference(["a(x-b)^2"]):
+            self.editFitMenu.removeAction(self.editFitActions[k])
+        self.add_fit_in_menu("a(x-b)^2")
+        customlist = {"a(x-b)^2": "lambda x, a, b : a*(x-b)**2 ; (1, 1)"}
+        save_customlist(customlist)
+
+    def draw_line(self):
+        """
+        Slot to dynamically draw a line on the figure window
+        """
+        dlin = DrawLine(self._fig)
+        self._lastLine = dlin
+        self._lines.append(dlin)
+
+    def undo_line(self):
+        """
+        Slot to remove the last drawn line
+        """
+        if self._lines:
+            self._lines[-1].lx.remove()
+            self._lines.pop()
+            try:
+                self._lastLine = self._lines[-1]
+            except IndexError:
+                self._lastLine = None
+
+            self.fig.canvas.draw()
+
+    def remove_all_lines(self):
+        """
+        Slot to remove all drawn lines.
+        CURRENTLY NOT USED
+        """
+        for lin in self._lines:
+            lin.lx.remove()
+        self._lines = []
+        self._lastLine = None
+        self.fig.canvas.draw()
+
+    def get_slope(self):
+        """
+        Slot to get the slope of the last drawn line.
+        If scale is lin-lin, print a and b from y = ax+b line definition.
+        If scale is log-log, print n and a from y = ax^n line definition.
+        """
+        if len(self._lines) > 0:
+            print(self._lines[-1])
+        else:
+            pass
+
+    def show_slope(self):
+        """
+        Slot to draw a line corresponding to a given slope if scale is lin-lin,
+        or to a given exponent if scale is log-log.
+        """
+        slope, ok = QtWidgets.QInputDialog.getText(
+            self.menu, "Enter the slope to show", "ex: -1"
+        )
+        if ok:
+            lin = DrawLine(self._fig, show_slope=float(slope))
+            self._lines.append(lin)
+            self._lastLine = lin
+        else:
+            pass
+
+    def show_fitInfo(self):
+        """
+        Slot to show a text box containing some fit infos of the last fit.
+        """
+        if self._lastFit is None:
+            return
+        else:
+            self._lastFit.show_fitInfo(self.showFitInfoAction.isChecked())
+
+    def show_confidence(self):
+        """
+        Slot to plot the range of confidence around fitting curves.
+        """
+        for f in self._fits:
+            f.show_confidence(self.showConfidenceAction.isChecked())
+
+
+if __name__ == "__main__":
+    plt.ion()
+    my_fig = plt.figure()
+    ax = my_fig.add_subplot(111)
+    (my_line,) = ax.plot(
+        np.arange(0, 100, 1),
+        np.arange(50, 250, 2) + 10 * (np.random.rand(100) - 1 / 2),
+        "b+",
+    )
+    ax.plot(
+        np.arange(0, 100, 1),
+        np.arange(0, 300, 3) + 30 * (np.random.rand(100) - 1 / 2),
+        "rx",
+    )
+    ax.plot(
+        np.arange(0, 100, 1),
+        np.square(np.arange(0, 10, 0.1)) + 5 * (np.random.rand(100) - 1 / 2),
+        "k.",
+    )
+    test = Figure(my_fig)
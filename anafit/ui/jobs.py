@@ -0,0 +1,145 @@
+import concurrent.futures
+import time
+
+from PyQt5 import QtCore
+
+
+class FitSignals(QtCore.QObject):
+    # Signals of the fits running in the background. They are emitted from the
+    # workers, and delivered to the slots in the Qt event loop of the figure.
+    finished = QtCore.pyqtSignal(object)
+    compared = QtCore.pyqtSignal(object, object)
+
+
+class FitJob(object):
+    def __init__(self, fit, future, cancel=None, callback=None):
+        """
+        Class following a fit running in the background, see Figure.fit
+
+        Parameters
+        ----------
+
+        fit: anafit.core.Fit object
+            the fit, whose results are applied when it is finished
+        future: concurrent.futures.Future
+            future of the results, returned by Fit.submit
+        cancel: threading.Event, optional
+            event interrupting the fit when set. Fits running in processes
+            can not be interrupted: their results are discarded.
+            Default: None
+        callback: function, optional
+            function called as callback(job) by self.wait, to apply the
+            results without waiting for the Qt event loop
+            Default: None
+        """
+        self._fit = fit
+        self._future = future
+        self._cancel = cancel
+        self._callback = callback
+        self._start = time.perf_counter()
+        self._cancelled = False
+
+    @property
+    def fit(self):
+        return self._fit
+
+    @property
+    def future(self):
+        return self._future
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    @property
+    def running(self):
+        return not self._future.done()
+
+    @property
+    def elapsed(self):
+        # time in seconds since the fit was started
+        return time.perf_counter() - self._start
+
+    def cancel(self):
+        """
+        Cancels the fit: it is not started if it is still waiting for a
+        worker, interrupted if it runs in a thread, and its results are
+        discarded in any case
+        """
+        self._cancelled = True
+        if self._cancel is not None:
+            self._cancel.set()
+        self._future.cancel()
+
+    def wait(self, timeout=None):
+        """
+        Blocks until the fit is finished, and applies its results
+
+        Parameters
+        ----------
+
+        timeout: float, optional
+            maximum time to wait, in seconds
+            Default: None
+
+        Returns
+        ----------
+        anafit.core.Fit object
+        """
+        concurrent.futures.wait([self._future], timeout)
+        if self._future.done() and self._callback is not None:
+            self._callback(self)
+        return self._fit
+
+    def _state(self):
+        if self._cancelled:
+            return "cancelled"
+        if self.running:
+            return "running for {0:.1f} s".format(self.elapsed)
+        return "done"
+
+    def __repr__(self):
+        return "FitJob({0!r}, {1})".format(self._fit.fname, self._state())
+
+
+class ComparisonJob(FitJob):
+    def __init__(self, future, callback=None):
+        """
+        Class following a comparison of models running in the background, see
+        Figure.fit_all
+
+        Parameters
+        ----------
+
+        future: concurrent.futures.Future
+            future of the anafit.core.ModelComparison
+        callback: function, optional
+            function called as callback(job) by self.wait, see FitJob
+            Default: None
+        """
+        super().__init__(None, future, callback=callback)
+
+    def wait(self, timeout=None):
+        """
+        Blocks until the comparison is finished, and applies its results
+
+        Parameters
+        ----------
+
+        timeout: float, optional
+            maximum time to wait, in seconds
+            Default: None
+
+        Returns
+        ----------
+        anafit.core.ModelComparison or None
+            None if the comparison is not finished, was cancelled or failed
+        """
+        super().wait(timeout)
+        future = self._future
+        if not future.done() or future.cancelled() or future.exception() is not None:
+            return None
+        return future.result()
+
+    def __repr__(self):
+        return "ComparisonJob({0})".format(self._state())
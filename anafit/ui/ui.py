@@ -27,6 +27,10 @@ class Ui_Fit:
         self.menu.addAction(
             "Remove all fit", self.remove_all_fit, QtGui.QKeySequence("Shift+Ctrl+Z")
         )
+        self.cancelFitAction = self.menu.addAction(
+            "Cancel Fitting", self.cancel_fits, QtGui.QKeySequence.Cancel
+        )
+        self.cancelFitAction.setEnabled(False)
         self.menu.addSeparator()
 
         self.datasetMenu = QtWidgets.QMenu("Dataset")
@@ -64,6 +68,9 @@ class Ui_Fit:
         self.showFitMenu.addAction(
             "Other Fit...", self.other_fit, QtGui.QKeySequence("Ctrl+O")
         )
+        self.showFitMenu.addAction(
+            "Fit All", self.fit_all, QtGui.QKeySequence("Ctrl+Shift+F")
+        )
 
         self.editFitMenu = QtWidgets.QMenu("Edit User Fit")
         self.menu.addMenu(self.editFitMenu)
@@ -128,6 +135,12 @@ class Ui_Fit:
     def undo_fit(self):
         pass
 
+    def fit_all(self):
+        pass
+
+    def cancel_fits(self):
+        pass
+
     def remove_all_fit(self):
         pass
 
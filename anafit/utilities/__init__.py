@@ -1 +1,16 @@
-from .utilities import from_fdef, get_func, save_customlist, script_path, str_line
+from .utilities import (  # noqa: F401
+    FuncRegistry,
+    clear_model_cache,
+    from_fdef,
+    get_fdef,
+    get_func,
+    model_cache_info,
+    normalize_fdef,
+    registry,
+    save_customlist,
+    script_path,
+    str_line,
+)
+from .blit import BlitManager  # noqa: F401
+from .expressions import ExpressionError, Model, evaluate_constant  # noqa: F401
+from .models import builtin_name, derive_jac, get_jac, guess_p  # noqa: F401
@@ -0,0 +1,113 @@
+import time
+
+# redraw rate used when the refresh rate of the display is unknown
+DEFAULT_FPS = 60
+
+
+class BlitManager(object):
+    def __init__(self, canvas, artists, fps=None):
+        """
+        Class redrawing a few animated artists of a figure (a guide line
+        following the mouse for instance) without redrawing the whole figure:
+        the background of the figure is cached after each full draw, and only
+        the artists are drawn on it and blitted to the screen. Redraws are
+        coalesced so that they happen at most fps times per second. If the
+        canvas does not support blitting, the artists are left as they are
+        and redrawn with the whole figure by canvas.draw_idle.
+
+        Parameters
+        ----------
+
+        canvas: matplotlib FigureCanvas object
+            canvas of the figure containing the artists
+        artists: list
+            matplotlib artists to redraw
+        fps: float, optional
+            maximum number of redraws per second, typically the refresh rate
+            of the display.
+            Default: DEFAULT_FPS
+        """
+        self.canvas = canvas
+        self.artists = list(artists)
+        self._interval = 1 / (fps or DEFAULT_FPS)
+        self._background = None
+        self._pending = False
+        self._last = 0
+        self._timer = None
+        self._cdraw = None
+        if getattr(canvas, "supports_blit", False):
+            # animated artists are skipped by full draws, so they are only
+            # made animated when they can be blitted
+            for artist in self.artists:
+                artist.set_animated(True)
+            self._cdraw = canvas.mpl_connect("draw_event", self.on_draw)
+            self._timer = canvas.new_timer(interval=1)
+            self._timer.single_shot = True
+            self._timer.add_callback(self.flush)
+        self.canvas.draw()
+
+    @property
+    def blitting(self):
+        return self._cdraw is not None
+
+    def on_draw(self, event):
+        """
+        Caches the background of the figure after a full draw, and draws the
+        artists on it
+
+        Parameters
+        ----------
+
+        event: matplotlib draw_event
+        """
+        self._background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self._blit()
+
+    def _blit(self):
+        figure = self.canvas.figure
+        self.canvas.restore_region(self._background)
+        for artist in self.artists:
+            figure.draw_artist(artist)
+        self.canvas.blit(figure.bbox)
+
+    def update(self):
+        """
+        Requests a redraw of the artists. The redraw happens immediately if the
+        previous one is older than 1/fps seconds, else it is scheduled for then,
+        and requests made in between are merged into it.
+        """
+        if self._background is None:
+            self.canvas.draw_idle()
+            return
+        wait = self._last + self._interval - time.perf_counter()
+        if wait <= 0:
+            self.flush()
+        elif not self._pending:
+            self._pending = True
+            self._timer.interval = max(1, int(1000 * wait))
+            self._timer.start()
+
+    def flush(self):
+        """
+        Redraws the artists now
+        """
+        if self._pending:
+            self._timer.stop()
+        self._pending = False
+        self._last = time.perf_counter()
+        if self._background is not None:
+            self._blit()
+
+    def remove(self):
+        """
+        Stops managing the artists: they are drawn again with the rest of the
+        figure on next draw
+        """
+        if self._timer is not None:
+            self._timer.stop()
+        if self._cdraw is not None:
+            self.canvas.mpl_disconnect(self._cdraw)
+            self._cdraw = None
+            for artist in self.artists:
+                artist.set_animated(False)
+        self._background = None
@@ -0,0 +1,602 @@
+import ast
+import copy
+import inspect
+import math
+
+import numpy as np
+
+# numpy functions allowed in fitting functions, as np.name or name
+FUNCTIONS = {
+    name: getattr(np, name)
+    for name in (
+        "exp",
+        "exp2",
+        "expm1",
+        "log",
+        "log2",
+        "log10",
+        "log1p",
+        "sqrt",
+        "cbrt",
+        "square",
+        "power",
+        "sin",
+        "cos",
+        "tan",
+        "arcsin",
+        "arccos",
+        "arctan",
+        "arctan2",
+        "sinh",
+        "cosh",
+        "tanh",
+        "arcsinh",
+        "arccosh",
+        "arctanh",
+        "abs",
+        "absolute",
+        "sign",
+        "heaviside",
+        "minimum",
+        "maximum",
+        "where",
+        "clip",
+        "sinc",
+        "hypot",
+    )
+}
+# numpy constants allowed in fitting functions, as np.name or name
+CONSTANTS = {"pi": np.pi, "e": np.e, "inf": np.inf}
+# python builtins allowed in the fitting functions of older versions, and the
+# numpy functions that replace them: they apply element-wise to arrays
+BUILTINS = {"abs": "absolute", "pow": "power", "min": "minimum", "max": "maximum"}
+# number of arguments of the functions of FUNCTIONS which are not ufuncs: more
+# positional arguments would be their out argument
+_NARGS = {"where": 3, "clip": 3, "sinc": 1}
+# names under which numpy can be used in fitting functions
+NUMPY_NAMES = ("np", "numpy")
+# maximum number of bits of the integer powers computed in expressions: larger
+# results exceed the range of floats, and could take forever to compute
+MAX_POWER_BITS = 1024
+
+_OPERATORS = (
+    ast.Add,
+    ast.Sub,
+    ast.Mult,
+    ast.Div,
+    ast.Pow,
+    ast.Mod,
+    ast.FloorDiv,
+    ast.BitAnd,
+    ast.BitOr,
+    ast.USub,
+    ast.UAdd,
+    ast.Invert,
+    ast.Not,
+    ast.And,
+    ast.Or,
+    ast.Lt,
+    ast.LtE,
+    ast.Gt,
+    ast.GtE,
+    ast.Eq,
+    ast.NotEq,
+)
+_NODES = (
+    ast.Expression,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.Compare,
+    ast.BoolOp,
+    ast.IfExp,
+    ast.Call,
+    ast.Constant,
+    ast.Name,
+    ast.Attribute,
+    ast.Load,
+) + _OPERATORS
+
+# derivatives of the functions of one argument, with respect to it
+_DERIVATIVES = {
+    "exp": "exp(u)",
+    "exp2": "exp2(u)*log(2)",
+    "expm1": "exp(u)",
+    "log": "1/u",
+    "log2": "1/(u*log(2))",
+    "log10": "1/(u*log(10))",
+    "log1p": "1/(1+u)",
+    "sqrt": "0.5/sqrt(u)",
+    "cbrt": "1/(3*cbrt(u)**2)",
+    "square": "2*u",
+    "sin": "cos(u)",
+    "cos": "-sin(u)",
+    "tan": "1+tan(u)**2",
+    "arcsin": "1/sqrt(1-u**2)",
+    "arccos": "-1/sqrt(1-u**2)",
+    "arctan": "1/(1+u**2)",
+    "sinh": "cosh(u)",
+    "cosh": "sinh(u)",
+    "tanh": "1-tanh(u)**2",
+    "arcsinh": "1/sqrt(u**2+1)",
+    "arccosh": "1/sqrt(u**2-1)",
+    "arctanh": "1/(1-u**2)",
+    "abs": "sign(u)",
+    "absolute": "sign(u)",
+    "sign": "0",
+}
+
+
+class ExpressionError(ValueError):
+    """
+    Raised when a fitting function or a value uses a construct that is not
+    allowed, or when it cannot be derived
+    """
+
+
+def powlog(u, n):
+    """
+    Returns u**n * log(u), the derivative of u**n with respect to n, extended
+    by its limit 0 in u = 0
+    """
+    u = np.asarray(u, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(u == 0, 0.0, u**n * np.log(np.where(u == 0, 1.0, u)))
+
+
+def bounded_power(u, n):
+    """
+    Returns u**n, or raises ExpressionError if u and n are integers whose
+    power has more than MAX_POWER_BITS bits, like 10**10**10, which would
+    take forever to compute exactly
+    """
+    if (
+        isinstance(u, int)
+        and isinstance(n, int)
+        and n > 0
+        and abs(u) > 1
+        and n * math.log2(abs(u)) > MAX_POWER_BITS
+    ):
+        raise ExpressionError(
+            "Integer power of more than {0} bits".format(MAX_POWER_BITS)
+        )
+    return u**n
+
+
+# namespace in which the checked expressions are evaluated. The derivatives
+# call the functions by their private names, that cannot be shadowed by the
+# parameters
+_NAMESPACE = {
+    "__builtins__": {},
+    "_powlog": powlog,
+    "_bounded_power": bounded_power,
+    **FUNCTIONS,
+    **CONSTANTS,
+    **{name: np for name in NUMPY_NAMES},
+    **{name: FUNCTIONS[func] for name, func in BUILTINS.items()},
+    **{"_" + name: func for name, func in FUNCTIONS.items()},
+}
+
+
+def _function_name(node):
+    # Returns the name of the numpy function called by a Call node
+    func = node.func
+    if isinstance(func, ast.Attribute):
+        return func.attr
+    return BUILTINS.get(func.id, func.id)
+
+
+def _numpy_attribute(name):
+    # True if np.name is allowed in fitting functions: the functions and
+    # constants above, any other ufunc (element-wise functions without side
+    # effects), and float constants
+    value = getattr(np, name, None)
+    return (
+        name in FUNCTIONS
+        or name in CONSTANTS
+        or isinstance(value, (np.ufunc, float))
+    )
+
+
+def _nargs(name):
+    # Returns the number of arguments of the allowed numpy function name
+    func = getattr(np, name)
+    if isinstance(func, np.ufunc):
+        return func.nin
+    return _NARGS[name]
+
+
+def _check(node, names):
+    # Raises ExpressionError if the tree of node contains other things than
+    # numbers, the variables in names, and allowed numpy functions and
+    # constants combined by arithmetic operators
+    if not isinstance(node, _NODES):
+        raise ExpressionError(
+            "{0} is not allowed in fitting functions".format(type(node).__name__)
+        )
+    if isinstance(node, ast.Constant):
+        if not isinstance(node.value, (int, float, complex)):
+            raise ExpressionError("Constant {0!r} is not allowed".format(node.value))
+    elif isinstance(node, ast.Name):
+        if not (
+            node.id in names
+            or node.id in FUNCTIONS
+            or node.id in CONSTANTS
+            or node.id in BUILTINS
+        ):
+            raise ExpressionError("Unknown name {0!r}".format(node.id))
+    elif isinstance(node, ast.Attribute):
+        if not (
+            isinstance(node.value, ast.Name)
+            and node.value.id in NUMPY_NAMES
+            and node.value.id not in names
+            and _numpy_attribute(node.attr)
+        ):
+            raise ExpressionError(
+                "Unknown attribute {0!r}: only numpy element-wise functions "
+                "(ufuncs) and constants are allowed".format(ast.unparse(node))
+            )
+        return
+    elif isinstance(node, ast.Call):
+        if node.keywords or not (
+            isinstance(node.func, ast.Attribute)
+            or (isinstance(node.func, ast.Name) and node.func.id not in names)
+        ):
+            raise ExpressionError("Call {0!r} is not allowed".format(ast.unparse(node)))
+        name = _function_name(node)
+        if not (
+            name in FUNCTIONS
+            or (
+                isinstance(node.func, ast.Attribute)
+                and isinstance(getattr(np, name, None), np.ufunc)
+            )
+        ):
+            raise ExpressionError(
+                "Function {0!r} is not allowed".format(ast.unparse(node.func))
+            )
+        if len(node.args) != _nargs(name):
+            raise ExpressionError(
+                "{0!r} takes {1} arguments".format(ast.unparse(node.func), _nargs(name))
+            )
+    for child in ast.iter_child_nodes(node):
+        _check(child, names)
+
+
+class _BoundPowers(ast.NodeTransformer):
+    # Replaces the power operators by calls to bounded_power, in the checked
+    # expressions about to be compiled
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Pow):
+            return _call("bounded_power", node.left, node.right)
+        return node
+
+
+def _bound_powers(node):
+    return ast.fix_missing_locations(_BoundPowers().visit(copy.deepcopy(node)))
+
+
+def _parse(source):
+    try:
+        return ast.parse(source.strip(), mode="eval")
+    except SyntaxError as error:
+        raise ExpressionError("Invalid syntax in {0!r}".format(source)) from error
+
+
+def evaluate_constant(source):
+    """
+    Returns the value of a string containing numbers, or a tuple of numbers,
+    combined by arithmetic operators and numpy functions and constants. It
+    replaces eval for the values entered by users, like '(10, 2*np.pi)'.
+
+    Parameters
+    ----------
+
+    source : str
+
+    Returns
+    ----------
+    number or tuple
+    """
+    tree = _parse(source)
+    body = tree.body
+    items = body.elts if isinstance(body, (ast.Tuple, ast.List)) else [body]
+    for item in items:
+        _check(item, ())
+    values = [
+        eval(
+            compile(ast.Expression(_bound_powers(item)), "<value>", "eval"),
+            _NAMESPACE,
+        )
+        for item in items
+    ]
+    if isinstance(body, (ast.Tuple, ast.List)):
+        return tuple(values)
+    return values[0]
+
+
+class _Substitute(ast.NodeTransformer):
+    # Replaces the name u by a tree, and the functions by their private
+    # names, in the templates of _DERIVATIVES
+    def __init__(self, node):
+        self._node = node
+
+    def visit_Name(self, node):
+        if node.id == "u":
+            return copy.deepcopy(self._node)
+        return node
+
+    def visit_Call(self, node):
+        node.args = [self.visit(arg) for arg in node.args]
+        return _call(node.func.id, *node.args)
+
+
+def _const(value):
+    return ast.Constant(value)
+
+
+def _is(node, value):
+    return (
+        isinstance(node, ast.Constant)
+        and not isinstance(node.value, bool)
+        and node.value == value
+    )
+
+
+def _both_const(a, b):
+    return isinstance(a, ast.Constant) and isinstance(b, ast.Constant)
+
+
+def _add(a, b):
+    if _is(a, 0):
+        return b
+    if _is(b, 0):
+        return a
+    if _both_const(a, b):
+        return _const(a.value + b.value)
+    return ast.BinOp(a, ast.Add(), b)
+
+
+def _sub(a, b):
+    if _is(b, 0):
+        return a
+    if _is(a, 0):
+        return _neg(b)
+    if _both_const(a, b):
+        return _const(a.value - b.value)
+    return ast.BinOp(a, ast.Sub(), b)
+
+
+def _mul(a, b):
+    if _is(a, 0) or _is(b, 0):
+        return _const(0)
+    if _is(a, 1):
+        return b
+    if _is(b, 1):
+        return a
+    if _both_const(a, b):
+        return _const(a.value * b.value)
+    return ast.BinOp(a, ast.Mult(), b)
+
+
+def _div(a, b):
+    if _is(a, 0):
+        return _const(0)
+    if _is(b, 1):
+        return a
+    return ast.BinOp(a, ast.Div(), b)
+
+
+def _neg(a):
+    if isinstance(a, ast.Constant):
+        return _const(-a.value)
+    return ast.UnaryOp(ast.USub(), a)
+
+
+def _pow(a, b):
+    if _is(b, 0):
+        return _const(1)
+    if _is(b, 1):
+        return a
+    return ast.BinOp(a, ast.Pow(), b)
+
+
+def _call(name, *args):
+    return ast.Call(ast.Name("_" + name, ast.Load()), list(args), [])
+
+
+def _derive_pow(u, v, du, dv):
+    # derivative of u**v
+    d = _mul(_mul(v, _pow(u, _sub(v, _const(1)))), du)
+    return _add(d, _mul(_call("powlog", u, v), dv))
+
+
+def _derive(node, name):
+    """
+    Returns the tree of the derivative of the checked expression node with
+    respect to the variable name, or raises ExpressionError
+    """
+    if isinstance(node, ast.Constant):
+        return _const(0)
+    if isinstance(node, ast.Name):
+        return _const(1 if node.id == name else 0)
+    if isinstance(node, ast.Attribute):
+        return _const(0)
+    if isinstance(node, ast.UnaryOp):
+        if isinstance(node.op, ast.USub):
+            return _neg(_derive(node.operand, name))
+        if isinstance(node.op, ast.UAdd):
+            return _derive(node.operand, name)
+    elif isinstance(node, ast.BinOp):
+        u, v = node.left, node.right
+        du, dv = _derive(u, name), _derive(v, name)
+        if isinstance(node.op, ast.Add):
+            return _add(du, dv)
+        if isinstance(node.op, ast.Sub):
+            return _sub(du, dv)
+        if isinstance(node.op, ast.Mult):
+            return _add(_mul(du, v), _mul(u, dv))
+        if isinstance(node.op, ast.Div):
+            return _sub(_div(du, v), _div(_mul(u, dv), _pow(v, _const(2))))
+        if isinstance(node.op, ast.Pow):
+            return _derive_pow(u, v, du, dv)
+    elif isinstance(node, ast.Call):
+        func, args = _function_name(node), node.args
+        # the condition of where is not derived
+        first = 1 if func == "where" else 0
+        derivatives = [_derive(arg, name) for arg in args[first:]]
+        if all(_is(d, 0) for d in derivatives):
+            return _const(0)
+        if func in _DERIVATIVES and len(args) == 1:
+            template = _parse(_DERIVATIVES[func]).body
+            return _mul(_Substitute(args[0]).visit(template), derivatives[0])
+        if func == "power" and len(args) == 2:
+            return _derive_pow(*args, *derivatives)
+        if func == "arctan2" and len(args) == 2:
+            (u, v), (du, dv) = args, derivatives
+            norm = _add(_pow(u, _const(2)), _pow(v, _const(2)))
+            return _div(_sub(_mul(v, du), _mul(u, dv)), norm)
+        if func in ("minimum", "maximum") and len(args) == 2:
+            op = ast.LtE() if func == "minimum" else ast.GtE()
+            condition = ast.Compare(args[0], [op], [args[1]])
+            return _call("where", condition, *derivatives)
+        if func == "where" and len(args) == 3:
+            return _call("where", args[0], *derivatives)
+    raise ExpressionError(
+        "Cannot derive {0!r} with respect to {1}".format(ast.unparse(node), name)
+    )
+
+
+class Model(object):
+    def __init__(self, source):
+        """
+        Fitting function compiled from the string of a lambda, like
+        'lambda x, a, b : a*np.exp(x/b)'. The expression is parsed and checked
+        to only contain numbers, the variables of the lambda, and numpy
+        functions and constants (see FUNCTIONS and CONSTANTS, plus the other
+        ufuncs and float constants as np.name, and BUILTINS) combined by
+        arithmetic operators, so that evaluating it has no other effect. The
+        model is called as f(x, *p), like the lambda, can be pickled to be
+        sent to worker processes, and can be derived symbolically.
+
+        Parameters
+        ----------
+
+        source : str
+            string of a lambda, of type 'lambda x, a, b : expression'
+
+        Raises
+        ----------
+        ExpressionError
+            if source is not a lambda, or uses a construct that is not allowed
+        """
+        self._source = " ".join(source.split())
+        lambda_ = _parse(self._source).body
+        if not isinstance(lambda_, ast.Lambda):
+            raise ExpressionError("Expected 'lambda x, ... : expression'")
+        args = lambda_.args
+        if (
+            args.posonlyargs
+            or args.vararg
+            or args.kwonlyargs
+            or args.kwarg
+            or args.defaults
+            or not args.args
+        ):
+            raise ExpressionError("Expected 'lambda x, ... : expression'")
+        self._names = tuple(arg.arg for arg in args.args)
+        if any(name.startswith("_") for name in self._names):
+            raise ExpressionError("Variable names cannot start with '_'")
+        _check(lambda_.body, self._names)
+        self._body = lambda_.body
+        self._func = self._compile(self._body)
+        self.__signature__ = inspect.Signature(
+            [
+                inspect.Parameter(name, inspect.Parameter.POSITIONAL_OR_KEYWORD)
+                for name in self._names
+            ]
+        )
+
+    def _compile(self, body):
+        # Returns the python function of the lambda of self._names and body
+        args = ast.arguments(
+            posonlyargs=[],
+            args=[ast.arg(name) for name in self._names],
+            kwonlyargs=[],
+            kw_defaults=[],
+            defaults=[],
+        )
+        body = _bound_powers(body)
+        tree = ast.fix_missing_locations(ast.Expression(ast.Lambda(args, body)))
+        return eval(compile(tree, "<fitting function>", "eval"), _NAMESPACE)
+
+    @property
+    def source(self):
+        return self._source
+
+    @property
+    def names(self):
+        # names of the variable and of the parameters
+        return self._names
+
+    @property
+    def expression(self):
+        return ast.unparse(self._body)
+
+    @property
+    def __code__(self):
+        # code of the compiled lambda, as for functions
+        return self._func.__code__
+
+    def __call__(self, x, *p):
+        return self._func(x, *p)
+
+    def derivative(self, name):
+        """
+        Returns the string of the derivative of the expression with respect to
+        a variable or parameter
+
+        Parameters
+        ----------
+
+        name : str
+            name of a variable or of a parameter
+
+        Returns
+        ----------
+        str
+
+        Raises
+        ----------
+        ExpressionError
+            if the expression cannot be derived
+        """
+        return ast.unparse(_derive(self._body, name))
+
+    def derivatives(self):
+        """
+        Returns a function returning the tuple of the derivatives of the
+        expression with respect to each parameter, called as d(x, *p)
+
+        Returns
+        ----------
+        function
+
+        Raises
+        ----------
+        ExpressionError
+            if the expression cannot be derived
+        """
+        columns = [_derive(self._body, name) for name in self._names[1:]]
+        return self._compile(ast.Tuple(columns, ast.Load()))
+
+    def __reduce__(self):
+        return Model, (self._source,)
+
+    def __eq__(self, other):
+        return isinstance(other, Model) and other._source == self._source
+
+    def __hash__(self):
+        return hash(self._source)
+
+    def __repr__(self):
+        return "Model({0!r})".format(self._source)
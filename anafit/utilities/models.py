@@ -0,0 +1,297 @@
+import functools
+import warnings
+
+import numpy as np
+
+from .expressions import ExpressionError, Model, powlog
+from .utilities import EXP_FUNCS, LINEAR_FUNCS, POWER_FUNCS, normalize_fdef
+
+# analytic jacobians of the built-in fitting functions: each function returns
+# the derivatives of the function with respect to its parameters, in their
+# order
+JACOBIANS = {
+    "constant": lambda x, a: (1,),
+    "ax": lambda x, a: (x,),
+    "ax+b": lambda x, a, b: (x, 1),
+    "a(x-b)": lambda x, a, b: (x - b, -a),
+    "ax^n": lambda x, a, n: (x**n, a * powlog(x, n)),
+    "a+bx^n": lambda x, a, b, n: (1, x**n, b * powlog(x, n)),
+    "a(x-b)^n": lambda x, a, b, n: (
+        (x - b) ** n,
+        -a * n * (x - b) ** (n - 1),
+        a * powlog(x - b, n),
+    ),
+    "a+b(x-c)^n": lambda x, a, b, c, n: (
+        1,
+        (x - c) ** n,
+        -b * n * (x - c) ** (n - 1),
+        b * powlog(x - c, n),
+    ),
+    "exp(x/a)": lambda x, a: (-x / a**2 * np.exp(x / a),),
+    "a*exp(x/b)": lambda x, a, b: (np.exp(x / b), -a * x / b**2 * np.exp(x / b)),
+    "a*exp(x/b) + c": lambda x, a, b, c: (
+        np.exp(x / b),
+        -a * x / b**2 * np.exp(x / b),
+        1,
+    ),
+    "a*exp((x-b)/c)": lambda x, a, b, c: (
+        np.exp((x - b) / c),
+        -a / c * np.exp((x - b) / c),
+        -a * (x - b) / c**2 * np.exp((x - b) / c),
+    ),
+    "a(1-exp(-x/b))": lambda x, a, b: (
+        1 - np.exp(-x / b),
+        -a * x / b**2 * np.exp(-x / b),
+    ),
+}
+
+
+def _fstr(fdef):
+    # Returns the normalized function part of 'fdef ; (param)'
+    return normalize_fdef(fdef).split(";")[0].strip()
+
+
+# names of the built-in functions, indexed by their normalized function part
+_builtin_names = {
+    _fstr(fdef): name
+    for catalog in (LINEAR_FUNCS, POWER_FUNCS, EXP_FUNCS)
+    for name, fdef in catalog.items()
+}
+
+
+def builtin_name(fdef):
+    """
+    Returns the name of the built-in function defined by fdef, or None if
+    fdef does not define a built-in function
+
+    Parameters
+    ----------
+
+    fdef : str
+        String of type 'fdef ; (param)'
+
+    Returns
+    ----------
+    str or None
+    """
+    return _builtin_names.get(_fstr(fdef))
+
+
+def _jacobian(derivatives):
+    # Turns a function returning one derivative per parameter into a jacobian
+    # function returning a (len(x), len(p)) array, as expected by curve_fit
+    def jac(x, *p):
+        x = np.asarray(x, dtype=float)
+        columns = derivatives(x, *p)
+        out = np.empty(x.shape + (len(columns),))
+        for i, column in enumerate(columns):
+            out[..., i] = column
+        return out
+
+    return jac
+
+
+def derive_jac(fdef):
+    """
+    Returns the jacobian of a custom fitting function, derived symbolically
+    from its compiled expression (see Model.derivatives), or None if it
+    cannot be derived
+
+    Parameters
+    ----------
+
+    fdef : str
+        String of type 'fdef ; (param)'
+
+    Returns
+    ----------
+    function or None
+    """
+    try:
+        return _jacobian(Model(_fstr(fdef)).derivatives())
+    except ExpressionError:
+        return None
+
+
+@functools.lru_cache(maxsize=256)
+def _get_jac(fstr, derive):
+    name = _builtin_names.get(fstr)
+    if name is not None:
+        return _jacobian(JACOBIANS[name])
+    if derive:
+        return derive_jac(fstr + " ; ()")
+    return None
+
+
+def get_jac(fdef, derive=True):
+    """
+    Returns the jacobian of a fitting function, as a function jac(x, *p)
+    returning the (len(x), len(p)) array of derivatives with respect to the
+    parameters. Built-in functions have an analytic jacobian; for other
+    functions, it is derived symbolically if derive is True.
+
+    Parameters
+    ----------
+
+    fdef : str
+        String of type 'fdef ; (param)'
+    derive : bool, optional
+        if True, tries to derive the jacobian of non built-in functions
+        Default: True
+
+    Returns
+    ----------
+    function or None
+        None if no jacobian can be obtained
+    """
+    return _get_jac(_fstr(fdef), derive)
+
+
+def _line(u, v):
+    # Least-squares line v = c0 + c1*u, from the moments of u and v
+    um, vm = u.mean(), v.mean()
+    du = u - um
+    c1 = (du @ (v - vm)) / (du @ du)
+    return vm - c1 * um, c1
+
+
+def _sorted(x, y):
+    # Returns x and y sorted along x, without sorting if already sorted
+    if np.all(x[1:] >= x[:-1]):
+        return x, y
+    order = np.argsort(x)
+    return x[order], y[order]
+
+
+def _exp_offset(x, y):
+    # Estimates y = A + B*exp(C*x) without iterations, by linear regression
+    # on the integral equation y - y[0] = -A*C*(x - x[0]) + C*integral(y dx)
+    x, y = _sorted(x, y)
+    integral = np.concatenate(([0], np.cumsum(0.5 * (y[1:] + y[:-1]) * np.diff(x))))
+    basis = np.column_stack((x - x[0], integral))
+    (_, c), *_ = np.linalg.lstsq(basis, y - y[0], rcond=None)
+    a, b = _line(np.exp(c * x), y)
+    return a, b, c
+
+
+def _power(x, y, x0=0):
+    # Estimates y = a*(x-x0)**n by a linear regression in log-log scale
+    u = x - x0
+    keep = (u > 0) & (y != 0)
+    c0, n = _line(np.log(u[keep]), np.log(np.abs(y[keep])))
+    return np.sign(np.mean(y[keep])) * np.exp(c0), n
+
+
+def _shift(x):
+    # Returns a shift slightly below the smallest x
+    return x.min() - 0.05 * (x.max() - x.min() or 1)
+
+
+def _guess_affine(x, y):
+    c0, c1 = _line(x, y)
+    return c1, -c0 / c1
+
+
+def _guess_power_offset(x, y):
+    i = np.argmin(np.abs(x))
+    a = y[i]
+    x, y = np.delete(x, i), np.delete(y, i)
+    b, n = _power(x, y - a)
+    return a, b, n
+
+
+def _guess_power_shift(x, y):
+    b = _shift(x)
+    a, n = _power(x, y, b)
+    return a, b, n
+
+
+def _guess_power_shift_offset(x, y):
+    c = _shift(x)
+    i = np.argmin(x)
+    a = y[i]
+    x, y = np.delete(x, i), np.delete(y, i)
+    b, n = _power(x, y - a, c)
+    return a, b, c, n
+
+
+def _guess_exp(x, y):
+    c0, c1 = _line(x, np.log(np.abs(y)))
+    return np.sign(y.mean()) * np.exp(c0), 1 / c1
+
+
+def _guess_exp_offset(x, y):
+    a, b, c = _exp_offset(x, y)
+    return b, 1 / c, a
+
+
+def _guess_exp_shift(x, y):
+    # a and b are redundant: b is set in the middle of the data
+    _, a, c = _exp_offset(x, y)
+    b = np.median(x)
+    return a * np.exp(c * b), b, 1 / c
+
+
+def _guess_exp_saturation(x, y):
+    a, _, c = _exp_offset(x, y)
+    return a, -1 / c
+
+
+# initial guess estimators of the built-in functions: each returns initialising
+# parameters from the x and y arrays of the datas to fit
+GUESSES = {
+    "constant": lambda x, y: (y.mean(),),
+    "ax": lambda x, y: ((x @ y) / (x @ x),),
+    "ax+b": lambda x, y: _line(x, y)[::-1],
+    "a(x-b)": _guess_affine,
+    "ax^n": _power,
+    "a+bx^n": _guess_power_offset,
+    "a(x-b)^n": _guess_power_shift,
+    "a+b(x-c)^n": _guess_power_shift_offset,
+    "exp(x/a)": lambda x, y: ((x @ x) / (x @ np.log(np.abs(y))),),
+    "a*exp(x/b)": _guess_exp,
+    "a*exp(x/b) + c": _guess_exp_offset,
+    "a*exp((x-b)/c)": _guess_exp_shift,
+    "a(1-exp(-x/b))": _guess_exp_saturation,
+}
+
+
+def guess_p(fdef, x, y):
+    """
+    Returns initialising parameters estimated from the datas to fit, for
+    built-in fitting functions. The estimators run in a few vectorized passes
+    over the datas (log-log regression for power laws, regression of an
+    integral equation for exponentials...)
+
+    Parameters
+    ----------
+
+    fdef : str
+        String of type 'fdef ; (param)'
+    x: numpy.ndarray
+        x values of the datas to fit
+    y: numpy.ndarray
+        y values of the datas to fit
+
+    Returns
+    ----------
+    tuple or None
+        None if fdef is not a built-in function, or if the estimation fails
+    """
+    name = builtin_name(fdef)
+    if name is None:
+        return None
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    keep = np.isfinite(x) & np.isfinite(y)
+    if not np.all(keep):
+        x, y = x[keep], y[keep]
+    try:
+        with np.errstate(all="ignore"), warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            p = tuple(float(pi) for pi in GUESSES[name](x, y))
+    except (ArithmeticError, IndexError, ValueError, np.linalg.LinAlgError):
+        return None
+    if not np.all(np.isfinite(p)):
+        return None
+    return p
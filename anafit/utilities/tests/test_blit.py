@@ -0,0 +1,78 @@
+from unittest import TestCase, mock
+
+import matplotlib.pyplot as plt
+
+from anafit.utilities import BlitManager
+
+
+class TestBlitManager(TestCase):
+    def setUp(self):
+        self.fig, self.ax = plt.subplots()
+        self.ax.plot(range(10))
+        (self.guide,) = self.ax.plot([0, 1], [0, 1], "k--")
+
+    def tearDown(self):
+        plt.close(self.fig)
+
+    def test_background_cached(self):
+        # When
+        blit = BlitManager(self.fig.canvas, [self.guide])
+
+        # Then
+        self.assertTrue(blit.blitting)
+        self.assertTrue(self.guide.get_animated())
+        self.assertIsNotNone(blit._background)
+
+    def test_update_blits_only_artists(self):
+        # Given
+        blit = BlitManager(self.fig.canvas, [self.guide], fps=1e-3)
+        blit._last = 0
+
+        # When
+        with mock.patch.object(self.fig.canvas, "draw") as draw:
+            with mock.patch.object(self.fig.canvas, "blit") as canvas_blit:
+                blit.update()
+
+        # Then
+        draw.assert_not_called()
+        canvas_blit.assert_called_once()
+
+    def test_updates_coalesced(self):
+        # Given
+        blit = BlitManager(self.fig.canvas, [self.guide], fps=1e-3)
+        blit.flush()
+
+        # When
+        with mock.patch.object(self.fig.canvas, "blit") as canvas_blit:
+            for _ in range(10):
+                blit.update()
+            self.assertEqual(canvas_blit.call_count, 0)
+            blit.flush()
+
+        # Then
+        canvas_blit.assert_called_once()
+
+    def test_no_blit_support(self):
+        # Given
+        canvas = mock.Mock(spec=["figure", "draw", "draw_idle"])
+        canvas.figure = self.fig
+
+        # When
+        blit = BlitManager(canvas, [self.guide])
+        blit.update()
+
+        # Then
+        self.assertFalse(blit.blitting)
+        self.assertFalse(self.guide.get_animated())
+        canvas.draw_idle.assert_called_once()
+
+    def test_remove(self):
+        # Given
+        blit = BlitManager(self.fig.canvas, [self.guide])
+
+        # When
+        blit.remove()
+
+        # Then
+        self.assertFalse(self.guide.get_animated())
+        self.assertFalse(blit.blitting)
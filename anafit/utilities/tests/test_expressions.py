@@ -0,0 +1,181 @@
+import pickle
+from unittest import TestCase
+
+import numpy as np
+from scipy.optimize import curve_fit
+
+from anafit.utilities import ExpressionError, Model, evaluate_constant, from_fdef
+
+
+class TestModel(TestCase):
+    def setUp(self):
+        self.x = np.linspace(1.5, 4, 30)
+
+    def numerical_jac(self, f, p, h=1e-6):
+        p = np.asarray(p, dtype=float)
+        columns = []
+        for i in range(p.size):
+            dp = np.zeros(p.size)
+            dp[i] = h
+            columns.append((f(self.x, *(p + dp)) - f(self.x, *(p - dp))) / (2 * h))
+        return np.column_stack(np.broadcast_arrays(self.x, *columns)[1:])
+
+    def test_call(self):
+        # Given
+        model = Model("lambda x, a, b : a*np.exp(-x/b) + pi")
+
+        # When
+        y = model(self.x, 2, 3)
+
+        # Then
+        np.testing.assert_allclose(y, 2 * np.exp(-self.x / 3) + np.pi)
+        self.assertEqual(model.names, ("x", "a", "b"))
+        self.assertEqual(model.__code__.co_argcount, 3)
+
+    def test_pickle(self):
+        # Given
+        model = Model("lambda x, a, b : a*np.sin(b*x)")
+
+        # When
+        copy = pickle.loads(pickle.dumps(model))
+
+        # Then
+        self.assertEqual(copy, model)
+        np.testing.assert_array_equal(copy(self.x, 1, 2), model(self.x, 1, 2))
+
+    def test_curve_fit_without_p0(self):
+        # Given
+        model = Model("lambda x, a, b : a*np.exp(x/b)")
+
+        # When
+        popt, _ = curve_fit(model, self.x, 2 * np.exp(self.x / 3))
+
+        # Then
+        np.testing.assert_allclose(popt, (2, 3))
+
+    def test_derivatives(self):
+        sources = (
+            "lambda x, a, b, c : a*np.exp(-(x-b)**2/(2*c**2))",
+            "lambda x, a, b, c : a*sin(b*x+c) + np.log(c*x)",
+            "lambda x, a, b : a**x + x**b + np.power(b, a)",
+            "lambda x, a, b : np.arctan2(a*x, b) + np.tanh(a/x) - np.abs(b-x)",
+            "lambda x, a, b : np.maximum(a*x, b) + np.where(x > 2, a, b*x)",
+            "lambda x, a, b : np.sqrt(a*x) / (1 + np.arcsinh(b))",
+        )
+        for source in sources:
+            with self.subTest(source=source):
+                # Given
+                model = Model(source)
+                p = np.linspace(1.2, 0.6, len(model.names) - 1)
+
+                # When
+                columns = model.derivatives()(self.x, *p)
+
+                # Then
+                np.testing.assert_allclose(
+                    np.column_stack(np.broadcast_arrays(self.x, *columns)[1:]),
+                    self.numerical_jac(model, p),
+                    rtol=1e-5,
+                    atol=1e-8,
+                )
+
+    def test_derivative(self):
+        # Given
+        model = Model("lambda x, a, b : a*x**2 + b")
+
+        # Then
+        self.assertEqual(model.derivative("a"), "x ** 2")
+        self.assertEqual(model.derivative("x"), "a * (2 * x)")
+        self.assertEqual(model.derivative("b"), "1")
+
+    def test_conditional_is_not_derived(self):
+        # Given
+        model = Model("lambda x, a, b : a*x + b if x > 5 else b")
+
+        # Then
+        self.assertEqual(model(6, 2, 1), 13)
+        with self.assertRaises(ExpressionError):
+            model.derivatives()
+
+    def test_legacy_builtins(self):
+        # Given
+        model = Model("lambda x, a, b : max(a*x, b) + pow(x, a) - min(abs(x), b)")
+
+        # When
+        y = model(self.x, 1.2, 0.8)
+
+        # Then
+        expected = (
+            np.maximum(1.2 * self.x, 0.8)
+            + np.power(self.x, 1.2)
+            - np.minimum(np.abs(self.x), 0.8)
+        )
+        np.testing.assert_allclose(y, expected)
+        self.assertEqual(
+            model.derivative("b"),
+            "_where(a * x >= b, 0, 1) - _where(abs(x) <= b, 0, 1)",
+        )
+
+    def test_numpy_ufuncs_and_constants(self):
+        # Given
+        model = Model("lambda x, a : np.floor(a*x) + np.euler_gamma")
+
+        # Then
+        np.testing.assert_allclose(
+            model(self.x, 2), np.floor(2 * self.x) + np.euler_gamma
+        )
+
+    def test_forbidden_constructs(self):
+        sources = (
+            "lambda x : __import__('os').system('ls')",
+            "lambda x : x.__class__",
+            "lambda x : np.load('datas.npy')",
+            "lambda x : os.getcwd()",
+            "lambda x : (lambda: 1)()",
+            "lambda x, a : [a]",
+            "lambda x : 'a'",
+            "lambda x, a=1 : a",
+            "lambda x, np : np.exp(x)",
+            "lambda x, _a : _a",
+            "lambda x : np.exp(x, x)",
+            "lambda x, a : np.add(x, a, x)",
+            "lambda x : np.sum(x)",
+            "lambda x : np.pi(x)",
+            "lambda x : max(x)",
+            "x + 1",
+            "lambda x : x +",
+        )
+        for source in sources:
+            with self.subTest(source=source):
+                with self.assertRaises(ExpressionError):
+                    Model(source)
+
+    def test_from_fdef_rejects_code(self):
+        with self.assertRaises(ExpressionError):
+            from_fdef("lambda x, a : a*x ; (__import__('os').getcwd())")
+
+
+class TestEvaluateConstant(TestCase):
+    def test_values(self):
+        self.assertEqual(evaluate_constant("(10, 100)"), (10, 100))
+        self.assertEqual(evaluate_constant("(1)"), 1)
+        self.assertEqual(evaluate_constant("(-1e-3,)"), (-0.001,))
+        self.assertEqual(evaluate_constant("()"), ())
+        self.assertAlmostEqual(evaluate_constant("2*np.pi"), 2 * np.pi)
+
+    def test_large_integer_powers(self):
+        # Given
+        model = Model("lambda x, a : a*x**2 + 10**10**10")
+
+        # Then
+        self.assertEqual(evaluate_constant("(2**10, -3**2)"), (1024, -9))
+        with self.assertRaises(ExpressionError):
+            evaluate_constant("10**10**10")
+        with self.assertRaises(ExpressionError):
+            model(np.linspace(0, 1, 5), 1)
+
+    def test_forbidden(self):
+        for source in ("open('file')", "(1, 2) + (3,)", "x", "__import__('os')"):
+            with self.subTest(source=source):
+                with self.assertRaises(ExpressionError):
+                    evaluate_constant(source)
@@ -0,0 +1,119 @@
+from unittest import TestCase
+
+import numpy as np
+
+from anafit.utilities import builtin_name, from_fdef, get_func, get_jac, guess_p
+
+
+class TestJacobians(TestCase):
+    def setUp(self):
+        self.x = np.linspace(1.5, 4, 20)
+
+    def numerical_jac(self, f, x, p, h=1e-6):
+        p = np.asarray(p, dtype=float)
+        columns = []
+        for i in range(p.size):
+            dp = np.zeros(p.size)
+            dp[i] = h
+            columns.append((f(x, *(p + dp)) - f(x, *(p - dp))) / (2 * h))
+        return np.column_stack(np.broadcast_arrays(x, *columns)[1:])
+
+    def test_builtin_jacobians(self):
+        for fname in ("linear", "power", "exp"):
+            for name, fdef in get_func(typefunc=fname).items():
+                with self.subTest(name=name):
+                    # Given
+                    f, _ = from_fdef(fdef)
+                    p = np.linspace(1.2, 0.3, f.__code__.co_argcount - 1)
+
+                    # When
+                    jac = get_jac(fdef, derive=False)
+
+                    # Then
+                    self.assertEqual(builtin_name(fdef), name)
+                    np.testing.assert_allclose(
+                        jac(self.x, *p),
+                        self.numerical_jac(f, self.x, p),
+                        rtol=1e-5,
+                        atol=1e-8,
+                    )
+
+    def test_builtin_jacobian_of_inline_definition(self):
+        # When
+        jac = get_jac("lambda x, a, b :  a*x+b ; (2, 3)", derive=False)
+
+        # Then
+        np.testing.assert_array_equal(
+            jac(self.x, 2, 3), np.column_stack((self.x, np.ones(20)))
+        )
+
+    def test_power_jacobian_at_zero(self):
+        # When
+        jac = get_jac(get_func("ax^n"))
+
+        # Then
+        np.testing.assert_array_equal(jac(np.array([0.0, 1.0]), 2, 1.5)[:, 1], [0, 0])
+
+    def test_no_jacobian_without_derivation(self):
+        # Then
+        self.assertIsNone(get_jac("lambda x, a : a*x**3 ; (1)", derive=False))
+
+    def test_derived_jacobian(self):
+        # Given
+        fdef = "lambda x, a, b : a*np.sin(x/b) ; (1, 1)"
+        f, _ = from_fdef(fdef)
+
+        # When
+        jac = get_jac(fdef)
+
+        # Then
+        np.testing.assert_allclose(
+            jac(self.x, 1.5, 0.7),
+            self.numerical_jac(f, self.x, (1.5, 0.7)),
+            rtol=1e-5,
+        )
+
+
+class TestGuesses(TestCase):
+    def setUp(self):
+        self.x = np.linspace(0.1, 10, 1000)
+        self.noise = 0.01 * np.cos(37 * self.x)
+        self.truth = {
+            "constant": (4,),
+            "ax": (3,),
+            "ax+b": (3, -2),
+            "a(x-b)": (3, 2),
+            "ax^n": (5, 2.5),
+            "a+bx^n": (10, 2, 1.7),
+            "a(x-b)^n": (2, -1, 1.5),
+            "a+b(x-c)^n": (3, 2, -0.5, 2.2),
+            "exp(x/a)": (4,),
+            "a*exp(x/b)": (50, -3),
+            "a*exp(x/b) + c": (20, -2, 5),
+            "a*exp((x-b)/c)": (3, 1, 2.5),
+            "a(1-exp(-x/b))": (7, 3),
+        }
+
+    def test_guesses(self):
+        for name, p in self.truth.items():
+            with self.subTest(name=name):
+                # Given
+                f, _ = from_fdef(get_func(name))
+                y = f(self.x, *p) * (1 + self.noise)
+
+                # When
+                guess = guess_p(get_func(name), self.x, y)
+
+                # Then
+                self.assertEqual(len(guess), len(p))
+                np.testing.assert_allclose(
+                    f(self.x, *guess), f(self.x, *p), rtol=0.5, atol=0.5
+                )
+
+    def test_guess_of_custom_function(self):
+        # Then
+        self.assertIsNone(guess_p("lambda x, a : a*x**3 ; (1)", self.x, self.x))
+
+    def test_failed_guess(self):
+        # Then
+        self.assertIsNone(guess_p(get_func("ax^n"), -self.x, self.x))
@@ -0,0 +1,155 @@
+import json
+import os
+import tempfile
+import warnings
+from unittest import TestCase
+
+import numpy as np
+
+from anafit.utilities import (
+    FuncRegistry,
+    clear_model_cache,
+    from_fdef,
+    model_cache_info,
+    normalize_fdef,
+)
+
+
+class TestFromFdef(TestCase):
+    def setUp(self):
+        clear_model_cache()
+        self.fdef = "lambda x, a, b : a*x+b ; (1, 2)"
+
+    def test_from_fdef(self):
+        # When
+        f, p = from_fdef(self.fdef)
+
+        # Then
+        self.assertEqual(p, (1, 2))
+        np.testing.assert_array_almost_equal(f(np.arange(3), *p), [2, 3, 4])
+
+    def test_normalize_fdef(self):
+        # When
+        fdef = normalize_fdef("lambda x,  a, b :\ta*x+b;(1,  2) ")
+
+        # Then
+        self.assertEqual(fdef, "lambda x, a, b : a*x+b ; (1, 2)")
+
+    def test_cache_hits(self):
+        # When
+        f1, _ = from_fdef(self.fdef)
+        f2, _ = from_fdef("lambda x, a, b :  a*x+b ;  (1, 2)")
+
+        # Then
+        self.assertIs(f1, f2)
+        info = model_cache_info()
+        self.assertEqual(info.misses, 1)
+        self.assertEqual(info.hits, 1)
+        self.assertEqual(info.currsize, 1)
+
+    def test_clear_model_cache(self):
+        # Given
+        from_fdef(self.fdef)
+
+        # When
+        clear_model_cache()
+
+        # Then
+        info = model_cache_info()
+        self.assertEqual(info.currsize, 0)
+        self.assertEqual(info.hits + info.misses, 0)
+
+
+class TestFuncRegistry(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "customFit.txt")
+        self.customlist = {"a(x-b)^2": "lambda x, a, b : a*(x-b)**2 ; (1, 1)"}
+        with open(self.path, "w") as fid:
+            json.dump(self.customlist, fid)
+        self.registry = FuncRegistry(self.path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_get(self):
+        # Then
+        self.assertEqual(self.registry.get("ax+b"), "lambda x, a, b : a*x+b ; (1, 1)")
+        self.assertEqual(self.registry.get(typefunc="custom"), self.customlist)
+        self.assertIn("ax^n", self.registry.get(typefunc="power"))
+        self.assertIn("a(x-b)^2", self.registry.get())
+
+    def test_returned_dicts_are_copies(self):
+        # When
+        customlist = self.registry.get(typefunc="custom")
+        del customlist["a(x-b)^2"]
+
+        # Then
+        self.assertEqual(self.registry.get(typefunc="custom"), self.customlist)
+
+    def test_custom_file_read_once(self):
+        # Given
+        self.registry.get()
+        stamp = self.registry._stamp
+
+        # When
+        self.registry.get("a(x-b)^2")
+
+        # Then
+        self.assertIs(self.registry._stamp, stamp)
+
+    def test_reload_on_file_change(self):
+        # Given
+        self.registry.get()
+        with open(self.path, "w") as fid:
+            json.dump({"new": "lambda x, a : a*x**3 ; (1)", "longer": "x"}, fid)
+
+        # Then
+        self.assertEqual(self.registry.get("new"), "lambda x, a : a*x**3 ; (1)")
+
+    def test_save_custom(self):
+        # Given
+        customlist = {"new": "lambda x, a : a*x**3 ; (1)"}
+
+        # When
+        self.registry.save_custom(customlist)
+
+        # Then
+        self.assertEqual(self.registry.get(typefunc="custom"), customlist)
+        with open(self.path) as fid:
+            self.assertEqual(json.load(fid), customlist)
+
+    def test_legacy_custom_file(self):
+        # Given
+        customlist = {
+            "clipped": "lambda x, a, b : max(a*x, b) ; (1, 0)",
+            "power": "lambda x, a, n : a*pow(x, n) ; (1, 2)",
+            "steps": "lambda x, a : np.floor(x/a) ; (1)",
+            "polynomial": "lambda x, a, b : np.polyval((a, b), x) ; (1, 1)",
+        }
+        with open(self.path, "w") as fid:
+            json.dump(customlist, fid)
+
+        # When
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            catalog = self.registry.get(typefunc="custom")
+
+        # Then
+        self.assertEqual(catalog, customlist)
+        self.assertEqual(len(caught), 1)
+        self.assertIn("'polynomial'", str(caught[0].message))
+        self.assertIn("np.polyval", str(caught[0].message))
+        x = np.linspace(0.5, 3, 6)
+        f, p = from_fdef(customlist["clipped"])
+        np.testing.assert_allclose(f(x, 2, 3), np.maximum(2 * x, 3))
+        f, p = from_fdef(customlist["power"])
+        np.testing.assert_allclose(f(x, *p), x**2)
+
+    def test_missing_file(self):
+        # Given
+        registry = FuncRegistry(os.path.join(self.tmpdir.name, "none.txt"))
+
+        # Then
+        self.assertEqual(registry.get(typefunc="custom"), {})
+        self.assertIn("constant", registry.get())
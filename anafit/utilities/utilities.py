@@ -1,10 +1,153 @@
+import functools
 import json
 import os
+import warnings
 
 import numpy as np
 
+from .expressions import ExpressionError, Model, evaluate_constant
+
 # global variable
 script_path = os.path.dirname(os.path.abspath(__file__))
+# maximum number of compiled fitting functions kept in memory by from_fdef
+MODEL_CACHE_SIZE = 256
+
+
+# built-in fitting functions, sorted by type
+LINEAR_FUNCS = {
+    "constant": "lambda x, a : a ; (1)",
+    "ax": "lambda x, a : a*x ; (1)",
+    "ax+b": "lambda x, a, b : a*x+b ; (1, 1)",
+    "a(x-b)": "lambda x, a, b : a*(x-b) ; (1, 1)",
+}
+POWER_FUNCS = {
+    "ax^n": "lambda x, a, n : a*(x**n) ; (1, 1)",
+    "a+bx^n": "lambda x, a, b, n : a+b*(x**n) ; (1, 1, 1)",
+    "a(x-b)^n": "lambda x, a, b, n : a*((x-b)**n) ; (1, 1, 1)",
+    "a+b(x-c)^n": "lambda x, a, b, c, n : a+b*((x-c)**n) ; (1, 1, 1, 1)",
+}
+EXP_FUNCS = {
+    "exp(x/a)": "lambda x, a : np.exp(x/a) ; (1)",
+    "a*exp(x/b)": "lambda x, a, b : a*np.exp(x/b) ; (1, 1)",
+    "a*exp(x/b) + c": "lambda x, a, b, c : a*np.exp(x/b) + c ; (1, 1, 1)",
+    "a*exp((x-b)/c)": "lambda x, a, b, c : a*np.exp((x-b)/c) ; (1, 1, 1)",
+    "a(1-exp(-x/b))": "lambda x, a, b : a*(1 - np.exp(-x/b)) ; (1, 1)",
+}
+
+
+class FuncRegistry(object):
+    def __init__(self, custom_path):
+        """
+        Class holding in memory the catalogs of fitting functions: the built-in
+        ones and the custom ones saved in a json file. The custom catalog is
+        read once, and read again only if the file has been modified since.
+
+        Parameters
+        ----------
+
+        custom_path : str
+            path of the json file storing the custom fitting functions
+        """
+        self._custom_path = custom_path
+        self._builtin = {
+            "linear": LINEAR_FUNCS,
+            "power": POWER_FUNCS,
+            "exp": EXP_FUNCS,
+        }
+        self._custom = None
+        self._funclist = None
+        self._stamp = None
+
+    @property
+    def custom_path(self):
+        return self._custom_path
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self._custom_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self):
+        stamp = self._file_stamp()
+        if self._custom is not None and stamp == self._stamp:
+            return
+        if stamp is None:
+            customlist = {}
+        else:
+            with open(self._custom_path, "r") as fid:
+                customlist = json.load(fid)
+            self._check_custom(customlist)
+        self._set_custom(customlist, stamp)
+
+    def _check_custom(self, customlist):
+        # Warns about the custom functions that can not be compiled, like the
+        # ones of older versions using python or numpy functions that are not
+        # allowed anymore. They are kept in the catalog, to be edited.
+        for name, fdef in customlist.items():
+            try:
+                from_fdef(fdef)
+            except ValueError as error:
+                warnings.warn(
+                    "Custom fitting function {0!r} of {1} can not be used: {2}. "
+                    "Fitting functions may only use numpy element-wise "
+                    "functions and constants (see anafit.utilities.Model)".format(
+                        name, self._custom_path, error
+                    ),
+                    stacklevel=2,
+                )
+
+    def _set_custom(self, customlist, stamp):
+        self._custom = dict(customlist)
+        self._stamp = stamp
+        self._funclist = {
+            **LINEAR_FUNCS,
+            **POWER_FUNCS,
+            **EXP_FUNCS,
+            **self._custom,
+        }
+
+    def invalidate(self):
+        """
+        Forces the custom catalog to be read again from file on next access
+        """
+        self._custom = None
+        self._funclist = None
+        self._stamp = None
+
+    def save_custom(self, customlist):
+        """
+        Saves the custom catalog in its json file and updates it in memory
+
+        Parameters
+        ----------
+
+        customlist : dict
+            dict of custom fitting functions.
+            Ex : {'funcName':'lambda x, a, b : a*x+b ; (1, 0.1)'}
+        """
+        with open(self._custom_path, "w") as fid:
+            json.dump(customlist, fid, indent=2, sort_keys=True)
+        self._set_custom(customlist, self._file_stamp())
+
+    def get(self, strfunc=None, typefunc=None):
+        """
+        Returns a string or a dict of fitting functions. See get_func.
+        """
+        self._load()
+        if strfunc is not None:
+            return self._funclist[strfunc]
+        if typefunc is None:
+            return dict(self._funclist)
+        elif typefunc == "custom":
+            return dict(self._custom)
+        elif typefunc in self._builtin:
+            return dict(self._builtin[typefunc])
+
+
+# registry of the fitting functions used by get_func and save_customlist
+registry = FuncRegistry(os.path.join(script_path, "customFit.txt"))
 
 
 def save_customlist(customlist):
@@ -19,13 +162,14 @@ def save_customlist(customlist):
         Ex : {'funcName':'lambda x, a, b : a*x+b ; (1, 0.1)'}
 
     """
-    with open(os.path.join(script_path, "customFit.txt"), "w") as fid:
-        json.dump(customlist, fid, indent=2, sort_keys=True)
+    registry.save_custom(customlist)
 
 
 def get_func(strfunc=None, typefunc=None):
     """
-    Returns a string or a dict of custom fitting functions
+    Returns a string or a dict of custom fitting functions. The catalogs are
+    held in memory by the module registry: customFit.txt is only read again
+    when it has been modified.
 
     Parameters
     ----------
@@ -35,7 +179,7 @@ def get_func(strfunc=None, typefunc=None):
         returns the corresponding string function.
         Default: None
     typefunc : str, optional
-        Possible values: linear, power or custom. If provided, returns the
+        Possible values: linear, power, exp or custom. If provided, returns the
         dictionary of the corresponding type of functions.
         Default: None
 
@@ -44,51 +188,37 @@ def get_func(strfunc=None, typefunc=None):
     str or dict
 
     """
-    linlist = {
-        "constant": "lambda x, a : a ; (1)",
-        "ax": "lambda x, a : a*x ; (1)",
-        "ax+b": "lambda x, a, b : a*x+b ; (1, 1)",
-        "a(x-b)": "lambda x, a, b : a*(x-b) ; (1, 1)",
-    }
-    powerlist = {
-        "ax^n": "lambda x, a, n : a*(x**n) ; (1, 1)",
-        "a+bx^n": "lambda x, a, b, n : a+b*(x**n) ; (1, 1, 1)",
-        "a(x-b)^n": "lambda x, a, b, n : a*((x-b)**n) ; (1, 1, 1)",
-        "a+b(x-c)^n": "lambda x, a, b, c, n : a+b*((x-c)**n) ; (1, 1, 1, 1)",
-    }
-    explist = {
-        "exp(x/a)": "lambda x, a : np.exp(x/a) ; (1)",
-        "a*exp(x/b)": "lambda x, a, b : a*np.exp(x/b) ; (1, 1)",
-        "a*exp(x/b) + c": "lambda x, a, b, c : a*np.exp(x/b) + c ; (1, 1, 1)",
-        "a*exp((x-b)/c)": "lambda x, a, b, c : a*np.exp((x-b)/c) ; (1, 1, 1)",
-        "a(1-exp(-x/b))": "lambda x, a, b : a*(1 - np.exp(-x/b)) ; (1, 1)",
-    }
-    custom_path = os.path.join(script_path, "customFit.txt")
-    if os.path.exists(custom_path):
-        with open(custom_path, "r") as fid:
-            customlist = json.load(fid)
-    else:
-        customlist = {}
-    funclist = {**linlist, **powerlist, **explist, **customlist}
-    if strfunc is None:
-        if typefunc is None:
-            return funclist
-        elif typefunc == "linear":
-            return linlist
-        elif typefunc == "power":
-            return powerlist
-        elif typefunc == "exp":
-            return explist
-        elif typefunc == "custom":
-            return customlist
-    else:
-        return funclist[strfunc]
+    return registry.get(strfunc, typefunc)
+
+
+def get_fdef(fname):
+    """
+    Returns the string definition 'fdef ; (param)' of a fitting function
+
+    Parameters
+    ----------
+
+    fname : str
+        Either the name of a function (a key from fitting functions dict), or
+        directly its definition, of type 'fdef ; (param)'
+
+    Returns
+    ----------
+    str
+    """
+    if ";" in fname:
+        return fname
+    return get_func(fname)
 
 
 def from_fdef(fdef):
     """
     Returns a function and its initialising parameters' values from a string
-    containing them, typically 'fdef ; (param)'
+    containing them, typically 'fdef ; (param)'. The definition is not
+    evaluated as python code: it is compiled into a Model, which only allows
+    numpy functions and arithmetic operators (see anafit.utilities.Model).
+    Compiled functions are kept in a least recently used cache, so that a
+    definition is parsed only once.
 
     Parameters
     ----------
@@ -98,13 +228,71 @@ def from_fdef(fdef):
 
     Returns
     ----------
-    f: function
+    f: Model
+        function called as f(x, *p)
     p: tuple
         initialising parameters' values
 
+    Raises
+    ----------
+    ExpressionError
+        if the definition uses a construct that is not allowed
+    """
+    return _compile_fdef(normalize_fdef(fdef))
+
+
+def normalize_fdef(fdef):
     """
+    Returns the string 'fdef ; (param)' with consecutive whitespaces reduced
+    to one, so that equivalent definitions share the same compiled function
+
+    Parameters
+    ----------
+
+    fdef : str
+        String of type 'fdef ; (param)'
+
+    Returns
+    ----------
+    str
+
+    Raises
+    ----------
+    ExpressionError
+        if fdef is not of type 'fdef ; (param)'
+    """
+    parts = fdef.split(";")
+    if len(parts) != 2:
+        raise ExpressionError("Expected 'fdef ; (param)', got {0!r}".format(fdef))
+    fstr, pstr = parts
+    return " ".join(fstr.split()) + " ; " + " ".join(pstr.split())
+
+
+@functools.lru_cache(maxsize=MODEL_CACHE_SIZE)
+def _compile_fdef(fdef):
     fstr, pstr = fdef.split(";")
-    return eval(fstr), eval(pstr)
+    return Model(fstr), evaluate_constant(pstr)
+
+
+def model_cache_info():
+    """
+    Returns the statistics of the cache of compiled fitting functions used
+    by from_fdef
+
+    Returns
+    ----------
+    functools._CacheInfo
+        named tuple (hits, misses, maxsize, currsize)
+    """
+    return _compile_fdef.cache_info()
+
+
+def clear_model_cache():
+    """
+    Empties the cache of compiled fitting functions used by from_fdef, and
+    resets its statistics
+    """
+    _compile_fdef.cache_clear()
 
 
 def str_line(lin):
@@ -0,0 +1,82 @@
+"""
+Benchmark of the construction of anafit.Figure on figures with many lines.
+
+anafit.Figure needs PyQt5: the benchmark runs on Qt offscreen platform, so
+that no display is needed. Results are printed as json, and saved in a file
+if --output is given.
+
+Usage: python benchmarks/bench_figure.py [--lines 1,10,100] [--size 1e3]
+    [--repeat 5] [--budget 2] [--output figure.json]
+"""
+import argparse
+import os
+
+import numpy as np
+from common import measure, parse_sizes, report, result
+
+LINES = "1,10,100,1000"
+
+
+def run(nlines, size=1000, repeat=5, budget=2.0):
+    """
+    Measures the construction of anafit.Figure on figures of nlines lines
+
+    Parameters
+    ----------
+
+    nlines: list
+        numbers of lines of the figures
+    size: int, optional
+        number of points of each line
+        Default: 1000
+    repeat: int, optional
+        maximum number of measures per benchmark
+        Default: 5
+    budget: float, optional
+        time in seconds after which no new measure of a benchmark is started
+        Default: 2.0
+
+    Returns
+    ----------
+    list
+        one dict per benchmark, see common.result
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5 import QtWidgets
+
+    # matplotlib accepts Qt backend without display once a QApplication runs
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])  # noqa
+    import matplotlib.pyplot as plt
+
+    from anafit.ui.figure import Figure
+
+    x = np.linspace(0, 1, size)
+    results = []
+    for n in nlines:
+        figures = []
+
+        def new_figure():
+            fig, ax = plt.subplots()
+            for i in range(n):
+                ax.plot(x, x + i, marker="o" if i % 2 else "")
+            figures.append(fig)
+
+        timing = measure(
+            lambda: Figure(figures[-1]), new_figure, repeat=repeat, budget=budget
+        )
+        results.append(result("Figure", timing, lines=n, size=size))
+        for fig in figures:
+            plt.close(fig)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lines", default=LINES)
+    parser.add_argument("--size", type=float, default=1e3)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=2.0)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+    results = run(parse_sizes(args.lines), int(args.size), args.repeat, args.budget)
+    report(results, args.output)
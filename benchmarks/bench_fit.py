@@ -0,0 +1,202 @@
+"""
+Benchmark of anafit fitting pipeline, with the Agg backend.
+
+Measures the range selection of Fit.__init__, from_fdef, get_func, Fit.fit for
+every built-in function (and on a subsample for large datas) and Fit.plot, for
+several sizes of datas. Results are
+printed as json, and saved in a file if --output is given.
+
+Usage: python benchmarks/bench_fit.py [--sizes 1e2,1e4] [--repeat 5]
+    [--budget 2] [--output fit.json]
+"""
+import argparse
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+from common import measure, parse_sizes, report, result  # noqa: E402
+
+from anafit.core import Fit  # noqa: E402
+from anafit.core.selection import RangeIndex  # noqa: E402
+from anafit.utilities import clear_model_cache, from_fdef, get_func  # noqa: E402
+
+SIZES = "1e2,1e3,1e4,1e5,1e6,1e7"
+# x range of the datas, and parameters used to generate them for each
+# built-in function
+XRANGE = (1, 5)
+PARAMS = {
+    "constant": (3,),
+    "ax": (2,),
+    "ax+b": (2, -1),
+    "a(x-b)": (2, 0.5),
+    "ax^n": (2, 1.5),
+    "a+bx^n": (1, 2, 1.5),
+    "a(x-b)^n": (2, 0.5, 1.5),
+    "a+b(x-c)^n": (1, 2, 0.5, 1.5),
+    "exp(x/a)": (2,),
+    "a*exp(x/b)": (2, 3),
+    "a*exp(x/b) + c": (2, 3, 1),
+    "a*exp((x-b)/c)": (2, 1, 3),
+    "a(1-exp(-x/b))": (3, 2),
+}
+# relative noise added to the datas
+NOISE = 0.01
+
+
+def make_datas(fname, size, seed=0):
+    """
+    Returns x and y arrays of size points following the built-in function
+    fname, with a relative gaussian noise
+
+    Parameters
+    ----------
+
+    fname: str
+        name of a built-in function, key of PARAMS
+    size: int
+        number of points
+    seed: int, optional
+        seed of the noise
+        Default: 0
+
+    Returns
+    ----------
+    x: numpy.ndarray
+    y: numpy.ndarray
+    """
+    rng = np.random.default_rng(seed)
+    x = np.linspace(*XRANGE, size)
+    f, _ = from_fdef(get_func(fname))
+    y = f(x, *PARAMS[fname]) * (1 + NOISE * rng.standard_normal(size))
+    return x, np.broadcast_to(y, x.shape).copy()
+
+
+def bench_selection(size, **kwargs):
+    # Range index of sorted and unsorted datas, and Fit.__init__ with a new or
+    # an already indexed line
+    results = []
+    x, y = make_datas("ax+b", size)
+    shuffle = np.random.default_rng(1).permutation(size)
+    datas = {"sorted": (x, y), "unsorted": (x[shuffle], y[shuffle])}
+    for order, (xs, ys) in datas.items():
+        timing = measure(lambda: RangeIndex(xs, ys), **kwargs)
+        results.append(result("RangeIndex", timing, size=size, order=order))
+    fig, ax = plt.subplots()
+    (line,) = ax.plot(x, y)
+    xrange = (2, 4)
+
+    def new_datas():
+        line.set_data(x, y)
+        line.get_xydata()
+
+    timing = measure(lambda: Fit(line, "ax+b", xrange), setup=new_datas, **kwargs)
+    results.append(result("Fit.__init__", timing, size=size, index="new"))
+    timing = measure(lambda: Fit(line, "ax+b", xrange), **kwargs)
+    results.append(result("Fit.__init__", timing, size=size, index="cached"))
+    plt.close(fig)
+    return results
+
+
+def bench_models(**kwargs):
+    # Compilation of fitting functions and access to the catalogs
+    results = []
+    fdef = get_func("a+b(x-c)^n")
+    timing = measure(lambda: from_fdef(fdef), setup=clear_model_cache, **kwargs)
+    results.append(result("from_fdef", timing, cache="cold"))
+    timing = measure(lambda: from_fdef(fdef), **kwargs)
+    results.append(result("from_fdef", timing, cache="warm"))
+    timing = measure(get_func, **kwargs)
+    results.append(result("get_func", timing, strfunc=None))
+    timing = measure(lambda: get_func("ax+b"), **kwargs)
+    results.append(result("get_func", timing, strfunc="ax+b"))
+    return results
+
+
+def bench_fit(size, **kwargs):
+    # Fit.fit of every built-in function, without the cache of results
+    results = []
+    fig, ax = plt.subplots()
+    for fname in PARAMS:
+        (line,) = ax.plot(*make_datas(fname, size))
+        fit = Fit(line, fname)
+        timing = measure(lambda: fit.fit(cache=False), **kwargs)
+        fit.fit(cache=False)
+        record = result("Fit.fit", timing, size=size, fname=fname)
+        record["info"] = {key: fit.info[key] for key in ("method", "nfev")}
+        results.append(record)
+        line.remove()
+    plt.close(fig)
+    return results
+
+
+def bench_subsample(size, subsample=10**5, **kwargs):
+    # Fit.fit on a stratified subsample, refined or not on all the datas
+    results = []
+    if size <= subsample:
+        return results
+    fig, ax = plt.subplots()
+    (line,) = ax.plot(*make_datas("a+bx^n", size))
+    for polish in (True, False):
+        fit = Fit(line, "a+bx^n", subsample=subsample, polish=polish)
+        timing = measure(lambda: fit.fit(cache=False), **kwargs)
+        params = dict(size=size, fname="a+bx^n", subsample=subsample, polish=polish)
+        results.append(result("Fit.fit", timing, **params))
+    plt.close(fig)
+    return results
+
+
+def bench_plot(size, **kwargs):
+    # Creation of the artists of a fit, and full draw of the figure
+    fig, ax = plt.subplots()
+    (line,) = ax.plot(*make_datas("a*exp(x/b)", size))
+    fit = Fit(line, "a*exp(x/b)")
+    fit.fit()
+    timing = measure(lambda: fit.plot(True, True), setup=fit.remove, **kwargs)
+    results = [result("Fit.plot", timing, size=size)]
+    timing = measure(fig.canvas.draw, **kwargs)
+    results.append(result("draw", timing, size=size))
+    plt.close(fig)
+    return results
+
+
+def run(sizes, repeat=5, budget=2.0):
+    """
+    Runs all the benchmarks
+
+    Parameters
+    ----------
+
+    sizes: list
+        numbers of points of the datas
+    repeat: int, optional
+        maximum number of measures per benchmark
+        Default: 5
+    budget: float, optional
+        time in seconds after which no new measure of a benchmark is started
+        Default: 2.0
+
+    Returns
+    ----------
+    list
+        one dict per benchmark, see common.result
+    """
+    kwargs = dict(repeat=repeat, budget=budget)
+    results = bench_models(**kwargs)
+    for size in sizes:
+        results += bench_selection(size, **kwargs)
+        results += bench_fit(size, **kwargs)
+        results += bench_subsample(size, **kwargs)
+        results += bench_plot(size, **kwargs)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default=SIZES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=2.0)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+    report(run(parse_sizes(args.sizes), args.repeat, args.budget), args.output)
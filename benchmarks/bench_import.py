@@ -0,0 +1,101 @@
+"""
+Benchmark of the import time of anafit headless fitting engine.
+
+Each measure imports the module in a fresh interpreter and reads the
+cumulative import time reported by python -X importtime. Results are printed
+as json, and saved in a file if --output is given.
+
+Usage: python benchmarks/bench_import.py [--repeat 5] [--output import.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from common import ROOT, report
+
+# modules whose import time is measured
+MODULES = ["anafit", "anafit.core", "anafit.utilities"]
+# modules that must not be loaded by the headless import of anafit
+GUI_MODULES = ["PyQt5", "matplotlib.pyplot"]
+
+
+def import_time(module):
+    """
+    Returns the cumulative import time of a module, in seconds, and the list of
+    GUI_MODULES loaded along with it, measured in a fresh interpreter
+
+    Parameters
+    ----------
+
+    module: str
+        name of the module to import
+
+    Returns
+    ----------
+    time: float
+    loaded: list
+    """
+    code = (
+        "import json, sys, {0}; "
+        "print(json.dumps([m for m in {1!r} if m in sys.modules]))"
+    ).format(module, GUI_MODULES)
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    cumulative = None
+    for line in proc.stderr.splitlines():
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == module:
+            cumulative = int(fields[1]) * 1e-6
+    return cumulative, json.loads(proc.stdout)
+
+
+def run(repeat=5):
+    """
+    Measures the import time of MODULES, repeat times each
+
+    Parameters
+    ----------
+
+    repeat: int, optional
+        number of measures per module
+        Default: 5
+
+    Returns
+    ----------
+    list
+        one dict per module, with the best and median import times in seconds
+        and the GUI modules loaded
+    """
+    results = []
+    for module in MODULES:
+        times = []
+        for _ in range(repeat):
+            time, loaded = import_time(module)
+            times.append(time)
+        times.sort()
+        results.append(
+            {
+                "name": "import " + module,
+                "best": times[0],
+                "median": times[len(times) // 2],
+                "repeat": repeat,
+                "gui_modules": loaded,
+            }
+        )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+    report(run(args.repeat), args.output)
@@ -0,0 +1,114 @@
+"""
+Helpers shared by the benchmarks: timing of a function and output of the
+results as json.
+"""
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# minimum duration of a timed loop, for fast functions called several times
+MIN_LOOP_TIME = 0.01
+
+
+def measure(func, setup=None, repeat=5, budget=2.0):
+    """
+    Times func, repeat times or until budget seconds are spent. Without setup,
+    fast functions are called several times per measure (as timeit does), and
+    the time of one call is returned. With setup, it is called before each
+    call of func, out of the timed part.
+
+    Parameters
+    ----------
+
+    func: function
+        function without arguments to time
+    setup: function, optional
+        function without arguments called before each call of func
+        Default: None
+    repeat: int, optional
+        maximum number of measures
+        Default: 5
+    budget: float, optional
+        time in seconds after which no new measure is started
+        Default: 2.0
+
+    Returns
+    ----------
+    dict
+        best and median times of one call in seconds, number of measures
+        ('repeat') and number of calls per measure ('number')
+    """
+    number, times = 1, []
+    start = time.perf_counter()
+    if setup is None:
+        # the last calibration loop is the first measure
+        while True:
+            t0 = time.perf_counter()
+            for _ in range(number):
+                func()
+            elapsed = time.perf_counter() - t0
+            if elapsed >= MIN_LOOP_TIME or number >= 1e6:
+                break
+            number *= 10
+        times.append(elapsed / number)
+    while not times or (
+        len(times) < repeat and time.perf_counter() - start <= budget
+    ):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - t0) / number)
+    times.sort()
+    return {
+        "best": times[0],
+        "median": times[len(times) // 2],
+        "repeat": len(times),
+        "number": number,
+    }
+
+
+def result(name, timing, **params):
+    """
+    Returns the record of a benchmark, as stored in the json results
+
+    Parameters
+    ----------
+
+    name: str
+        name of the benchmark
+    timing: dict
+        timing returned by measure
+    params: dict
+        parameters of the benchmark (size of the datas...)
+
+    Returns
+    ----------
+    dict
+    """
+    record = {"name": name, "params": params}
+    record.update(timing)
+    return record
+
+
+def parse_sizes(sizes):
+    """
+    Returns the list of ints of a comma separated string, like '1e2,1e4'
+    """
+    return [int(float(size)) for size in sizes.split(",") if size]
+
+
+def report(results, output=None):
+    """
+    Prints results as json, and saves them in output if given
+    """
+    print(json.dumps(results, indent=2))
+    if output is not None:
+        with open(output, "w") as fid:
+            json.dump(results, fid, indent=2)
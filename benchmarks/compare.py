@@ -0,0 +1,77 @@
+"""
+Compares the results of two runs of the benchmarks.
+
+Prints the best time of each benchmark found in both runs, and the ratio of
+the new time to the old one. Exits with status 1 if a benchmark is slower than
+--threshold times its old time.
+
+Usage: python benchmarks/compare.py old.json new.json [--threshold 1.2]
+"""
+import argparse
+import json
+import sys
+
+
+def load(path):
+    """
+    Returns the results saved in path by run.py or by a benchmark script,
+    indexed by the name and the parameters of the benchmarks
+    """
+    with open(path) as fid:
+        results = json.load(fid)
+    if isinstance(results, dict):
+        results = results["results"]
+    return {
+        (r["name"], json.dumps(r.get("params", {}), sort_keys=True)): r
+        for r in results
+    }
+
+
+def compare(old, new, threshold=1.2):
+    """
+    Returns the lines of the comparison table, and the number of regressions
+
+    Parameters
+    ----------
+
+    old, new: dict
+        results returned by load
+    threshold: float, optional
+        ratio of the times above which a benchmark is marked as a regression
+        Default: 1.2
+
+    Returns
+    ----------
+    lines: list
+    regressions: int
+    """
+    header = "{0:<60} {1:>11} {2:>11} {3:>7}"
+    lines = [header.format("benchmark", "old", "new", "ratio")]
+    regressions = 0
+    for key in sorted(old.keys() & new.keys()):
+        told, tnew = old[key]["best"], new[key]["best"]
+        ratio = tnew / told if told else float("inf")
+        flag = ""
+        if ratio > threshold:
+            flag = " slower"
+            regressions += 1
+        elif ratio < 1 / threshold:
+            flag = " faster"
+        name = key[0] + " " + key[1]
+        lines.append(
+            "{0:<60} {1:>11.3e} {2:>11.3e} {3:>7.2f}{4}".format(
+                name[:60], told, tnew, ratio, flag
+            )
+        )
+    return lines, regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=1.2)
+    args = parser.parse_args()
+    lines, regressions = compare(load(args.old), load(args.new), args.threshold)
+    print("\n".join(lines))
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,106 @@
+"""
+Runs all anafit benchmarks and saves their results in one json file.
+
+Each benchmark script runs in its own interpreter (bench_figure switches
+matplotlib to its Qt backend). The results are saved along with the versions
+of the dependencies and the git commit, to be compared with compare.py.
+
+Usage: python benchmarks/run.py [--sizes 1e2,1e4] [--lines 1,10,100]
+    [--repeat 5] [--budget 2] [--output results.json]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+
+from common import ROOT
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# benchmark scripts, with the options they accept
+SCRIPTS = {
+    "bench_import.py": ["repeat"],
+    "bench_fit.py": ["sizes", "repeat", "budget"],
+    "bench_figure.py": ["lines", "repeat", "budget"],
+}
+
+
+def metadata():
+    """
+    Returns the date, the versions of python and of the dependencies, and the
+    git commit of the benchmarked code
+    """
+    import matplotlib
+    import numpy
+    import scipy
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": numpy.__version__,
+        "scipy": scipy.__version__,
+        "matplotlib": matplotlib.__version__,
+    }
+
+
+def run_script(script, options):
+    """
+    Runs a benchmark script in a new interpreter and returns its results
+
+    Parameters
+    ----------
+
+    script: str
+        file name of the script, key of SCRIPTS
+    options: dict
+        values of the options accepted by the script, None to use its
+        default value
+
+    Returns
+    ----------
+    list
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "results.json")
+        cmd = [sys.executable, os.path.join(HERE, script), "--output", output]
+        for option in SCRIPTS[script]:
+            if options.get(option) is not None:
+                cmd += ["--" + option, str(options[option])]
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+        with open(output) as fid:
+            return json.load(fid)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default=None)
+    parser.add_argument("--lines", default=None)
+    parser.add_argument("--repeat", type=int, default=None)
+    parser.add_argument("--budget", type=float, default=None)
+    parser.add_argument("--output", default="benchmark.json")
+    args = parser.parse_args()
+    results = []
+    for script in SCRIPTS:
+        print("Running " + script, file=sys.stderr)
+        try:
+            results += run_script(script, vars(args))
+        except subprocess.CalledProcessError:
+            print(script + " failed, skipped", file=sys.stderr)
+    with open(args.output, "w") as fid:
+        json.dump({"metadata": metadata(), "results": results}, fid, indent=2)
+    print("Results saved in " + args.output, file=sys.stderr)
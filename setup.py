@@ -22,5 +22,6 @@ setup(
     packages=["anafit"],
     install_requires=["matplotlib", "numpy", "scipy", "PyQt5"],
     include_package_data=True,
+    entry_points={"console_scripts": ["anafit-fit = anafit.cli:main"]},
     zip_safe=False,
 )